@@ -0,0 +1,76 @@
+"""Latency of batch_lookup_by_hashes: chunked IN lists vs a single ANY(array)
+
+Looks up `--size` hashes (half existing, half random misses) `--repeat`
+times per strategy and prints p50/p99 in milliseconds as JSON. The Bloom
+filter is not started, so every hash reaches Postgres. Needs DATABASE_URL
+pointing at a disposable database.
+
+    cd backend && python -m benchmarks.bench_batch_lookup --size 50000
+"""
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+
+from sqlalchemy import select
+
+from src.database import AsyncSessionLocal
+from src.models.ioc import IOC
+from src.services.ioc_service import IOCService
+from benchmarks.bench_list_projection import ensure_rows
+
+
+async def chunked_in(service: IOCService, value_hashes):
+    """The previous implementation: sequential 1,000-hash IN queries"""
+    results = []
+    for i in range(0, len(value_hashes), 1000):
+        statement = service._slim_select().where(IOC.value_hash.in_(value_hashes[i:i + 1000]))
+        results.extend((await service.db.execute(statement)).all())
+    return results
+
+
+async def single_array(service: IOCService, value_hashes):
+    return await service.batch_lookup_by_hashes(value_hashes)
+
+
+async def measure(fn, value_hashes, repeat: int) -> dict:
+    timings = []
+    async with AsyncSessionLocal() as db:
+        service = IOCService(db)
+        await fn(service, value_hashes)
+        for _ in range(repeat):
+            start = time.perf_counter()
+            await fn(service, value_hashes)
+            timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return {
+        "p50_ms": round(statistics.median(timings), 1),
+        "p99_ms": round(timings[min(len(timings) - 1, int(len(timings) * 0.99))], 1),
+    }
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", type=int, default=50_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    await ensure_rows(args.size)
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(select(IOC.value_hash).limit(args.size // 2))
+        value_hashes = list(result.scalars())
+    value_hashes += ["%064x" % random.getrandbits(256) for _ in range(args.size - len(value_hashes))]
+    random.shuffle(value_hashes)
+
+    print(json.dumps({
+        "benchmark": "batch_lookup",
+        "size": args.size,
+        "chunked_in": await measure(chunked_in, value_hashes, args.repeat),
+        "single_array": await measure(single_array, value_hashes, args.repeat),
+    }))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
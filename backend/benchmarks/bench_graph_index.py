@@ -0,0 +1,76 @@
+"""Memory and query latency of the in-process relationship graph index
+
+Builds a RelationshipGraph from `--edges` random edges over `--nodes`
+synthetic IOC ids (no database needed), then times k-hop and shortest-path
+queries from random roots and prints the result as JSON.
+
+    cd backend && python -m benchmarks.bench_graph_index --edges 1000000
+"""
+import argparse
+import json
+import random
+import statistics
+import time
+import uuid
+
+from src.utils.graph_index import RelationshipGraph
+
+RELATIONSHIP_TYPES = ["resolves_to", "communicates_with", "drops", "related_to", "hosts"]
+
+
+def percentiles(timings):
+    timings = sorted(timings)
+    return {
+        "p50_us": round(statistics.median(timings) * 1e6, 1),
+        "p99_us": round(timings[int(len(timings) * 0.99)] * 1e6, 1),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--nodes", type=int, default=250_000)
+    parser.add_argument("--edges", type=int, default=1_000_000)
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--depth", type=int, default=3)
+    parser.add_argument("--max-nodes", type=int, default=500)
+    args = parser.parse_args()
+
+    ids = [uuid.uuid4() for _ in range(args.nodes)]
+    graph = RelationshipGraph()
+    start = time.perf_counter()
+    for _ in range(args.edges):
+        graph.add_edge(
+            uuid.uuid4(), random.choice(ids), random.choice(ids),
+            random.choice(RELATIONSHIP_TYPES), random.randint(0, 100), check_existing=False
+        )
+    load_s = time.perf_counter() - start
+    start = time.perf_counter()
+    graph.compact()
+    compact_s = time.perf_counter() - start
+
+    k_hop, paths = [], []
+    for _ in range(args.queries):
+        root, other = random.choice(ids), random.choice(ids)
+        start = time.perf_counter()
+        graph.k_hop(root, args.depth, max_nodes=args.max_nodes)
+        k_hop.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        graph.shortest_path(root, other, args.depth * 2, min_confidence=50)
+        paths.append(time.perf_counter() - start)
+
+    memory = graph.memory_bytes()
+    print(json.dumps({
+        "benchmark": "graph_index",
+        "nodes": graph.node_count,
+        "edges": graph.edge_count,
+        "load_s": round(load_s, 2),
+        "compact_s": round(compact_s, 2),
+        "memory_bytes": memory,
+        "bytes_per_million_edges": round(memory["total"] / graph.edge_count * 1_000_000),
+        "k_hop": percentiles(k_hop),
+        "shortest_path": percentiles(paths),
+    }))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""Rows/s of the /iocs/ list path: eager-loaded ORM objects vs the slim projection
+
+Pages through `--rows` IOCs with keyset pagination, building the IOCResponse
+list exactly like the router does, and prints the result as JSON.
+Seeds synthetic sha256 IOCs through the bulk ingest path if the table is too
+small. Needs DATABASE_URL pointing at a disposable database.
+
+    cd backend && python -m benchmarks.bench_list_projection --rows 100000
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+import uuid
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import joinedload
+
+from src.database import AsyncSessionLocal
+from src.models.ioc import IOC
+from src.routers.iocs import _row_to_response, _to_ioc_response
+from src.services.ioc_service import IOCService
+from src.utils.ioc_feed_parser import aiter_records
+from src.utils.pagination import encode_cursor
+
+SEED_USER = uuid.UUID("aaaaaaaa-aaaa-aaaa-aaaa-aaaaaaaaaaaa")
+SHA256_TYPE_ID = 7
+
+
+async def ensure_rows(rows: int) -> None:
+    async with AsyncSessionLocal() as db:
+        existing = await db.scalar(select(func.count()).select_from(IOC))
+        missing = rows - existing
+        if missing <= 0:
+            return
+        records = (
+            {"type_id": SHA256_TYPE_ID, "value": "%064x" % random.getrandbits(256)}
+            for _ in range(missing)
+        )
+        await IOCService(db).bulk_ingest(aiter_records(records), SEED_USER)
+
+
+async def orm_pages(rows: int, page_size: int) -> int:
+    """The pre-projection path: joinedload x3 and tracked ORM instances"""
+    seen = 0
+    after = None
+    async with AsyncSessionLocal() as db:
+        while seen < rows:
+            statement = select(IOC).options(
+                joinedload(IOC.ioc_type),
+                joinedload(IOC.source_organization),
+                joinedload(IOC.creator)
+            )
+            statement = IOCService._paginate(statement, 0, page_size, after)
+            iocs = (await db.execute(statement)).scalars().all()
+            if not iocs:
+                break
+            [_to_ioc_response(ioc) for ioc in iocs]
+            seen += len(iocs)
+            after = encode_cursor(iocs[-1].created_at, iocs[-1].id)
+            db.expunge_all()
+    return seen
+
+
+async def slim_pages(rows: int, page_size: int) -> int:
+    seen = 0
+    after = None
+    async with AsyncSessionLocal() as db:
+        service = IOCService(db)
+        while seen < rows:
+            page = await service.get_iocs(limit=page_size, after=after)
+            if not page:
+                break
+            [_row_to_response(row) for row in page]
+            seen += len(page)
+            after = encode_cursor(page[-1].created_at, page[-1].id)
+    return seen
+
+
+async def measure(fn, rows: int, page_size: int, repeat: int) -> float:
+    best = 0.0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        seen = await fn(rows, page_size)
+        best = max(best, seen / (time.perf_counter() - start))
+    return best
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    await ensure_rows(args.rows)
+    orm = await measure(orm_pages, args.rows, args.page_size, args.repeat)
+    slim = await measure(slim_pages, args.rows, args.page_size, args.repeat)
+    print(json.dumps({
+        "benchmark": "list_projection",
+        "rows": args.rows,
+        "page_size": args.page_size,
+        "orm_rows_per_s": round(orm),
+        "slim_rows_per_s": round(slim),
+        "speedup": round(slim / orm, 2),
+    }))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,129 @@
+"""Cost of serializing /iocs/ and /iocs/search/ pages: pydantic response_model vs orjson rows
+
+Two measurements, each with FAST_JSON_RESPONSES off and on:
+- serialize: a page of slim rows already in memory, turned into response bytes
+  exactly like the router does (IOCResponse list + response_model validation +
+  JSONResponse, or plain dicts + ORJSONRowResponse)
+- endpoint: full in-process requests through the ASGI app (no network), so the
+  database round trip is included
+
+Prints the result as JSON. Needs DATABASE_URL pointing at a database with at
+least `--page-size` IOCs (see bench_list_projection for seeding).
+
+    cd backend && python -m benchmarks.bench_response_serialization --requests 300
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from typing import List
+
+import httpx
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from src.config import get_settings
+from src.database import AsyncSessionLocal
+from src.main import app
+from src.routers.iocs import _row_to_dict, _row_to_response
+from src.schemas.ioc import IOCResponse, IOCSearchParams
+from src.services.ioc_service import IOCService
+from src.utils.fast_json import ORJSONRowResponse
+
+ENDPOINTS = {
+    "list": "/iocs/",
+    "search": "/iocs/search/",
+}
+
+
+async def fetch_pages(page_size: int) -> dict:
+    async with AsyncSessionLocal() as db:
+        service = IOCService(db)
+        return {
+            "list": await service.get_iocs(limit=page_size),
+            "search": await service.search_iocs(params=IOCSearchParams(active=True), limit=page_size),
+        }
+
+
+async def pydantic_body(field, rows) -> bytes:
+    content = await serialize_response(field=field, response_content=[_row_to_response(r) for r in rows])
+    return JSONResponse(content).body
+
+
+def orjson_body(rows) -> bytes:
+    return ORJSONRowResponse([_row_to_dict(r) for r in rows]).body
+
+
+async def time_serialize(rows, iterations: int) -> dict:
+    field = create_response_field(name="Response", type_=List[IOCResponse])
+    if json.loads(await pydantic_body(field, rows)) != json.loads(orjson_body(rows)):
+        raise SystemExit("pydantic and orjson bodies differ")
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        await pydantic_body(field, rows)
+    before = (time.perf_counter() - start) / iterations
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        orjson_body(rows)
+    after = (time.perf_counter() - start) / iterations
+    return {
+        "rows": len(rows),
+        "pydantic_us_per_page": round(before * 1e6, 1),
+        "orjson_us_per_page": round(after * 1e6, 1),
+        "speedup": round(before / after, 2),
+    }
+
+
+async def time_endpoint(client: httpx.AsyncClient, path: str, params: dict, requests: int) -> dict:
+    latencies = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        response = await client.get(path, params=params)
+        latencies.append(time.perf_counter() - start)
+        response.raise_for_status()
+    latencies.sort()
+    return {
+        "p50_ms": round(statistics.median(latencies) * 1000, 2),
+        "p99_ms": round(latencies[int(len(latencies) * 0.99) - 1] * 1000, 2),
+        "req_per_s": round(len(latencies) / sum(latencies)),
+    }
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--iterations", type=int, default=500)
+    parser.add_argument("--requests", type=int, default=300)
+    args = parser.parse_args()
+
+    pages = await fetch_pages(args.page_size)
+    serialize = {name: await time_serialize(rows, args.iterations) for name, rows in pages.items()}
+
+    settings = get_settings()
+    params = {"list": {"limit": args.page_size}, "search": {"limit": args.page_size, "active": "true"}}
+    endpoint = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for name, path in ENDPOINTS.items():
+            results = {}
+            for mode, fast in (("pydantic", False), ("orjson", True)):
+                settings.fast_json_responses = fast
+                await time_endpoint(client, path, params[name], 10)
+                results[mode] = await time_endpoint(client, path, params[name], args.requests)
+            results["p50_speedup"] = round(results["pydantic"]["p50_ms"] / results["orjson"]["p50_ms"], 2)
+            endpoint[name] = results
+
+    print(json.dumps({
+        "benchmark": "response_serialization",
+        "page_size": args.page_size,
+        "serialize": serialize,
+        "endpoint": endpoint,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,58 @@
+"""Compare two benchmarks.load reports, e.g. from before and after a change
+
+Prints one row per scenario with the relative change of throughput, p50, p99
+and queries per request. Exits non-zero when a scenario's p99 got worse by
+more than `--max-regression` percent, so it can gate CI.
+
+    cd backend && python -m benchmarks.compare before.json after.json --max-regression 20
+"""
+import argparse
+import json
+import sys
+from typing import Optional
+
+METRICS = ["throughput_rps", "p50_ms", "p99_ms", "queries_per_request"]
+
+
+def change(before: Optional[float], after: Optional[float]) -> Optional[float]:
+    if before is None or after is None or not before:
+        return None
+    return round((after - before) / before * 100, 1)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("before")
+    parser.add_argument("after")
+    parser.add_argument("--max-regression", type=float, default=None, help="allowed p99 increase in percent")
+    args = parser.parse_args()
+
+    with open(args.before) as f:
+        before = json.load(f)
+    with open(args.after) as f:
+        after = json.load(f)
+
+    print(f"{before.get('commit')} -> {after.get('commit')}")
+    print(f"{'scenario':<14}" + "".join(f"{metric:>28}" for metric in METRICS))
+    regressions = []
+    for name, result in after["scenarios"].items():
+        baseline = before["scenarios"].get(name)
+        if not baseline or "skipped" in result or "skipped" in baseline:
+            continue
+        cells = []
+        for metric in METRICS:
+            delta = change(baseline.get(metric), result.get(metric))
+            cell = f"{baseline.get(metric)} -> {result.get(metric)}"
+            cells.append(f"{cell} ({delta:+}%)" if delta is not None else cell)
+        print(f"{name:<14}" + "".join(f"{cell:>28}" for cell in cells))
+        p99_change = change(baseline["p99_ms"], result["p99_ms"])
+        if args.max_regression is not None and p99_change is not None and p99_change > args.max_regression:
+            regressions.append(f"{name}: p99 {p99_change:+}%")
+
+    if regressions:
+        print("Regressions: " + ", ".join(regressions), file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,329 @@
+"""Async load generator for the IOC API, results as JSON for comparing commits
+
+Each scenario runs for `--duration` seconds with `--concurrency` closed-loop
+workers and reports throughput, p50/p95/p99 latency, errors and database
+statements per request:
+
+    get_iocs        GET  /iocs/?limit=100, optionally filtered by type
+    search_iocs     GET  /iocs/search/ by type and active flag
+    get_by_value    GET  /iocs/by-typed-value/{type_id}/{value}, 90% hits (misses are
+                    reported as not_found, not errors)
+    batch_lookup    POST /iocs/batch-lookup-typed, `--batch-size` values, half misses
+                    (the batch_lookup_by_hashes path)
+    create_ioc      POST /iocs/ with fresh values
+    graph           GET  /iocs/{id}/graph?depth=2 from IOCs that have edges
+
+By default the app is served in-process through httpx's ASGI transport with
+its lifespan running, and statements are counted with a SQLAlchemy
+before_cursor_execute listener. The load generator then shares the event
+loop and the CPU with the app, so absolute numbers are only comparable
+between runs on the same machine. With `--base-url` a running server is
+driven over HTTP instead and statements are counted from pg_stat_statements
+(BEGIN/COMMIT excluded), which needs the extension preloaded, see
+docker-compose.bench.yml. Without it queries_per_request is null.
+
+Seed first (benchmarks.seed), then:
+
+    cd backend && python -m benchmarks.load --duration 20 --concurrency 16 --output before.json
+    cd backend && python -m benchmarks.compare before.json after.json
+"""
+import argparse
+import asyncio
+import datetime
+import json
+import random
+import statistics
+import subprocess
+import time
+import uuid
+from urllib.parse import quote
+from typing import Awaitable, Callable, Dict, List, Optional
+
+import httpx
+from sqlalchemy import event, func, select, text
+
+from src.config import get_settings
+from src.database import AsyncSessionLocal, engine
+from src.models.ioc import IOC
+from src.models.ioc_relationship import IOCRelationship
+from src.utils.ioc_type_registry import ioc_type_registry
+from src.utils.ioc_utils import IOCTypeEnum
+from benchmarks.seed import GENERATORS, SEED_USER, type_ids
+
+SAMPLE_SIZE = 5000
+
+PG_STAT_STATEMENTS_CALLS = text("""
+    SELECT coalesce(sum(calls), 0) FROM pg_stat_statements
+    WHERE dbid = (SELECT oid FROM pg_database WHERE datname = current_database())
+        AND query !~* '^\\s*(BEGIN|COMMIT|ROLLBACK)'
+""")
+
+
+class Sample:
+    """Existing IOCs the scenarios draw their request parameters from"""
+
+    def __init__(self, iocs: List[tuple], graph_roots: List[uuid.UUID], ids_by_type: dict):
+        self.iocs = iocs
+        # {value} is a single path segment, so URLs cannot be looked up by value
+        self.path_safe_iocs = [ioc for ioc in iocs if "/" not in ioc[1]]
+        self.graph_roots = graph_roots
+        self.ids_by_type = ids_by_type
+        self.type_ids = sorted(ids_by_type.values())
+
+    def random_value(self, rng: random.Random, path_safe: bool = False) -> tuple:
+        """(type_id, value) of a value that is almost certainly not stored"""
+        types = [item for item in self.ids_by_type.items() if not path_safe or item[0] != IOCTypeEnum.URL]
+        ioc_type, type_id = rng.choice(types)
+        return type_id, GENERATORS[ioc_type](rng)
+
+
+async def load_sample() -> Sample:
+    async with AsyncSessionLocal() as db:
+        await ioc_type_registry.load(db)
+        iocs = (await db.execute(
+            select(IOC.type_id, IOC.value).order_by(func.random()).limit(SAMPLE_SIZE)
+        )).all()
+        graph_roots = (await db.execute(
+            select(IOCRelationship.source_id).distinct().limit(SAMPLE_SIZE)
+        )).scalars().all()
+    if not iocs:
+        raise SystemExit("No IOCs to benchmark against, run benchmarks.seed first")
+    return Sample([tuple(row) for row in iocs], graph_roots, type_ids())
+
+
+async def get_iocs(client: httpx.AsyncClient, sample: Sample, rng: random.Random, args) -> httpx.Response:
+    params = {"limit": 100}
+    if rng.random() < 0.5:
+        params["type_id"] = rng.choice(sample.type_ids)
+    return await client.get("/iocs/", params=params)
+
+
+async def search_iocs(client: httpx.AsyncClient, sample: Sample, rng: random.Random, args) -> httpx.Response:
+    params = {"limit": 100, "type_id": rng.choice(sample.type_ids), "active": "true"}
+    return await client.get("/iocs/search/", params=params)
+
+
+async def get_by_value(client: httpx.AsyncClient, sample: Sample, rng: random.Random, args) -> httpx.Response:
+    if rng.random() < 0.9:
+        type_id, value = rng.choice(sample.path_safe_iocs)
+    else:
+        type_id, value = sample.random_value(rng, path_safe=True)
+    return await client.get(f"/iocs/by-typed-value/{type_id}/{quote(value, safe='')}")
+
+
+async def batch_lookup(client: httpx.AsyncClient, sample: Sample, rng: random.Random, args) -> httpx.Response:
+    lookups = []
+    for i in range(args.batch_size):
+        type_id, value = rng.choice(sample.iocs) if i % 2 else sample.random_value(rng)
+        lookups.append({"type_id": type_id, "value": value})
+    return await client.post("/iocs/batch-lookup-typed", json=lookups)
+
+
+async def create_ioc(client: httpx.AsyncClient, sample: Sample, rng: random.Random, args) -> httpx.Response:
+    type_id, value = sample.random_value(rng)
+    return await client.post("/iocs/", json={
+        "type_id": type_id, "value": value, "created_by": str(SEED_USER),
+        "metadata_": {"seeded_by": "benchmarks"},
+    })
+
+
+async def graph(client: httpx.AsyncClient, sample: Sample, rng: random.Random, args) -> Optional[httpx.Response]:
+    if not sample.graph_roots:
+        return None
+    return await client.get(f"/iocs/{rng.choice(sample.graph_roots)}/graph", params={"depth": 2})
+
+
+Scenario = Callable[[httpx.AsyncClient, Sample, random.Random, argparse.Namespace], Awaitable[Optional[httpx.Response]]]
+
+SCENARIOS: Dict[str, Scenario] = {
+    "get_iocs": get_iocs,
+    "search_iocs": search_iocs,
+    "get_by_value": get_by_value,
+    "batch_lookup": batch_lookup,
+    "create_ioc": create_ioc,
+    "graph": graph,
+}
+
+
+class EngineStatementCounter:
+    """Counts statements the in-process app sends through the SQLAlchemy engine"""
+
+    name = "sqlalchemy"
+
+    def __init__(self):
+        self.count = 0
+        event.listen(engine.sync_engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, *args) -> None:
+        self.count += 1
+
+    async def read(self) -> Optional[int]:
+        return self.count
+
+
+class PgStatStatementsCounter:
+    """Counts statements from pg_stat_statements, for a server in another process"""
+
+    name = "pg_stat_statements"
+
+    def __init__(self):
+        self.available = True
+        self.reads = 0
+
+    async def read(self) -> Optional[int]:
+        if not self.available:
+            return None
+        try:
+            async with AsyncSessionLocal() as db:
+                if not self.reads:
+                    await db.execute(text("CREATE EXTENSION IF NOT EXISTS pg_stat_statements"))
+                    await db.commit()
+                calls = await db.scalar(PG_STAT_STATEMENTS_CALLS)
+        except Exception:
+            self.available = False
+            return None
+        # Every earlier read is counted too
+        calls -= self.reads
+        self.reads += 1
+        return int(calls)
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+async def run_scenario(client, scenario: Scenario, sample: Sample, counter, args) -> dict:
+    latencies: List[float] = []
+    errors = 0
+    not_found = 0
+    skipped = False
+
+    async def worker(seed: int, deadline: float, record: bool) -> None:
+        nonlocal errors, not_found, skipped
+        rng = random.Random(seed)
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                response = await scenario(client, sample, rng, args)
+            except httpx.HTTPError:
+                status = None
+            else:
+                if response is None:
+                    skipped = True
+                    return
+                status = response.status_code
+            if record:
+                latencies.append(time.perf_counter() - start)
+                # Lookups of unknown values are expected to miss
+                not_found += status == 404
+                errors += status is None or status >= 400 and status != 404
+
+    warmup_deadline = time.perf_counter() + args.warmup
+    await asyncio.gather(*(worker(-i - 1, warmup_deadline, False) for i in range(args.concurrency)))
+    if skipped:
+        return {"skipped": "no data for this scenario"}
+
+    statements_before = await counter.read()
+    started = time.perf_counter()
+    deadline = started + args.duration
+    await asyncio.gather(*(worker(i, deadline, True) for i in range(args.concurrency)))
+    elapsed = time.perf_counter() - started
+    statements_after = await counter.read()
+
+    latencies.sort()
+    result = {
+        "requests": len(latencies),
+        "errors": errors,
+        "not_found": not_found,
+        "throughput_rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+        "max_ms": round(latencies[-1] * 1000, 2),
+        "queries_per_request": None,
+    }
+    if statements_before is not None and statements_after is not None:
+        result["queries_per_request"] = round((statements_after - statements_before) / len(latencies), 2)
+    return result
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def dataset_size() -> dict:
+    async with AsyncSessionLocal() as db:
+        return {
+            "iocs": await db.scalar(select(func.count()).select_from(IOC)),
+            "relationships": await db.scalar(select(func.count()).select_from(IOCRelationship)),
+        }
+
+
+async def run(args) -> dict:
+    sample = await load_sample()
+    report = {
+        "benchmark": "load",
+        "commit": git_commit(),
+        "started_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "target": args.base_url or "in-process",
+        "config": {
+            "duration_s": args.duration,
+            "warmup_s": args.warmup,
+            "concurrency": args.concurrency,
+            "batch_size": args.batch_size,
+        },
+        "dataset": await dataset_size(),
+        "scenarios": {},
+    }
+
+    if args.base_url:
+        counter = PgStatStatementsCounter()
+        async with httpx.AsyncClient(base_url=args.base_url, timeout=30) as client:
+            for name in args.scenarios:
+                report["scenarios"][name] = await run_scenario(client, SCENARIOS[name], sample, counter, args)
+    else:
+        from src.main import app
+        from src.utils.bloom_filter import ioc_bloom_index
+
+        counter = EngineStatementCounter()
+        async with app.router.lifespan_context(app):
+            # Let the background bloom filter build finish so it is neither measured nor counted
+            started = time.monotonic()
+            while get_settings().ioc_bloom_enabled and not ioc_bloom_index.ready:
+                if time.monotonic() - started > 120:
+                    raise SystemExit("IOC bloom filter did not become ready")
+                await asyncio.sleep(0.1)
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=30) as client:
+                for name in args.scenarios:
+                    report["scenarios"][name] = await run_scenario(client, SCENARIOS[name], sample, counter, args)
+    report["query_counter"] = counter.name if (await counter.read()) is not None else None
+    return report
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--base-url", default=None, help="drive a running server instead of the in-process app")
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--warmup", type=float, default=2.0)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--output", default=None, help="also write the JSON report to this file")
+    args = parser.parse_args()
+
+    report = await run(args)
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,181 @@
+"""Seed synthetic IOCs of every IOCTypeEnum type, plus relationships, for benchmarking
+
+Tops the database up to `--iocs` IOCs, spread evenly across the types, and
+`--relationships` edges. IOCs go through IOCService.bulk_ingest, so values are
+validated and hashed like production writes. Edge sources are skewed
+(Pareto) so a few hub IOCs have many neighbours, like real infrastructure.
+Running it again only adds what is missing, and `--seed` makes the generated
+values reproducible.
+
+    docker compose up -d postgres
+    cd backend && python -m benchmarks.seed --iocs 100000 --relationships 50000
+"""
+import argparse
+import asyncio
+import ipaddress
+import json
+import random
+import string
+import uuid
+from typing import Callable, Dict, Iterator
+
+from sqlalchemy import func, select, text
+
+from src.database import AsyncSessionLocal
+from src.models.ioc import IOC
+from src.models.ioc_relationship import IOCRelationship
+from src.services.ioc_service import IOCService
+from src.utils.ioc_change_notifier import RELATIONSHIP_CHANGES_CHANNEL, notify_all_changed
+from src.utils.ioc_feed_parser import aiter_records
+from src.utils.ioc_type_registry import ioc_type_registry
+from src.utils.ioc_utils import IOCTypeEnum
+
+SEED_USER = uuid.UUID("aaaaaaaa-aaaa-aaaa-aaaa-aaaaaaaaaaaa")
+SEED_ORGS = [
+    None,
+    uuid.UUID("11111111-1111-1111-1111-111111111111"),
+    uuid.UUID("22222222-2222-2222-2222-222222222222"),
+    uuid.UUID("33333333-3333-3333-3333-333333333333"),
+]
+TLP_LEVELS = ["WHITE", "GREEN", "AMBER", "RED"]
+TLDS = ["com", "net", "org", "io", "ru", "cn", "xyz", "info", "top", "biz"]
+RELATIONSHIP_TYPES = ["resolves_to", "related_to", "drops", "communicates_with", "downloads"]
+
+EDGE_BATCH_SIZE = 10000
+
+INSERT_EDGES = text("""
+    INSERT INTO ioc_relationships (source_id, target_id, relationship_type, confidence_score)
+    SELECT * FROM unnest(
+        CAST(:source_ids AS uuid[]), CAST(:target_ids AS uuid[]),
+        CAST(:relationship_types AS varchar[]), CAST(:confidence_scores AS integer[])
+    )
+    ON CONFLICT (source_id, target_id, relationship_type) DO NOTHING
+""")
+
+
+def _label(rng: random.Random, low: int = 6, high: int = 12) -> str:
+    return "".join(rng.choices(string.ascii_lowercase, k=rng.randint(low, high)))
+
+
+def _domain(rng: random.Random) -> str:
+    return f"{_label(rng)}{rng.randint(0, 9999)}.{rng.choice(TLDS)}"
+
+
+def _hex(rng: random.Random, digits: int) -> str:
+    return "%0*x" % (digits, rng.getrandbits(digits * 4))
+
+
+GENERATORS: Dict[IOCTypeEnum, Callable[[random.Random], str]] = {
+    IOCTypeEnum.IPV4_ADDR: lambda rng: str(ipaddress.IPv4Address(rng.randint(0x01000000, 0xDFFFFFFF))),
+    IOCTypeEnum.IPV6_ADDR: lambda rng: str(ipaddress.IPv6Address((0x2001 << 112) | rng.getrandbits(112))),
+    IOCTypeEnum.IPV4_CIDR: lambda rng: str(ipaddress.IPv4Network(
+        (rng.randint(0x01000000, 0xDFFFFFFF), rng.randint(8, 30)), strict=False
+    )),
+    IOCTypeEnum.IPV6_CIDR: lambda rng: str(ipaddress.IPv6Network(
+        ((0x2001 << 112) | rng.getrandbits(112), rng.randint(32, 64)), strict=False
+    )),
+    IOCTypeEnum.DOMAIN: _domain,
+    IOCTypeEnum.EMAIL: lambda rng: f"{_label(rng, 3, 10)}@{_domain(rng)}",
+    IOCTypeEnum.FILE_HASH_MD5: lambda rng: _hex(rng, 32),
+    IOCTypeEnum.FILE_HASH_SHA1: lambda rng: _hex(rng, 40),
+    IOCTypeEnum.FILE_HASH_SHA256: lambda rng: _hex(rng, 64),
+    IOCTypeEnum.FILE_HASH_SHA512: lambda rng: _hex(rng, 128),
+    IOCTypeEnum.URL: lambda rng: f"https://{_domain(rng)}/{_label(rng)}/{_hex(rng, 8)}.php",
+    IOCTypeEnum.MUTEX: lambda rng: f"Global\\{_label(rng)}-{_hex(rng, 8)}",
+    IOCTypeEnum.REGISTRY_KEY: lambda rng: (
+        f"HKLM\\Software\\Microsoft\\Windows\\CurrentVersion\\Run\\{_label(rng)}{_hex(rng, 4)}"
+    ),
+    IOCTypeEnum.YARA_RULE: lambda rng: (
+        f'rule {_label(rng)}_{_hex(rng, 6)} {{ strings: $a = "{_hex(rng, 16)}" condition: $a }}'
+    ),
+}
+
+
+def type_ids() -> Dict[IOCTypeEnum, int]:
+    """IOCTypeEnum -> ioc_types.id, the registry must be loaded"""
+    by_name = {entry.name: type_id for type_id, entry in ioc_type_registry.all().items()}
+    return {ioc_type: by_name[ioc_type.value] for ioc_type in IOCTypeEnum if ioc_type.value in by_name}
+
+
+def generate_records(count: int, ids: Dict[IOCTypeEnum, int], rng: random.Random) -> Iterator[dict]:
+    types = list(ids)
+    for i in range(count):
+        ioc_type = types[i % len(types)]
+        source_org_id = rng.choice(SEED_ORGS)
+        yield {
+            "type_id": ids[ioc_type],
+            "value": GENERATORS[ioc_type](rng),
+            "tlp_level": rng.choice(TLP_LEVELS),
+            "active": rng.random() < 0.9,
+            "metadata": {"seeded_by": "benchmarks"},
+            "source_org_id": str(source_org_id) if source_org_id else None,
+        }
+
+
+async def seed_iocs(target: int, rng: random.Random) -> dict:
+    async with AsyncSessionLocal() as db:
+        await ioc_type_registry.load(db)
+        existing = await db.scalar(select(func.count()).select_from(IOC))
+        missing = target - existing
+        if missing <= 0:
+            return {"existing": existing, "inserted": 0}
+        records = generate_records(missing, type_ids(), rng)
+        result = await IOCService(db).bulk_ingest(aiter_records(records), SEED_USER)
+        return {"existing": existing, "inserted": result.inserted, "rejected": result.rejected}
+
+
+async def seed_relationships(target: int, rng: random.Random) -> dict:
+    async with AsyncSessionLocal() as db:
+        existing = await db.scalar(select(func.count()).select_from(IOCRelationship))
+        missing = target - existing
+        if missing <= 0:
+            return {"existing": existing, "inserted": 0}
+        # Enough endpoints for the wanted edge count without reading the whole table
+        sample_size = min(max(missing, 1000), 200_000)
+        node_ids = (await db.execute(
+            select(IOC.id).order_by(func.random()).limit(sample_size)
+        )).scalars().all()
+        if len(node_ids) < 2:
+            return {"existing": existing, "inserted": 0}
+
+        inserted = 0
+        while missing > 0:
+            batch = min(missing, EDGE_BATCH_SIZE)
+            edges = {}
+            for _ in range(batch):
+                source = node_ids[int(rng.paretovariate(1.2)) % len(node_ids)]
+                target_id = rng.choice(node_ids)
+                if source != target_id:
+                    edges[(source, target_id, rng.choice(RELATIONSHIP_TYPES))] = rng.randint(10, 100)
+            result = await db.execute(INSERT_EDGES, {
+                "source_ids": [source for source, _, _ in edges],
+                "target_ids": [target_id for _, target_id, _ in edges],
+                "relationship_types": [relationship_type for _, _, relationship_type in edges],
+                "confidence_scores": list(edges.values()),
+            })
+            await db.commit()
+            if not result.rowcount:
+                break
+            inserted += result.rowcount
+            missing -= result.rowcount
+        # Raw inserts, running workers only see them through a full refresh
+        await notify_all_changed(db, RELATIONSHIP_CHANGES_CHANNEL)
+        await db.commit()
+        return {"existing": existing, "inserted": inserted}
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iocs", type=int, default=100_000)
+    parser.add_argument("--relationships", type=int, default=50_000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    iocs = await seed_iocs(args.iocs, rng)
+    relationships = await seed_relationships(args.relationships, rng)
+    print(json.dumps({"iocs": iocs, "relationships": relationships}))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,58 @@
+"""unique (type_id, value_hash) on iocs
+
+Revision ID: 0001
+Revises: 
+Create Date: 2026-10-18 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("CREATE INDEX IF NOT EXISTS ix_iocs_value_hash ON iocs (value_hash)")
+
+    # Fold duplicate (type_id, value_hash) rows into the oldest one before adding the constraint
+    op.execute("""
+        CREATE TEMP TABLE ioc_duplicates ON COMMIT DROP AS
+        SELECT id, keep_id, max_last_seen FROM (
+            SELECT
+                id,
+                first_value(id) OVER w AS keep_id,
+                max(last_seen) OVER (PARTITION BY type_id, value_hash) AS max_last_seen
+            FROM iocs
+            WINDOW w AS (PARTITION BY type_id, value_hash ORDER BY created_at, id)
+        ) ranked
+        WHERE id <> keep_id
+    """)
+    op.execute("""
+        UPDATE ioc_relationships r SET source_id = d.keep_id
+        FROM ioc_duplicates d WHERE r.source_id = d.id
+    """)
+    op.execute("""
+        UPDATE ioc_relationships r SET target_id = d.keep_id
+        FROM ioc_duplicates d WHERE r.target_id = d.id
+    """)
+    op.execute("""
+        UPDATE iocs SET last_seen = d.max_last_seen
+        FROM (SELECT DISTINCT keep_id, max_last_seen FROM ioc_duplicates) d
+        WHERE iocs.id = d.keep_id
+    """)
+    op.execute("DELETE FROM iocs USING ioc_duplicates d WHERE iocs.id = d.id")
+
+    op.execute(
+        "CREATE UNIQUE INDEX IF NOT EXISTS uq_iocs_type_id_value_hash ON iocs (type_id, value_hash)"
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS uq_iocs_type_id_value_hash")
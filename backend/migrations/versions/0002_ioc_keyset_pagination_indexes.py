@@ -0,0 +1,33 @@
+"""keyset pagination indexes on iocs
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS ix_iocs_created_at_id ON iocs (created_at DESC, id DESC)"
+    )
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS ix_iocs_type_id_created_at_id "
+        "ON iocs (type_id, created_at DESC, id DESC)"
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS ix_iocs_type_id_created_at_id")
+    op.execute("DROP INDEX IF EXISTS ix_iocs_created_at_id")
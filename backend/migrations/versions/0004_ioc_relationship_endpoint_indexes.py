@@ -0,0 +1,32 @@
+"""source_id / target_id indexes on ioc_relationships
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0004'
+down_revision: Union[str, None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS ix_ioc_relationships_source_id ON ioc_relationships (source_id)"
+    )
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS ix_ioc_relationships_target_id ON ioc_relationships (target_id)"
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS ix_ioc_relationships_target_id")
+    op.execute("DROP INDEX IF EXISTS ix_ioc_relationships_source_id")
@@ -0,0 +1,62 @@
+"""unique (source_id, target_id, relationship_type) on ioc_relationships
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 19:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0005'
+down_revision: Union[str, None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Fold duplicate edges into the oldest one, keeping the widest observation window
+    # and the highest confidence, before adding the constraint
+    op.execute("""
+        CREATE TEMP TABLE relationship_duplicates ON COMMIT DROP AS
+        SELECT id, keep_id, max_confidence, min_first_observed, max_last_observed FROM (
+            SELECT
+                id,
+                first_value(id) OVER w AS keep_id,
+                max(confidence_score) OVER p AS max_confidence,
+                min(first_observed) OVER p AS min_first_observed,
+                max(last_observed) OVER p AS max_last_observed,
+                count(*) OVER p AS copies
+            FROM ioc_relationships
+            WHERE source_id IS NOT NULL AND target_id IS NOT NULL
+            WINDOW
+                p AS (PARTITION BY source_id, target_id, relationship_type),
+                w AS (PARTITION BY source_id, target_id, relationship_type ORDER BY first_observed, id)
+        ) ranked
+        WHERE copies > 1
+    """)
+    op.execute("""
+        UPDATE ioc_relationships r SET
+            confidence_score = d.max_confidence,
+            first_observed = d.min_first_observed,
+            last_observed = d.max_last_observed
+        FROM relationship_duplicates d
+        WHERE r.id = d.keep_id AND d.id = d.keep_id
+    """)
+    op.execute("""
+        DELETE FROM ioc_relationships USING relationship_duplicates d
+        WHERE ioc_relationships.id = d.id AND d.id <> d.keep_id
+    """)
+
+    op.execute(
+        "CREATE UNIQUE INDEX IF NOT EXISTS uq_ioc_relationships_source_target_type "
+        "ON ioc_relationships (source_id, target_id, relationship_type)"
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS uq_ioc_relationships_source_target_type")
@@ -0,0 +1,29 @@
+"""widen iocs.value_hash to 128 characters for sha512 file hashes
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18 20:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0006'
+down_revision: Union[str, None] = '0005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Hash types store the hash itself as value_hash, a sha512 hex digest is 128 characters.
+    # Raising a varchar limit only touches the catalog, the table is not rewritten
+    op.execute("ALTER TABLE iocs ALTER COLUMN value_hash TYPE VARCHAR(128)")
+
+
+def downgrade() -> None:
+    # Fails while sha512 IOCs are stored
+    op.execute("ALTER TABLE iocs ALTER COLUMN value_hash TYPE VARCHAR(64)")
@@ -0,0 +1,78 @@
+"""track IOC changes by transaction id and keep tombstones of deleted IOCs for delta sync
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18 22:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0007'
+down_revision: Union[str, None] = '0006'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # A constant default only touches the catalog, existing rows read as changed in xid 0.
+    # New rows take the writing transaction's 64-bit xid, which never wraps and survives freezing
+    op.execute("ALTER TABLE iocs ADD COLUMN IF NOT EXISTS change_xid xid8 NOT NULL DEFAULT '0'")
+    op.execute("ALTER TABLE iocs ALTER COLUMN change_xid SET DEFAULT pg_current_xact_id()")
+    op.execute("CREATE INDEX IF NOT EXISTS ix_iocs_change_xid_id ON iocs (change_xid, id)")
+
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS ioc_tombstones (
+            id UUID PRIMARY KEY,
+            type_id INTEGER NOT NULL,
+            value_hash VARCHAR(128) NOT NULL,
+            deleted_xid xid8 NOT NULL DEFAULT pg_current_xact_id(),
+            deleted_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW()
+        )
+    """)
+    op.execute("CREATE INDEX IF NOT EXISTS ix_ioc_tombstones_deleted_xid_id ON ioc_tombstones (deleted_xid, id)")
+
+    # Triggers so bulk upserts and raw SQL writes are tracked as well as ORM updates
+    op.execute("""
+        CREATE OR REPLACE FUNCTION iocs_set_change_xid() RETURNS trigger AS $$
+        BEGIN
+            NEW.change_xid := pg_current_xact_id();
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE OR REPLACE FUNCTION iocs_record_tombstone() RETURNS trigger AS $$
+        BEGIN
+            INSERT INTO ioc_tombstones (id, type_id, value_hash)
+            VALUES (OLD.id, OLD.type_id, OLD.value_hash)
+            ON CONFLICT (id) DO UPDATE
+                SET deleted_xid = EXCLUDED.deleted_xid, deleted_at = EXCLUDED.deleted_at;
+            RETURN OLD;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("DROP TRIGGER IF EXISTS iocs_change_xid ON iocs")
+    op.execute("""
+        CREATE TRIGGER iocs_change_xid BEFORE UPDATE ON iocs
+        FOR EACH ROW EXECUTE FUNCTION iocs_set_change_xid()
+    """)
+    op.execute("DROP TRIGGER IF EXISTS iocs_tombstone ON iocs")
+    op.execute("""
+        CREATE TRIGGER iocs_tombstone AFTER DELETE ON iocs
+        FOR EACH ROW EXECUTE FUNCTION iocs_record_tombstone()
+    """)
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER IF EXISTS iocs_tombstone ON iocs")
+    op.execute("DROP TRIGGER IF EXISTS iocs_change_xid ON iocs")
+    op.execute("DROP FUNCTION IF EXISTS iocs_record_tombstone()")
+    op.execute("DROP FUNCTION IF EXISTS iocs_set_change_xid()")
+    op.execute("DROP TABLE IF EXISTS ioc_tombstones")
+    op.execute("DROP INDEX IF EXISTS ix_iocs_change_xid_id")
+    op.execute("ALTER TABLE iocs DROP COLUMN IF EXISTS change_xid")
@@ -0,0 +1,27 @@
+"""count IOC sightings
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-18 23:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0008'
+down_revision: Union[str, None] = '0007'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # A constant default only touches the catalog, existing IOCs count as seen once
+    op.execute("ALTER TABLE iocs ADD COLUMN IF NOT EXISTS sighting_count BIGINT NOT NULL DEFAULT 1")
+
+
+def downgrade() -> None:
+    op.execute("ALTER TABLE iocs DROP COLUMN IF EXISTS sighting_count")
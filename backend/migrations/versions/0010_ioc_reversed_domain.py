@@ -0,0 +1,66 @@
+"""reversed-label domain column for parent and subdomain matching
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-19 01:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0010'
+down_revision: Union[str, None] = '0009'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # 'cdn.example.com' -> 'com.example.cdn', so a domain and its subdomains share a prefix
+    op.execute("""
+        CREATE OR REPLACE FUNCTION reverse_domain_labels(domain TEXT) RETURNS TEXT AS $$
+            SELECT array_to_string(ARRAY(
+                SELECT label FROM unnest(string_to_array(domain, '.')) WITH ORDINALITY AS l(label, position)
+                ORDER BY position DESC
+            ), '.')
+        $$ LANGUAGE sql IMMUTABLE STRICT PARALLEL SAFE
+    """)
+    op.execute("ALTER TABLE iocs ADD COLUMN IF NOT EXISTS reversed_domain VARCHAR(255)")
+    op.execute("""
+        CREATE OR REPLACE FUNCTION iocs_set_reversed_domain() RETURNS trigger AS $$
+        BEGIN
+            IF EXISTS (SELECT 1 FROM ioc_types t WHERE t.id = NEW.type_id AND t.name = 'domain') THEN
+                NEW.reversed_domain := reverse_domain_labels(NEW.value);
+            ELSE
+                NEW.reversed_domain := NULL;
+            END IF;
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("DROP TRIGGER IF EXISTS iocs_reversed_domain ON iocs")
+    op.execute("""
+        CREATE TRIGGER iocs_reversed_domain BEFORE INSERT OR UPDATE OF type_id, value ON iocs
+        FOR EACH ROW EXECUTE FUNCTION iocs_set_reversed_domain()
+    """)
+    op.execute("""
+        UPDATE iocs SET reversed_domain = reverse_domain_labels(value)
+        WHERE reversed_domain IS NULL
+        AND type_id IN (SELECT id FROM ioc_types WHERE name = 'domain')
+    """)
+    # text_pattern_ops serves both = ANY(parent keys) and LIKE 'com.example.%' subdomain scans
+    op.execute("""
+        CREATE INDEX IF NOT EXISTS ix_iocs_reversed_domain ON iocs
+        (reversed_domain text_pattern_ops) WHERE reversed_domain IS NOT NULL
+    """)
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS ix_iocs_reversed_domain")
+    op.execute("DROP TRIGGER IF EXISTS iocs_reversed_domain ON iocs")
+    op.execute("DROP FUNCTION IF EXISTS iocs_set_reversed_domain()")
+    op.execute("ALTER TABLE iocs DROP COLUMN IF EXISTS reversed_domain")
+    op.execute("DROP FUNCTION IF EXISTS reverse_domain_labels(TEXT)")
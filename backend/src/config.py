@@ -1,10 +1,13 @@
+from pydantic import model_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from pathlib import Path
 from functools import lru_cache
-from typing import List
+from typing import List, Literal, Optional
 
 class Settings(BaseSettings):
     database_url: str
+    # Direct connection for LISTEN when database_url points at pgbouncer
+    database_listen_url: Optional[str] = None
     api_host: str
     api_port: int
     environment: str = "development"
@@ -14,6 +17,48 @@ class Settings(BaseSettings):
         "http://localhost:4200",
         "http://127.0.0.1:4200",
     ]
+    ioc_type_cache_ttl: int = 300
+    bulk_ingest_chunk_size: int = 10000
+    bulk_ingest_max_errors: int = 100
+    bulk_ingest_max_line_length: int = 1024 * 1024
+    ioc_cache_enabled: bool = True
+    ioc_cache_backend: str = "local"
+    ioc_cache_max_entries: int = 100_000
+    ioc_cache_ttl: int = 300
+    ioc_cache_negative_ttl: int = 60
+    ioc_change_notifications: bool = True
+    ioc_bloom_enabled: bool = True
+    ioc_bloom_capacity: int = 1_000_000
+    ioc_bloom_error_rate: float = 0.001
+    ioc_bloom_path: Optional[str] = None
+    cpu_offload_executor: str = "process"
+    cpu_offload_workers: int = 2
+    cpu_offload_threshold: int = 2000
+    relationship_graph_index_enabled: bool = False
+    ioc_network_index_enabled: bool = False
+    ip_lookup_max_addresses: int = 1000
+    extract_max_bytes: int = 16 * 1024 * 1024
+    extract_offload_min_bytes: int = 64 * 1024
+    fast_json_responses: bool = False
+    sighting_buffer_enabled: bool = True
+    sighting_flush_interval: float = 5.0
+    sighting_buffer_max_entries: int = 50_000
+    log_level: str = "INFO"
+    log_json: bool = False
+    request_query_stats: bool = True
+    slow_query_threshold_ms: int = 500
+    metrics_enabled: bool = True
+    # Defaults to "production" when environment is production, else "development"
+    db_pool_preset: Optional[Literal["development", "production"]] = None
+    db_pool_size: Optional[int] = None
+    db_max_overflow: Optional[int] = None
+    db_pool_timeout: Optional[float] = None
+    db_pool_recycle: Optional[int] = None
+    db_pool_pre_ping: Optional[bool] = None
+    db_pool_warmup: bool = True
+    db_statement_cache_size: int = 100
+    db_prepared_statement_cache_size: int = 100
+    db_pgbouncer: bool = False
 
     model_config  =SettingsConfigDict(
         env_file=Path(__file__).resolve().parents[2] / ".env",
@@ -21,6 +66,22 @@ class Settings(BaseSettings):
         extra="ignore"
     )
 
+    @property
+    def listen_unavailable(self) -> bool:
+        """LISTEN through pgbouncer's transaction pooling silently receives nothing"""
+        return self.db_pgbouncer and not self.database_listen_url
+
+    @model_validator(mode="after")
+    def _disable_change_event_consumers(self) -> "Settings":
+        # Without change events every worker's cache and indexes would go stale unnoticed
+        if self.listen_unavailable or not self.ioc_change_notifications:
+            self.ioc_change_notifications = False
+            self.ioc_cache_enabled = False
+            self.ioc_bloom_enabled = False
+            self.relationship_graph_index_enabled = False
+            self.ioc_network_index_enabled = False
+        return self
+
     @property
     def debug(self) -> bool:
         return self.environment == "development"
@@ -1,15 +1,88 @@
+import asyncio
+import logging
+import time
+import uuid
+
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
-from src.config import get_settings
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, QueuePool
+from src.config import Settings, get_settings
+from src.utils.metrics import db_pool_checkout_duration, db_pool_timeouts_total
+
+logger = logging.getLogger(__name__)
 
 settings = get_settings()
 
+# Per worker, so pool_size + max_overflow times the worker count must stay below max_connections.
+# production skips pre-ping (a round trip per checkout) and relies on recycling instead
+POOL_PRESETS = {
+    "development": {
+        "pool_size": 5, "max_overflow": 10, "pool_timeout": 30, "pool_recycle": 300, "pool_pre_ping": True,
+    },
+    "production": {
+        "pool_size": 20, "max_overflow": 10, "pool_timeout": 5, "pool_recycle": 1800, "pool_pre_ping": False,
+    },
+}
+
+class TimedCheckoutMixin:
+    """Records how long each pool checkout takes"""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            db_pool_timeouts_total.inc()
+            raise
+        finally:
+            db_pool_checkout_duration.observe(time.perf_counter() - started)
+
+class TimedQueuePool(TimedCheckoutMixin, AsyncAdaptedQueuePool):
+    pass
+
+class TimedNullPool(TimedCheckoutMixin, NullPool):
+    pass
+
+# SQLAlchemy names pool loggers after the pool class, keep these as quiet as the stock pools
+for pool_class in (TimedQueuePool, TimedNullPool):
+    logging.getLogger(f"{__name__}.{pool_class.__name__}").setLevel(logging.WARNING)
+
+def _prepared_statement_name() -> str:
+    return f"__asyncpg_{uuid.uuid4()}__"
+
+def pool_options(settings: Settings) -> dict:
+    """The preset's pool options with any explicit db_* settings applied over them"""
+    preset = settings.db_pool_preset or ("production" if settings.environment == "production" else "development")
+    options = dict(POOL_PRESETS[preset])
+    for key in options:
+        value = getattr(settings, f"db_{key}")
+        if value is not None:
+            options[key] = value
+    return options
+
+def engine_options(settings: Settings) -> dict:
+    connect_args = {
+        "statement_cache_size": settings.db_statement_cache_size,
+        "prepared_statement_cache_size": settings.db_prepared_statement_cache_size,
+    }
+    if settings.db_pgbouncer:
+        # Transaction pooling hands each transaction to any server connection, so statements
+        # must not be cached or named per client connection. pgbouncer owns the pooling,
+        # a client-side pool would only pile up prepared statements on server connections
+        connect_args.update(
+            statement_cache_size=0,
+            prepared_statement_cache_size=0,
+            prepared_statement_name_func=_prepared_statement_name,
+        )
+        return {"poolclass": TimedNullPool, "connect_args": connect_args}
+    return {"poolclass": TimedQueuePool, "connect_args": connect_args, **pool_options(settings)}
+
 # Async engine
 engine = create_async_engine(
     settings.database_url.replace("postgresql://", "postgresql+asyncpg://"),
-    pool_pre_ping=True,
-    pool_recycle=300,
+    **engine_options(settings),
 )
 
 AsyncSessionLocal = sessionmaker(
@@ -22,4 +95,23 @@ Base = declarative_base()
 
 async def get_db():
     async with AsyncSessionLocal() as session:
-        yield session
\ No newline at end of file
+        yield session
+
+async def warm_up_pool() -> int:
+    """Open pool_size connections up front so the first requests do not pay for connecting"""
+    pool = engine.sync_engine.pool
+    if not isinstance(pool, QueuePool):
+        return 0
+    # All held at once, otherwise the same pooled connection would be handed out each time
+    results = await asyncio.gather(
+        *(engine.connect().start() for _ in range(pool.size())), return_exceptions=True
+    )
+    opened = [result for result in results if not isinstance(result, BaseException)]
+    for connection in opened:
+        await connection.close()
+    if len(opened) < len(results):
+        logger.warning(
+            "Database pool warm-up opened %d of %d connections", len(opened), len(results),
+            exc_info=next(result for result in results if isinstance(result, BaseException))
+        )
+    return len(opened)
@@ -31,11 +31,35 @@ class IOCNotFoundException(ThreatSysException):
     def __init__(self, field: str, value: str):
         super().__init__(f"IOC with {field} '{value}' not found", 404)
 
+class IOCExistsException(ThreatSysException):
+    def __init__(self, value_hash: str):
+        super().__init__(f"IOC with hash {value_hash} already exists", 400)
+
+class InvalidIOCValueException(ThreatSysException):
+    def __init__(self, detail: str):
+        super().__init__(f"Invalid IOC value: {detail}", 400)
+
+class InvalidCursorException(ThreatSysException):
+    def __init__(self, cursor: str):
+        super().__init__(f"Invalid pagination cursor '{cursor}'", 400)
+
+class InvalidBulkPayloadException(ThreatSysException):
+    def __init__(self, detail: str):
+        super().__init__(f"Invalid bulk IOC payload: {detail}", 400)
+
+class InvalidIPAddressException(ThreatSysException):
+    def __init__(self, value: str):
+        super().__init__(f"Invalid IP address '{value}'", 400)
+
+class GraphIndexUnavailableException(ThreatSysException):
+    def __init__(self):
+        super().__init__("Relationship graph index is disabled or still building", 503)
+
 async def threatsys_exception_handler(request: Request, exc: ThreatSysException):
     logger.error(
         "ThreatSys exception occurred",
         extra={
-            "message": exc.message,
+            "error_message": exc.message,
             "status_code": exc.status_code,
             "path": request.url.path,
             "method": request.method,
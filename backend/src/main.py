@@ -1,19 +1,84 @@
+import logging
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from src.config import get_settings
-from src.routers import organizations, users, iocs
+from src.database import AsyncSessionLocal, engine, warm_up_pool
+from src.routers import organizations, users, iocs, relationships, metrics
 from src.exceptions import setup_handlers
+from src.utils.bloom_filter import ioc_bloom_index
+from src.utils.cpu_offload import shutdown_executor
+from src.utils.graph_index import relationship_graph_index
+from src.utils.ioc_change_notifier import ioc_change_listener, relationship_change_listener
+from src.utils.ioc_type_registry import ioc_type_registry
+from src.utils.lookup_cache import ioc_lookup_cache
+from src.utils.log_format import configure_logging
+from src.utils.loop_monitor import loop_lag_monitor
+from src.utils.metrics import MetricsMiddleware
+from src.utils.network_index import ioc_network_index
+from src.utils.pagination import NEXT_CURSOR_HEADER
+from src.utils.query_stats import QueryStatsMiddleware, install_query_hooks
+from src.utils.sighting_buffer import sighting_buffer
 
 settings = get_settings()
+configure_logging(settings.log_level, settings.log_json)
+logger = logging.getLogger(__name__)
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    async with AsyncSessionLocal() as db:
+        await ioc_type_registry.load(db)
+    if settings.db_pool_warmup:
+        logger.info("Opened %d database connections", await warm_up_pool())
+    if settings.listen_unavailable:
+        logger.warning(
+            "DB_PGBOUNCER is set without DATABASE_LISTEN_URL: change notifications, the IOC lookup cache, "
+            "bloom filter, relationship graph index and network index are disabled"
+        )
+    elif not settings.ioc_change_notifications:
+        logger.warning(
+            "IOC_CHANGE_NOTIFICATIONS is off: the IOC lookup cache, bloom filter, relationship graph index "
+            "and network index are disabled"
+        )
+    ioc_change_listener.subscribe(ioc_lookup_cache.on_ioc_changes)
+    ioc_change_listener.start()
+    if settings.ioc_bloom_enabled:
+        ioc_change_listener.subscribe(ioc_bloom_index.on_ioc_changes)
+        ioc_bloom_index.start()
+    if settings.relationship_graph_index_enabled:
+        relationship_change_listener.subscribe(relationship_graph_index.on_relationship_changes)
+        relationship_change_listener.start()
+        relationship_graph_index.start()
+    if settings.ioc_network_index_enabled:
+        ioc_change_listener.subscribe(ioc_network_index.on_ioc_changes)
+        ioc_network_index.start()
+    if settings.sighting_buffer_enabled:
+        sighting_buffer.start()
+    loop_lag_monitor.start()
+    yield
+    await sighting_buffer.stop()
+    await loop_lag_monitor.stop()
+    await ioc_network_index.stop()
+    await relationship_graph_index.stop()
+    await relationship_change_listener.stop()
+    await ioc_bloom_index.stop()
+    await ioc_change_listener.stop()
+    shutdown_executor()
+
+app = FastAPI(lifespan=lifespan)
+if settings.request_query_stats:
+    install_query_hooks(engine)
+    app.add_middleware(QueryStatsMiddleware)
+if settings.metrics_enabled:
+    app.add_middleware(MetricsMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=settings.cors_origins,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, "Server-Timing"],
 )
 
 setup_handlers(app)
@@ -21,7 +86,10 @@ setup_handlers(app)
 app.include_router(organizations.router, prefix="/organizations", tags=["Organizations"])
 app.include_router(users.router, prefix="/users", tags=["Users"])
 app.include_router(iocs.router, prefix="/iocs", tags=["IOCs"])
+app.include_router(relationships.router, prefix="/relationships", tags=["Relationships"])
+if settings.metrics_enabled:
+    app.include_router(metrics.router, tags=["Metrics"])
 
 @app.get("/healthy")
 async def root():
-    return {"message": "Welcome to Threatsys API"}
+    return {"message": "Welcome to Threatsys API", "loop_lag": loop_lag_monitor.stats()}
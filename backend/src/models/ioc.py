@@ -1,5 +1,5 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey
-from sqlalchemy.dialects.postgresql import UUID, JSONB
+from sqlalchemy import Column, BigInteger, Integer, String, DateTime, Boolean, ForeignKey, Index
+from sqlalchemy.dialects.postgresql import INET, UUID, JSONB
 from sqlalchemy.ext.mutable import MutableDict
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -14,13 +14,18 @@ class IOC(Base):
     type_id = Column(Integer, ForeignKey("ioc_types.id"), nullable=False)
 
     value = Column(String(255), nullable=False)
-    value_hash = Column(String(64), nullable=False, index=True)
+    value_hash = Column(String(128), nullable=False, index=True)
+    # Set by a trigger from value for address and CIDR types, see migration 0009
+    network = Column(INET)
+    # Labels in reverse order for domain IOCs ('com.example.cdn'), set by a trigger, see migration 0010
+    reversed_domain = Column(String(255))
 
     tlp_level = Column(String(20), default='WHITE')
     metadata_ = Column("metadata", MutableDict.as_mutable(JSONB), default=dict)
 
     received_at = Column(DateTime(timezone=True), server_default=func.now())
     last_seen = Column(DateTime(timezone=True), server_default=func.now())
+    sighting_count = Column(BigInteger, nullable=False, server_default="1")
 
     active = Column(Boolean, nullable=False, default=True)
 
@@ -28,6 +33,27 @@ class IOC(Base):
     created_by = Column(UUID(as_uuid=True), ForeignKey("users.id"))
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    # change_xid (xid8) is maintained by the database for delta sync, see migration 0007
+
+    __table_args__ = (
+        Index("uq_iocs_type_id_value_hash", "type_id", "value_hash", unique=True),
+        Index("ix_iocs_created_at_id", created_at.desc(), id.desc()),
+        Index("ix_iocs_type_id_created_at_id", type_id, created_at.desc(), id.desc()),
+        Index(
+            "ix_iocs_value_trgm", value,
+            postgresql_using="gin", postgresql_ops={"value": "gin_trgm_ops"}
+        ),
+        Index(
+            "ix_iocs_network", network,
+            postgresql_using="gist", postgresql_ops={"network": "inet_ops"},
+            postgresql_where=network.isnot(None)
+        ),
+        Index(
+            "ix_iocs_reversed_domain", reversed_domain,
+            postgresql_ops={"reversed_domain": "text_pattern_ops"},
+            postgresql_where=reversed_domain.isnot(None)
+        ),
+    )
     
     ioc_type = relationship("IOCType", back_populates="iocs")
     source_organization = relationship(
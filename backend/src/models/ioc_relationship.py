@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index
 from sqlalchemy.dialects.postgresql import UUID, JSONB
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -16,6 +16,15 @@ class IOCRelationship(Base):
     first_observed = Column(DateTime(timezone=True), server_default=func.now())
     last_observed = Column(DateTime(timezone=True), server_default=func.now())
     metadata_ = Column("metadata", JSONB, default={})
+
+    __table_args__ = (
+        Index("ix_ioc_relationships_source_id", "source_id"),
+        Index("ix_ioc_relationships_target_id", "target_id"),
+        Index(
+            "uq_ioc_relationships_source_target_type",
+            "source_id", "target_id", "relationship_type", unique=True
+        ),
+    )
     
     source_ioc = relationship("IOC", foreign_keys=[source_id], back_populates="source_relationships")
     target_ioc = relationship("IOC", foreign_keys=[target_id], back_populates="target_relationships")
\ No newline at end of file
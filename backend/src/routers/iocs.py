@@ -1,42 +1,172 @@
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List, Optional, Dict
+from typing import AsyncIterator, List, Optional, Dict
+import ipaddress
 import uuid
 
+from src.config import get_settings
+from src.database import AsyncSessionLocal
 from src.dependencies import get_database
+from src.exceptions import InvalidBulkPayloadException, InvalidIPAddressException
 from src.services.ioc_service import IOCService
+from src.services.relationship_service import RelationshipService
+from src.schemas.ioc_type import IOCTypeResponse
+from src.schemas.ioc_relationship import IOCGraphResponse, IOCPathResponse
 from src.schemas.ioc import (
-    IOCCreate, IOCUpdate, IOCSearchParams, IOCResponse, IOCDetailResponse, IOCLookupByValue
+    IOCCreate, IOCUpdate, IOCSearchParams, IOCResponse, IOCDetailResponse, IOCLookupByValue,
+    IOCBulkResponse, IOCSimilarityResponse, IOCNetworkMatchResponse, IOCExtractMatch, IOCExtractResponse
 )
+from src.utils.bloom_filter import ioc_bloom_index
+from src.utils.fast_json import ORJSONRowResponse
+from src.utils.graph_index import relationship_graph_index
+from src.utils.ioc_export import EXPORT_MEDIA_TYPES, ExportFormat, encode_changes, encode_export
+from src.utils.ioc_feed_parser import FeedRecord, aiter_records, iter_csv, iter_ndjson, parse_json_array
+from src.utils.ioc_type_registry import ioc_type_registry
+from src.utils.lookup_cache import ioc_lookup_cache
+from src.utils.network_index import IPAddress, ioc_network_index
+from src.utils.pagination import NEXT_CURSOR_HEADER, decode_sync_token, encode_cursor
 
 router = APIRouter()
 
+def _to_ioc_response(ioc) -> IOCResponse:
+    return IOCResponse(
+        id=ioc.id,
+        value=ioc.value,
+        value_hash=ioc.value_hash,
+        tlp_level=ioc.tlp_level,
+        active=ioc.active,
+        source_organization=ioc.source_organization.name if ioc.source_organization else None,
+        creator=ioc.creator.email if ioc.creator else None,
+        last_seen=ioc.last_seen,
+        ioc_type=ioc.ioc_type
+    )
+
+def _row_to_response(row) -> IOCResponse:
+    """Build an IOCResponse from a IOCService slim projection row"""
+    return IOCResponse(
+        id=row.id,
+        value=row.value,
+        value_hash=row.value_hash,
+        tlp_level=row.tlp_level,
+        active=row.active,
+        source_organization=row.source_organization,
+        creator=row.creator,
+        last_seen=row.last_seen,
+        ioc_type=IOCTypeResponse(id=row.type_id, name=row.type_name, category=row.type_category)
+    )
+
+def _row_to_dict(row) -> dict:
+    """The IOCResponse shape of a slim projection row as a plain dict, for ORJSONRowResponse"""
+    return {
+        "id": row.id,
+        "value": row.value,
+        "value_hash": row.value_hash,
+        "tlp_level": row.tlp_level,
+        "active": row.active,
+        "source_organization": row.source_organization,
+        "creator": row.creator,
+        "last_seen": row.last_seen,
+        "ioc_type": {"id": row.type_id, "name": row.type_name, "category": row.type_category},
+    }
+
+def _list_response(response: Response, rows: list, limit: int):
+    """IOCResponse list for a page of slim rows, or pre-serialized bytes in fast JSON mode"""
+    _set_next_cursor(response, rows, limit)
+    if get_settings().fast_json_responses:
+        # A returned Response bypasses the injected one, so carry its headers over
+        return ORJSONRowResponse([_row_to_dict(row) for row in rows], headers=response.headers)
+    return [_row_to_response(row) for row in rows]
+
+def _split_types(types: Optional[List[str]]) -> List[str]:
+    """Relationship types given as repeated and/or comma-separated query values"""
+    return [t.strip() for value in types or [] for t in value.split(",") if t.strip()]
+
+def _set_next_cursor(response: Response, iocs: list, limit: int) -> None:
+    """Expose the keyset cursor of a full page so clients can pass it back as `after`"""
+    if len(iocs) == limit:
+        last = iocs[-1]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(last.created_at, last.id)
+
+async def request_records(request: Request) -> AsyncIterator[FeedRecord]:
+    """Records from a JSON array body, or a streamed NDJSON / CSV body, by content type"""
+    max_line_length = get_settings().bulk_ingest_max_line_length
+    content_type = request.headers.get("content-type", "application/json").split(";")[0].strip()
+    if content_type in ("application/x-ndjson", "application/ndjson", "application/jsonl"):
+        return iter_ndjson(request.stream(), max_line_length)
+    if content_type in ("text/csv", "application/csv"):
+        return iter_csv(request.stream(), max_line_length)
+    if content_type == "application/json":
+        try:
+            return aiter_records(parse_json_array(await request.body()))
+        except ValueError as e:
+            raise InvalidBulkPayloadException(str(e))
+    raise InvalidBulkPayloadException(f"unsupported content type {content_type}")
+
 @router.get("/", response_model=List[IOCResponse])
 async def get_iocs(
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=100),
     active: Optional[bool] = Query(None),
     tlp_level: Optional[str] = Query(None),
     type_id: Optional[int] = Query(None),
+    after: Optional[str] = Query(None),
     db: AsyncSession = Depends(get_database)
 ):
-    """Get all IOCs with pagination and filtering"""
+    """Get all IOCs with cursor pagination and filtering"""
     ioc_service = IOCService(db)
-    iocs = await ioc_service.get_iocs(skip=skip, limit=limit, active=active, tlp_level=tlp_level, type_id=type_id)
-    return [
-        IOCResponse(
-            id=ioc.id,
-            value=ioc.value,
-            value_hash=ioc.value_hash,
-            tlp_level=ioc.tlp_level,
-            active=ioc.active,
-            source_organization=ioc.source_organization.name if ioc.source_organization else None,
-            creator=ioc.creator.email if ioc.creator else None,
-            last_seen=ioc.last_seen,
-            ioc_type=ioc.ioc_type
-        )
-        for ioc in iocs
-    ]
+    iocs = await ioc_service.get_iocs(
+        skip=skip, limit=limit, active=active, tlp_level=tlp_level, type_id=type_id, after=after
+    )
+    return _list_response(response, iocs, limit)
+
+@router.get("/export")
+async def export_iocs(
+    search: IOCSearchParams = Depends(),
+    export_format: ExportFormat = Query(ExportFormat.NDJSON, alias="format"),
+    db: AsyncSession = Depends(get_database)
+):
+    """Stream every IOC matching the search filters as NDJSON, CSV or a STIX 2.1 bundle"""
+    ioc_service = IOCService(db)
+    statement = await ioc_service.build_export_statement(search)
+    await ioc_type_registry.refresh_if_stale(db)
+    type_names = {type_id: entry.name for type_id, entry in ioc_type_registry.all().items()}
+
+    async def generate():
+        # The request-scoped session is closed before the body is streamed, use a dedicated one
+        async with AsyncSessionLocal() as export_db:
+            batches = IOCService(export_db).stream_export_rows(statement)
+            async for chunk in encode_export(export_format, batches, type_names):
+                yield chunk
+
+    extension = "json" if export_format == ExportFormat.STIX else export_format.value
+    return StreamingResponse(
+        generate(),
+        media_type=EXPORT_MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f'attachment; filename="iocs.{extension}"'},
+    )
+
+@router.get("/changes")
+async def get_ioc_changes(
+    since: Optional[str] = Query(None),
+    limit: int = Query(10000, ge=1, le=50000),
+    db: AsyncSession = Depends(get_database)
+):
+    """Stream IOC upserts and deletes since a sync token as NDJSON, ending with the next token"""
+    after_xid, after_id = decode_sync_token(since) if since else (0, uuid.UUID(int=0))
+    ioc_service = IOCService(db)
+    watermark = await ioc_service.get_sync_watermark()
+    await ioc_type_registry.refresh_if_stale(db)
+    type_names = {type_id: entry.name for type_id, entry in ioc_type_registry.all().items()}
+
+    async def generate():
+        async with AsyncSessionLocal() as sync_db:
+            batches = IOCService(sync_db).stream_changes(after_xid, after_id, watermark, limit)
+            async for chunk in encode_changes(batches, type_names, limit, watermark):
+                yield chunk
+
+    return StreamingResponse(generate(), media_type=EXPORT_MEDIA_TYPES[ExportFormat.NDJSON])
 
 @router.get("/{ioc_id}", response_model=IOCDetailResponse)
 async def get_ioc(ioc_id: uuid.UUID, db: AsyncSession = Depends(get_database)):
@@ -54,15 +184,54 @@ async def get_ioc(ioc_id: uuid.UUID, db: AsyncSession = Depends(get_database)):
             created_at=ioc.created_at,
             updated_at=ioc.updated_at,
             last_seen=ioc.last_seen,
+            sighting_count=ioc.sighting_count,
             received_at=ioc.received_at,
             ioc_type=ioc.ioc_type
         )
 
+@router.get("/{ioc_id}/graph", response_model=IOCGraphResponse)
+async def get_ioc_graph(
+    ioc_id: uuid.UUID,
+    depth: int = Query(2, ge=1, le=6),
+    min_confidence: int = Query(0, ge=0, le=100),
+    types: Optional[List[str]] = Query(None),
+    max_nodes: int = Query(500, ge=1, le=5000),
+    db: AsyncSession = Depends(get_database)
+):
+    """Related IOCs up to `depth` hops away, with the edges between them"""
+    service = RelationshipService(db)
+    return await service.get_graph(ioc_id, depth, min_confidence, _split_types(types), max_nodes)
+
+@router.get("/{ioc_id}/path/{target_id}", response_model=IOCPathResponse)
+async def get_ioc_path(
+    ioc_id: uuid.UUID,
+    target_id: uuid.UUID,
+    max_depth: int = Query(6, ge=1, le=12),
+    min_confidence: int = Query(0, ge=0, le=100),
+    types: Optional[List[str]] = Query(None),
+    db: AsyncSession = Depends(get_database)
+):
+    """Shortest relationship path between two IOCs (requires the graph index)"""
+    service = RelationshipService(db)
+    return await service.get_path(ioc_id, target_id, max_depth, min_confidence, _split_types(types))
+
 @router.post("/", response_model=IOCResponse, status_code=201)
 async def create_ioc(ioc_data: IOCCreate, db: AsyncSession = Depends(get_database)):
     """Create a new IOC"""
     ioc_service = IOCService(db)
-    return await ioc_service.create_ioc(ioc_data)
+    ioc = await ioc_service.create_ioc(ioc_data, ioc_data.created_by)
+    return _to_ioc_response(await ioc_service.get_ioc(ioc.id))
+
+@router.post("/bulk", response_model=IOCBulkResponse)
+async def bulk_create_iocs(
+    request: Request,
+    created_by: uuid.UUID = Query(...),
+    db: AsyncSession = Depends(get_database)
+):
+    """Bulk upsert IOCs from a JSON array, or a streamed NDJSON / CSV body"""
+    records = await request_records(request)
+    ioc_service = IOCService(db)
+    return await ioc_service.bulk_ingest(records, created_by)
 
 @router.put("/{ioc_id}", response_model=IOCResponse)
 async def update_ioc(
@@ -72,7 +241,8 @@ async def update_ioc(
 ):
     """Update an IOC"""
     ioc_service = IOCService(db)
-    return await ioc_service.update_ioc(ioc_id, ioc_data)
+    ioc = await ioc_service.update_ioc(ioc_id, ioc_data)
+    return _to_ioc_response(await ioc_service.get_ioc(ioc.id))
 
 @router.delete("/{ioc_id}", status_code=204)
 async def delete_ioc(ioc_id: uuid.UUID, db: AsyncSession = Depends(get_database)):
@@ -82,31 +252,145 @@ async def delete_ioc(ioc_id: uuid.UUID, db: AsyncSession = Depends(get_database)
 
 @router.get("/search/", response_model=List[IOCResponse])
 async def search_iocs(
+    response: Response,
     search: IOCSearchParams = Depends(),
-    skip: int = Query(100, ge=0),
+    skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=100),
+    after: Optional[str] = Query(None),
     db: AsyncSession = Depends(get_database)
 ):
     """Search IOCs by value"""
     ioc_service = IOCService(db)
-    return await ioc_service.search_iocs(params=search, skip=skip, limit=limit)
+    iocs = await ioc_service.search_iocs(params=search, skip=skip, limit=limit, after=after)
+    return _list_response(response, iocs, limit)
+
+@router.get("/similar/", response_model=List[IOCSimilarityResponse])
+async def similar_iocs(
+    value: str = Query(..., min_length=3),
+    threshold: float = Query(0.3, gt=0, le=1),
+    type_id: Optional[int] = Query(None),
+    limit: int = Query(50, ge=1, le=100),
+    db: AsyncSession = Depends(get_database)
+):
+    """Ranked fuzzy matches by trigram similarity, e.g. for typosquat domain hunting"""
+    ioc_service = IOCService(db)
+    matches = await ioc_service.similar_iocs(value, threshold=threshold, type_id=type_id, limit=limit)
+    if get_settings().fast_json_responses:
+        return ORJSONRowResponse([{**_row_to_dict(row), "similarity": row.similarity} for row in matches])
+    return [
+        IOCSimilarityResponse(**_row_to_response(row).model_dump(), similarity=row.similarity)
+        for row in matches
+    ]
+
+def _parse_addresses(values: List[str]) -> Dict[str, IPAddress]:
+    addresses = {}
+    for value in values:
+        try:
+            addresses[value] = ipaddress.ip_address(value.strip())
+        except ValueError:
+            raise InvalidIPAddressException(value)
+    return addresses
+
+def _network_match_response(row) -> IOCNetworkMatchResponse:
+    return IOCNetworkMatchResponse(**_row_to_response(row).model_dump(), network=str(row.network))
+
+@router.get("/ip-lookup/", response_model=List[IOCNetworkMatchResponse])
+async def ip_lookup(
+    ip: str = Query(...),
+    active: Optional[bool] = Query(None),
+    db: AsyncSession = Depends(get_database)
+):
+    """Stored addresses and CIDR ranges containing an IP address, most specific first"""
+    address = _parse_addresses([ip])[ip]
+    ioc_service = IOCService(db)
+    matches = await ioc_service.find_containing([address], active=active)
+    return [_network_match_response(row) for row in matches[address]]
+
+@router.post("/batch-ip-lookup", response_model=Dict[str, List[IOCNetworkMatchResponse]])
+async def batch_ip_lookup(
+    ips: List[str],
+    active: Optional[bool] = Query(None),
+    db: AsyncSession = Depends(get_database)
+):
+    """Containing addresses and CIDR ranges for each IP address, keyed by the address as sent"""
+    max_addresses = get_settings().ip_lookup_max_addresses
+    if len(ips) > max_addresses:
+        raise HTTPException(status_code=413, detail=f"At most {max_addresses} addresses per request")
+    addresses = _parse_addresses(ips)
+    ioc_service = IOCService(db)
+    matches = await ioc_service.find_containing(list(set(addresses.values())), active=active)
+    return {
+        value: [_network_match_response(row) for row in matches[address]]
+        for value, address in addresses.items()
+    }
 
-@router.get("/by-typed-value/{type_id}/{value}") # , response_model=IOCResponse
+async def _read_body(request: Request, max_bytes: int) -> bytes:
+    """The request body, refused with a 413 as soon as it grows past max_bytes"""
+    body = bytearray()
+    async for chunk in request.stream():
+        body += chunk
+        if len(body) > max_bytes:
+            raise HTTPException(status_code=413, detail=f"At most {max_bytes} bytes per request")
+    return bytes(body)
+
+@router.post("/extract-and-match", response_model=IOCExtractResponse)
+async def extract_and_match(
+    request: Request,
+    match_parents: bool = Query(False),
+    db: AsyncSession = Depends(get_database)
+):
+    """Find indicators in a raw text body and the stored IOCs they match, with byte offsets"""
+    data = await _read_body(request, get_settings().extract_max_bytes)
+    ioc_service = IOCService(db)
+    found, matches = await ioc_service.extract_and_match(data, match_parents=match_parents)
+    return IOCExtractResponse(
+        bytes_scanned=len(data),
+        candidates=len(found),
+        matches=[
+            IOCExtractMatch(type=key[0], value=key[1], offsets=found[key], ioc=_row_to_response(row))
+            for key, row in sorted(matches.items(), key=lambda item: found[item[0]][0])
+        ],
+    )
+
+@router.get("/by-typed-value/{type_id}/{value}", response_model=Optional[IOCResponse])
 async def get_ioc_by_typed_value(
     type_id: int,
     value: str,
+    match_parents: bool = Query(False),
     db: AsyncSession = Depends(get_database)
 ):
-    """Get IOC by value with type-aware hash computation"""
+    """Get IOC by value with type-aware hash computation, or the closest stored parent of a domain"""
     service = IOCService(db)
-    return await service.get_by_value(type_id, value)
+    row = await service.get_by_value(type_id, value, match_parents=match_parents)
+    return _row_to_response(row) if row is not None else None
+
+@router.get("/cache/stats")
+async def get_lookup_cache_stats():
+    """Hot IOC lookup cache counters for this worker"""
+    return ioc_lookup_cache.stats()
+
+@router.get("/graph-index/stats")
+async def get_graph_index_stats():
+    """Relationship graph index size and memory use for this worker"""
+    return relationship_graph_index.stats()
+
+@router.get("/network-index/stats")
+async def get_network_index_stats():
+    """In-process IP range index state for this worker"""
+    return ioc_network_index.stats()
+
+@router.get("/bloom/stats")
+async def get_bloom_filter_stats():
+    """Negative-lookup filter state for this worker"""
+    return ioc_bloom_index.stats()
 
 @router.post("/batch-lookup-typed", response_model=Dict[str, IOCResponse])
 async def batch_lookup_by_typed_values(
     lookups: List[IOCLookupByValue],
+    match_parents: bool = Query(False),
     db: AsyncSession = Depends(get_database)
 ):
-    """Batch lookup IOCs by values with type-aware hash computation"""
+    """Batch lookup IOCs by values with type-aware hash computation, optionally matching parent domains"""
     service = IOCService(db)
-    results = await service.batch_lookup_by_typed_values(lookups)
-    return results
\ No newline at end of file
+    results = await service.batch_lookup_by_values(lookups, match_parents=match_parents)
+    return {value: _row_to_response(row) for value, row in results.items()}
\ No newline at end of file
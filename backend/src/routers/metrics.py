@@ -0,0 +1,102 @@
+from fastapi import APIRouter, Response
+from sqlalchemy.pool import QueuePool
+
+from src.config import get_settings
+from src.database import engine
+from src.utils.bloom_filter import ioc_bloom_index
+from src.utils.graph_index import relationship_graph_index
+from src.utils.lookup_cache import ioc_lookup_cache
+from src.utils.loop_monitor import loop_lag_monitor
+from src.utils.metrics import CONTENT_TYPE, metrics_registry
+from src.utils.sighting_buffer import sighting_buffer
+
+router = APIRouter()
+
+def _pool_status():
+    pool = engine.sync_engine.pool
+    if not isinstance(pool, QueuePool):
+        return None
+    return [
+        (("size",), pool.size()),
+        (("checked_out",), pool.checkedout()),
+        (("checked_in",), pool.checkedin()),
+        (("overflow",), max(pool.overflow(), 0)),
+    ]
+
+def _cache_stats():
+    return ioc_lookup_cache.backend.stats if ioc_lookup_cache.enabled else None
+
+def _cache_lookups():
+    stats = _cache_stats()
+    if stats is None:
+        return None
+    return [(("hit",), stats.hits), (("negative_hit",), stats.negative_hits), (("miss",), stats.misses)]
+
+def _cache_removals():
+    stats = _cache_stats()
+    if stats is None:
+        return None
+    return [
+        (("eviction",), stats.evictions),
+        (("expiration",), stats.expirations),
+        (("invalidation",), stats.invalidations),
+    ]
+
+metrics_registry.callback(
+    "gauge", "threatsys_db_pool_connections", "SQLAlchemy pool connections by state",
+    _pool_status, ("state",)
+)
+metrics_registry.callback(
+    "counter", "threatsys_ioc_cache_lookups_total", "IOC lookup cache lookups by result",
+    _cache_lookups, ("result",)
+)
+metrics_registry.callback(
+    "counter", "threatsys_ioc_cache_removals_total", "IOC lookup cache entries dropped by reason",
+    _cache_removals, ("reason",)
+)
+metrics_registry.callback(
+    "gauge", "threatsys_ioc_cache_entries", "IOC lookup cache entries",
+    lambda: len(ioc_lookup_cache.backend) if ioc_lookup_cache.enabled else None
+)
+metrics_registry.callback(
+    "gauge", "threatsys_ioc_cache_hit_ratio", "IOC lookup cache hit ratio (including negative hits) since start",
+    lambda: ioc_lookup_cache.stats().get("hit_ratio")
+)
+metrics_registry.callback(
+    "gauge", "threatsys_ioc_bloom_ready", "1 once the IOC bloom filter has been built",
+    lambda: int(ioc_bloom_index.ready)
+)
+metrics_registry.callback(
+    "gauge", "threatsys_ioc_bloom_items", "Hashes added to the IOC bloom filter",
+    lambda: ioc_bloom_index.filter.count if ioc_bloom_index.filter is not None else None
+)
+metrics_registry.callback(
+    "counter", "threatsys_ioc_bloom_checks_total", "Hashes checked against the IOC bloom filter",
+    lambda: ioc_bloom_index.checks
+)
+metrics_registry.callback(
+    "counter", "threatsys_ioc_bloom_ruled_out_total", "Hashes the IOC bloom filter ruled out",
+    lambda: ioc_bloom_index.ruled_out
+)
+metrics_registry.callback(
+    "gauge", "threatsys_ioc_sightings_pending", "IOCs with re-sightings waiting for the next buffer flush",
+    lambda: len(sighting_buffer) if sighting_buffer.enabled else None
+)
+metrics_registry.callback(
+    "gauge", "threatsys_relationship_graph_edges", "Edges in the in-process relationship graph index",
+    lambda: relationship_graph_index.graph.live_edge_count if get_settings().relationship_graph_index_enabled else None
+)
+metrics_registry.callback(
+    "gauge", "threatsys_event_loop_lag_seconds", "Event loop lag, last sample and p99 / max over the window",
+    lambda: [
+        (("last",), loop_lag_monitor.last_lag),
+        (("p99",), loop_lag_monitor.stats()["p99_ms"] / 1000),
+        (("window_max",), loop_lag_monitor.stats()["window_max_ms"] / 1000),
+    ],
+    ("stat",)
+)
+
+@router.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    """Prometheus text exposition of this worker's metrics"""
+    return Response(metrics_registry.render(), media_type=CONTENT_TYPE)
@@ -0,0 +1,21 @@
+from fastapi import APIRouter, Depends, Query, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+import uuid
+
+from src.dependencies import get_database
+from src.services.relationship_service import RelationshipService
+from src.schemas.ioc_relationship import IOCRelationshipBulkResponse
+from src.routers.iocs import request_records
+
+router = APIRouter()
+
+@router.post("/bulk", response_model=IOCRelationshipBulkResponse)
+async def bulk_upsert_relationships(
+    request: Request,
+    created_by: uuid.UUID = Query(...),
+    db: AsyncSession = Depends(get_database)
+):
+    """Bulk upsert edges given as (type_id, value) endpoints, creating missing IOCs"""
+    records = await request_records(request)
+    service = RelationshipService(db)
+    return await service.bulk_ingest(records, created_by)
@@ -2,4 +2,5 @@ from .user import *
 from .organization import *
 from .role import *
 from .ioc import *
-from .ioc_type import *
\ No newline at end of file
+from .ioc_type import *
+from .ioc_relationship import *
\ No newline at end of file
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, ConfigDict
-from typing import Optional, Dict
+from typing import Optional, Dict, List, Tuple
 from datetime import datetime
 import uuid
 
@@ -43,6 +43,24 @@ class IOCResponse(BaseModel):
 
     model_config = ConfigDict(from_attributes=True)
 
+class IOCSimilarityResponse(IOCResponse):
+    similarity: float
+
+class IOCNetworkMatchResponse(IOCResponse):
+    network: str
+
+class IOCExtractMatch(BaseModel):
+    type: str
+    value: str
+    # (start, end) byte offsets into the request body, end exclusive
+    offsets: List[Tuple[int, int]]
+    ioc: IOCResponse
+
+class IOCExtractResponse(BaseModel):
+    bytes_scanned: int
+    candidates: int
+    matches: List[IOCExtractMatch]
+
 class IOCDetailResponse(BaseModel):
     id: uuid.UUID
     value: str
@@ -55,6 +73,7 @@ class IOCDetailResponse(BaseModel):
     created_at: datetime
     updated_at: datetime
     last_seen: datetime
+    sighting_count: int
     received_at: datetime
     ioc_type: IOCTypeResponse
 
@@ -64,6 +83,8 @@ class IOCSearchParams(BaseModel):
     value: Optional[str] = None
     value_hash: Optional[str] = None
     value_contains: Optional[str] = None
+    # A domain and all of its subdomains
+    within_domain: Optional[str] = None
     type_id: Optional[int] = None
     tlp_level: Optional[str] = None
     active: Optional[bool] = None
@@ -76,4 +97,17 @@ class IOCSearchParams(BaseModel):
 
 class IOCLookupByValue(BaseModel):
     type_id: int
-    value: str
\ No newline at end of file
+    value: str
+
+class IOCBulkError(BaseModel):
+    index: int
+    value: Optional[str] = None
+    detail: str
+
+class IOCBulkResponse(BaseModel):
+    inserted: int = 0
+    updated: int = 0
+    # Repeats of a record earlier in the same chunk, folded into that record
+    duplicates: int = 0
+    rejected: int = 0
+    errors: List[IOCBulkError] = []
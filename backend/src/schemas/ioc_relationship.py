@@ -0,0 +1,48 @@
+from pydantic import BaseModel
+from typing import List, Optional
+from datetime import datetime
+import uuid
+
+class IOCGraphNode(BaseModel):
+    id: uuid.UUID
+    value: str
+    value_hash: str
+    tlp_level: str
+    active: bool
+    type_id: int
+    type_name: str
+    depth: int
+
+class IOCGraphEdge(BaseModel):
+    id: uuid.UUID
+    source_id: uuid.UUID
+    target_id: uuid.UUID
+    relationship_type: str
+    confidence_score: Optional[int] = None
+    first_observed: Optional[datetime] = None
+    last_observed: Optional[datetime] = None
+
+class IOCGraphResponse(BaseModel):
+    root_id: uuid.UUID
+    depth: int
+    nodes: List[IOCGraphNode]
+    edges: List[IOCGraphEdge]
+    truncated: bool = False
+
+class IOCPathResponse(BaseModel):
+    source_id: uuid.UUID
+    target_id: uuid.UUID
+    found: bool
+    nodes: List[IOCGraphNode] = []
+    edges: List[IOCGraphEdge] = []
+
+class IOCRelationshipBulkError(BaseModel):
+    index: int
+    detail: str
+
+class IOCRelationshipBulkResponse(BaseModel):
+    iocs_created: int = 0
+    inserted: int = 0
+    updated: int = 0
+    rejected: int = 0
+    errors: List[IOCRelationshipBulkError] = []
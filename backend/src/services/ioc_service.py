@@ -1,15 +1,127 @@
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import joinedload
-from sqlalchemy import select
-from typing import Optional, List, Dict
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy import String, any_, bindparam, cast, column, or_, select, text, func, tuple_, Row
+from sqlalchemy.dialects.postgresql import ARRAY, CIDR, INET, JSONB, insert
+from sqlalchemy.exc import IntegrityError
+from typing import Optional, List, Dict, Any, AsyncIterator, Tuple
 from datetime import datetime
+import json
 import uuid
 
+from src.config import get_settings
 from src.models.ioc import IOC
-from src.schemas.ioc import IOCCreate, IOCUpdate, IOCSearchParams, IOCLookupByValue
-from src.exceptions import IOCNotFoundException
-from src.utils.ioc_utils import IOCUtils
+from src.models.ioc_relationship import IOCRelationship
+from src.models.ioc_type import IOCType
+from src.models.organization import Organization
+from src.models.user import User
+from src.schemas.ioc import (
+    IOCCreate, IOCUpdate, IOCSearchParams, IOCLookupByValue, IOCBulkError, IOCBulkResponse
+)
+from src.exceptions import IOCNotFoundException, IOCExistsException, InvalidIOCValueException
+from src.utils import cpu_offload
+from src.utils.bloom_filter import ioc_bloom_index
+from src.utils.graph_index import relationship_graph_index
+from src.utils.ioc_change_notifier import (
+    notify_ioc_changes, notify_relationship_changes, notify_staged_ioc_changes
+)
+from src.utils.ioc_extractor import Offsets
+from src.utils.ioc_feed_parser import FeedRecord, MalformedRecord, achunked
+from src.utils.ioc_utils import IOCTypeEnum, IOCUtils, parent_domain_keys, reverse_domain
+from src.utils.ioc_type_registry import ioc_type_registry
+from src.utils.pagination import decode_cursor
+from src.utils.sighting_buffer import sighting_buffer
 from src.utils.ioc_validator import IOCValidator
+from src.utils.lookup_cache import NEGATIVE, ioc_lookup_cache
+from src.utils.network_index import IPAddress, ioc_network_index
+from src.utils.metrics import ioc_ingest_total
+
+BULK_STAGING_COLUMNS = [
+    "type_id", "value", "value_hash", "tlp_level", "active", "metadata", "source_org_id"
+]
+
+CREATE_BULK_STAGING = text("""
+    CREATE TEMP TABLE ioc_bulk_staging (
+        type_id INTEGER NOT NULL,
+        value VARCHAR(255) NOT NULL,
+        value_hash VARCHAR(128) NOT NULL,
+        tlp_level VARCHAR(20) NOT NULL,
+        active BOOLEAN NOT NULL,
+        metadata JSONB NOT NULL,
+        source_org_id UUID
+    ) ON COMMIT DROP
+""")
+
+# New values are inserted and re-sightings bump last_seen, xmax = 0 only for inserted rows
+UPSERT_FROM_BULK_STAGING = text("""
+    WITH upserted AS (
+        INSERT INTO iocs (
+            type_id, value, value_hash, tlp_level, active, metadata, source_org_id, created_by
+        )
+        SELECT
+            s.type_id, s.value, s.value_hash, s.tlp_level, s.active, s.metadata, s.source_org_id,
+            :created_by
+        FROM ioc_bulk_staging s
+        ON CONFLICT (type_id, value_hash) DO UPDATE SET
+            last_seen = now(), sighting_count = iocs.sighting_count + 1
+        RETURNING (xmax = 0) AS inserted
+    )
+    SELECT
+        count(*) FILTER (WHERE inserted) AS inserted,
+        count(*) FILTER (WHERE NOT inserted) AS updated
+    FROM upserted
+""")
+
+# Every transaction below the snapshot's xmin has finished, so the changes it made are all
+# visible. Changes from newer, possibly still open transactions wait for the next sync
+SYNC_WATERMARK = text("SELECT pg_snapshot_xmin(pg_current_snapshot())::text::bigint")
+
+# Upserts and tombstones merged in (change_xid, id) order. xid8 has no range statistics, so each
+# side is limited on its own to keep its index scan ordered and stopping early
+CHANGES_SINCE = text("""
+    SELECT
+        op, xid::text::bigint AS change_xid, id, type_id, value, value_hash, tlp_level, active,
+        metadata, source_org_id, created_at, updated_at, last_seen, deleted_at
+    FROM (
+        (
+            SELECT
+                'upsert' AS op, i.change_xid AS xid, i.id, i.type_id, i.value, i.value_hash,
+                i.tlp_level, i.active, i.metadata, i.source_org_id, i.created_at, i.updated_at,
+                i.last_seen, NULL::timestamptz AS deleted_at
+            FROM iocs i
+            WHERE (i.change_xid, i.id) > (CAST(:after_xid AS text)::xid8, :after_id)
+              AND i.change_xid < CAST(:watermark AS text)::xid8
+            ORDER BY i.change_xid, i.id
+            LIMIT :limit
+        )
+        UNION ALL
+        (
+            SELECT
+                'delete', t.deleted_xid, t.id, t.type_id, NULL, t.value_hash,
+                NULL, NULL, NULL, NULL, NULL, NULL,
+                NULL, t.deleted_at
+            FROM ioc_tombstones t
+            WHERE (t.deleted_xid, t.id) > (CAST(:after_xid AS text)::xid8, :after_id)
+              AND t.deleted_xid < CAST(:watermark AS text)::xid8
+            ORDER BY t.deleted_xid, t.id
+            LIMIT :limit
+        )
+    ) changes
+    ORDER BY xid, id
+    LIMIT :limit
+""").columns(metadata=JSONB)
+
+def _parse_bool(value: Any) -> bool:
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, str) and value.strip().lower() in ("true", "1", "yes", "t"):
+        return True
+    if isinstance(value, str) and value.strip().lower() in ("false", "0", "no", "f"):
+        return False
+    raise ValueError(f"Invalid boolean: {value}")
+
+def _bulk_error_detail(error: Exception) -> str:
+    return f"Missing field {error}" if isinstance(error, KeyError) else str(error)
 
 class IOCService:
     def __init__(self, db: AsyncSession):
@@ -41,15 +153,9 @@ class IOCService:
         active: Optional[bool] = None,
         tlp_level: Optional[str] = None,
         type_id: Optional[int] = None,
-    ) -> List[IOC]:
-        statement = (
-            select(IOC)
-            .options(
-                joinedload(IOC.ioc_type),
-                joinedload(IOC.source_organization),
-                joinedload(IOC.creator)
-            )
-        )
+        after: Optional[str] = None,
+    ) -> List[Row]:
+        statement = self._slim_select()
 
         if active is not None:
             statement = statement.where(IOC.active == active)
@@ -60,51 +166,184 @@ class IOCService:
         if type_id is not None:
             statement = statement.where(IOC.type_id == type_id)
 
-        statement = statement.offset(skip).limit(limit)
+        statement = self._paginate(statement, skip, limit, after)
         result = await self.db.execute(statement)
-        return result.scalars().all()
+        return result.all()
+
+    @staticmethod
+    def _slim_select(*extra_columns):
+        """Flat column projection with exactly the fields IOCResponse needs
+
+        Returns plain rows instead of identity-mapped ORM objects, with the
+        type, source organization and creator resolved by a single join.
+        """
+        return (
+            select(
+                IOC.id,
+                IOC.value,
+                IOC.value_hash,
+                IOC.tlp_level,
+                IOC.active,
+                IOC.last_seen,
+                IOC.created_at,
+                IOC.type_id,
+                IOCType.name.label("type_name"),
+                IOCType.category.label("type_category"),
+                Organization.name.label("source_organization"),
+                User.email.label("creator"),
+                *extra_columns
+            )
+            .join(IOCType, IOC.type_id == IOCType.id)
+            .outerjoin(Organization, IOC.source_org_id == Organization.id)
+            .outerjoin(User, IOC.created_by == User.id)
+        )
+
+    @staticmethod
+    def _paginate(statement, skip: int, limit: int, after: Optional[str]):
+        """Order newest first and seek past the `after` cursor instead of scanning an offset"""
+        if after:
+            created_at, ioc_id = decode_cursor(after)
+            statement = statement.where(tuple_(IOC.created_at, IOC.id) < tuple_(created_at, ioc_id))
+        statement = statement.order_by(IOC.created_at.desc(), IOC.id.desc())
+        if skip:
+            statement = statement.offset(skip)
+        return statement.limit(limit)
 
-    async def get_by_value(self, type_id: int, value: str) -> Optional[IOC]:
+    async def get_by_value(self, type_id: int, value: str, match_parents: bool = False) -> Optional[Row]:
+        """Slim IOC row by typed value, for domains optionally the closest stored parent domain"""
         try:
-            _, value_hash = await self.validator.validate_and_normalize_ioc(type_id, value)
-            return await self.get_by_hash(value_hash)
+            normalized_value, value_hash = await self.validator.validate_and_normalize_ioc(type_id, value)
         except ValueError:
             return None
+        if match_parents and await self._is_domain_type(type_id):
+            row = (await self.lookup_parent_domains([normalized_value]))[normalized_value]
+            if row is None:
+                raise IOCNotFoundException('domain', normalized_value)
+            return row
+        return await self.get_by_hash(type_id, value_hash)
 
-    async def get_by_hash(self, value_hash: str) -> Optional[IOC]:
-        statement = (
-            select(IOC)
-            .options(
-                joinedload(IOC.ioc_type),
-                joinedload(IOC.source_organization),
-                joinedload(IOC.creator)
-            )
-            .where(IOC.value_hash == value_hash)
+    async def _is_domain_type(self, type_id: int) -> bool:
+        ioc_type = await self.validator.get_ioc_type_by_id(type_id)
+        return ioc_type is not None and ioc_type.name == IOCTypeEnum.DOMAIN
+
+    async def lookup_parent_domains(self, domains: List[str]) -> Dict[str, Optional[Row]]:
+        """Most specific stored domain IOC equal to or a parent of each normalized domain
+
+        Every candidate suffix of every domain is probed in one index scan of
+        iocs.reversed_domain.
+        """
+        keys = {domain: parent_domain_keys(domain) for domain in domains}
+        candidates = list({key for domain_keys in keys.values() for key in domain_keys})
+        if not candidates:
+            return {domain: None for domain in domains}
+        statement = self._slim_select(IOC.reversed_domain).where(
+            IOC.reversed_domain == any_(bindparam("domain_keys", candidates, type_=ARRAY(String)))
         )
-        result = await self.db.execute(statement)
-        ioc = result.scalars().first()
+        found = {row.reversed_domain: row for row in (await self.db.execute(statement)).all()}
+        return {
+            domain: next((found[key] for key in domain_keys if key in found), None)
+            for domain, domain_keys in keys.items()
+        }
 
-        if not ioc:
+    async def get_by_hash(self, type_id: int, value_hash: str) -> Row:
+        """Slim IOC row by type and value hash, served from the hot lookup cache when possible"""
+        if not ioc_bloom_index.might_contain(value_hash):
+            raise IOCNotFoundException('hash', str(value_hash))
+
+        found, row = ioc_lookup_cache.get(type_id, value_hash)
+        if not found:
+            generation = ioc_lookup_cache.generation
+            statement = self._slim_select().where(IOC.type_id == type_id, IOC.value_hash == value_hash)
+            result = await self.db.execute(statement)
+            row = result.first()
+            if row is None:
+                ioc_lookup_cache.set_negative(type_id, value_hash, generation)
+            else:
+                ioc_lookup_cache.set(type_id, value_hash, row, generation)
+
+        if row is None or row is NEGATIVE:
             raise IOCNotFoundException('hash', str(value_hash))
         
-        return ioc
+        return row
 
     async def search_iocs(
         self,
         params: IOCSearchParams,
         skip: int = 0,
-        limit: int = 100
-    ) -> List[IOC]:
+        limit: int = 100,
+        after: Optional[str] = None,
+    ) -> List[Row]:
+        statement = await self._apply_search_filters(self._slim_select(), params)
+        statement = self._paginate(statement, skip, limit, after)
+        result = await self.db.execute(statement)
+        return result.all()
+
+    async def similar_iocs(
+        self,
+        value: str,
+        threshold: float = 0.3,
+        type_id: Optional[int] = None,
+        limit: int = 50,
+    ) -> List[Row]:
+        """Fuzzy match IOC values by trigram similarity, best matches first"""
+        # The % operator uses the GIN index and filters on pg_trgm.similarity_threshold
+        await self.db.execute(
+            text("SELECT set_config('pg_trgm.similarity_threshold', :threshold, true)"),
+            {"threshold": str(threshold)}
+        )
+        similarity = func.similarity(IOC.value, value).label("similarity")
+        statement = self._slim_select(similarity).where(IOC.value.op("%")(value))
+        if type_id is not None:
+            statement = statement.where(IOC.type_id == type_id)
+        statement = statement.order_by(similarity.desc(), IOC.id).limit(limit)
+        result = await self.db.execute(statement)
+        return result.all()
+
+    async def find_containing(
+        self, addresses: List[IPAddress], active: Optional[bool] = None
+    ) -> Dict[IPAddress, List[Row]]:
+        """Every stored address or CIDR range containing each address, most specific first"""
+        network = cast(IOC.network, CIDR).label("network")
+        if ioc_network_index.ready:
+            matches = ioc_network_index.lookup_many(addresses)
+            ids = {ioc_id for ioc_ids in matches.values() for ioc_id in ioc_ids}
+            if not ids:
+                return {address: [] for address in addresses}
+            statement = self._slim_select(network).where(IOC.id.in_(ids))
+            if active is not None:
+                statement = statement.where(IOC.active == active)
+            rows = {row.id: row for row in (await self.db.execute(statement)).all()}
+            return {
+                address: [rows[ioc_id] for ioc_id in ioc_ids if ioc_id in rows]
+                for address, ioc_ids in matches.items()
+            }
+
+        # One GiST probe of network >>= address per input address
+        lookup = (
+            func.unnest(bindparam("addresses", addresses, type_=ARRAY(INET)))
+            .table_valued(column("address", INET))
+            .render_derived(name="lookup")
+        )
         statement = (
-            select(IOC)
+            self._slim_select(network, lookup.c.address)
+            .join(lookup, IOC.network.op(">>=")(lookup.c.address))
+            .order_by(func.masklen(IOC.network).desc(), IOC.id)
         )
+        if active is not None:
+            statement = statement.where(IOC.active == active)
+        results: Dict[IPAddress, List[Row]] = {address: [] for address in addresses}
+        for row in (await self.db.execute(statement)).all():
+            results[row.address].append(row)
+        return results
 
+    async def _apply_search_filters(self, statement, params: IOCSearchParams):
+        """Add the WHERE clauses for every IOCSearchParams field that is set"""
         if params.value:
             if not params.type_id:
                 raise ValueError("type_id is for type-aware looking")
             
             try:
-                normalized_value, value_hash = self.validator.validate_and_normalize_ioc(
+                normalized_value, value_hash = await self.validator.validate_and_normalize_ioc(
                     params.type_id, params.value
                 )
                 statement = statement.where(IOC.value_hash == value_hash)
@@ -114,11 +353,22 @@ class IOCService:
         if params.value_hash:
             statement = statement.where(IOC.value_hash == params.value_hash)
         if params.value_contains:
-            statement = statement.where(IOC.value.ilike(f"%{params.value_contains}%"))
+            # Served by the ix_iocs_value_trgm GIN index; wildcards in the input are literal
+            contains = (
+                params.value_contains.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            )
+            statement = statement.where(IOC.value.ilike(f"%{contains}%", escape="\\"))
+        if params.within_domain:
+            # A range on the text_pattern_ops index, unlike LIKE it does not depend on a literal prefix
+            key = reverse_domain(params.within_domain.strip().lower())
+            statement = statement.where(or_(
+                IOC.reversed_domain == key,
+                IOC.reversed_domain.op("~>=~")(key + ".") & IOC.reversed_domain.op("~<~")(key + "/"),
+            ))
         if params.type_id:
             statement = statement.where(IOC.type_id == params.type_id)
         if params.tlp_level:
-            statement = statement.where(IOC.tlp_level == params.tlp_level.value)
+            statement = statement.where(IOC.tlp_level == params.tlp_level)
         if params.active is not None:
             statement = statement.where(IOC.active == params.active)
         if params.source_org_id:
@@ -133,80 +383,163 @@ class IOCService:
             statement = statement.where(IOC.last_seen >= params.last_seen_after)
         if params.last_seen_before:
             statement = statement.where(IOC.last_seen < params.last_seen_before)
-        
-        statement = statement.options(
-            joinedload(IOC.ioc_type),
-            joinedload(IOC.source_organization),
-            joinedload(IOC.creator)
+        return statement
+
+    async def build_export_statement(self, params: IOCSearchParams):
+        """Column-only query for the export stream, filtered like search_iocs"""
+        statement = select(
+            IOC.id,
+            IOC.type_id,
+            IOC.value,
+            IOC.value_hash,
+            IOC.tlp_level,
+            IOC.active,
+            IOC.created_at,
+            IOC.last_seen,
         )
-        statement = statement.offset(skip).limit(limit)
-        result = await self.db.execute(statement)
-        return result.scalars().all()
+        statement = await self._apply_search_filters(statement, params)
+        return statement.order_by(IOC.created_at, IOC.id)
+
+    async def stream_export_rows(self, statement, batch_size: int = 1000) -> AsyncIterator[List[Row]]:
+        """Yield export rows in batches from a server-side cursor, memory stays constant"""
+        result = await self.db.stream(statement.execution_options(yield_per=batch_size))
+        async for partition in result.partitions():
+            yield partition
+    
+    async def get_sync_watermark(self) -> int:
+        """Transaction id below which every IOC change is committed and visible"""
+        result = await self.db.execute(SYNC_WATERMARK)
+        return result.scalar_one()
+
+    async def stream_changes(
+        self,
+        after_xid: int,
+        after_id: uuid.UUID,
+        watermark: int,
+        limit: int,
+        batch_size: int = 1000,
+    ) -> AsyncIterator[List[Row]]:
+        """Yield upserted and deleted IOCs after (after_xid, after_id) and below the watermark, in batches"""
+        result = await self.db.stream(
+            CHANGES_SINCE.execution_options(yield_per=batch_size),
+            {"after_xid": str(after_xid), "after_id": after_id, "watermark": str(watermark), "limit": limit},
+        )
+        async for partition in result.partitions():
+            yield partition
     
-    async def batch_lookup_by_values(self, lookups: List[IOCLookupByValue]) -> Dict[str, IOC]:
+    async def batch_lookup_by_values(
+        self, lookups: List[IOCLookupByValue], match_parents: bool = False
+    ) -> Dict[str, Row]:
         if not lookups:
             return {}
         
-        value_to_hash = {}
+        values_by_type: Dict[int, List[str]] = {}
         for lookup in lookups:
-            try:
-                normalized_value, value_hash = await self.validator.validate_and_normalize_ioc(
-                    lookup.type_id, lookup.value
-                )
-                value_to_hash[lookup.value] = value_hash
-            except ValueError:
-                continue
+            values_by_type.setdefault(lookup.type_id, []).append(lookup.value)
 
-        if not value_to_hash:
-            return {}
-        
-        hashes = list(value_to_hash.values())
-        hash_to_ioc = {ioc.value_hash: ioc for ioc in await self.batch_lookup_by_hashes(hashes)}
+        value_to_hash = {}
+        value_to_domain = {}
+        for type_id, values in values_by_type.items():
+            ioc_type = await self.validator.get_ioc_type_by_id(type_id)
+            if not ioc_type:
+                continue
+            normalized, hashes, _ = await cpu_offload.normalize_many(ioc_type.name, values)
+            if match_parents and ioc_type.name == IOCTypeEnum.DOMAIN:
+                for value, normalized_value in zip(values, normalized):
+                    if normalized_value is not None:
+                        value_to_domain[value] = normalized_value
+                continue
+            for value, value_hash in zip(values, hashes):
+                if value_hash is not None:
+                    value_to_hash[value] = (type_id, value_hash)
 
         results = {}
-        for orig, value_hash in value_to_hash.items():
-            if value_hash in hash_to_ioc:
-                results[orig] = hash_to_ioc[value_hash]
+        if value_to_hash:
+            hashes = [value_hash for _, value_hash in value_to_hash.values()]
+            # Types can share a value hash (a domain and a mutex named evil.com), match on both
+            key_to_ioc = {
+                (ioc.type_id, ioc.value_hash): ioc for ioc in await self.batch_lookup_by_hashes(hashes)
+            }
+            for orig, key in value_to_hash.items():
+                if key in key_to_ioc:
+                    results[orig] = key_to_ioc[key]
+
+        if value_to_domain:
+            parents = await self.lookup_parent_domains(list(set(value_to_domain.values())))
+            for orig, domain in value_to_domain.items():
+                if parents[domain] is not None:
+                    results[orig] = parents[domain]
         
         return results
     
-    async def batch_lookup_by_hashes(self, value_hashes: List[str]) -> List[IOC]:
+    async def batch_lookup_by_hashes(self, value_hashes: List[str]) -> List[Row]:
+        """Rows matching any of the hashes, in input order, in a single round trip"""
+        value_hashes = ioc_bloom_index.filter_candidates(dict.fromkeys(value_hashes))
         if not value_hashes:
             return []
-        results: List[IOC] = []
-        chunk_size = 1000
-        for i in range(0, len(value_hashes), chunk_size):
-            chunk = value_hashes[i:i + chunk_size]
-            statement = (
-                select(IOC)
-                .options(
-                    joinedload(IOC.ioc_type),
-                    joinedload(IOC.source_organization),
-                    joinedload(IOC.creator)
-                )
-                .where(IOC.value_hash.in_(chunk))
-            )
-            result = await self.db.execute(statement)
-            results.extend(result.scalars().all())
-        return results
-    
-    async def create_ioc(self, ioc_data: IOCCreate, created_by: uuid.UUID) -> IOC:
-        normalized_value, value_hash = await self.validator.validate_and_normalize_ioc(
-            ioc_data.type_id, ioc_data.value
+        # One array parameter instead of an IN list keeps the statement text
+        # (and its prepared plan) identical whatever the batch size
+        statement = self._slim_select().where(
+            IOC.value_hash == any_(bindparam("value_hashes", value_hashes, type_=ARRAY(String)))
         )
-        existing = None
-        try:
-            existing = await self.get_by_hash(value_hash)
-        except IOCNotFoundException:
-            pass
+        result = await self.db.execute(statement)
+        position = {value_hash: i for i, value_hash in enumerate(value_hashes)}
+        return sorted(result.all(), key=lambda row: position[row.value_hash])
+    
+    async def extract_and_match(
+        self, data: bytes, match_parents: bool = False
+    ) -> Tuple[Dict[Tuple[str, str], Offsets], Dict[Tuple[str, str], Row]]:
+        """Indicators found in a text body and the stored IOCs they match
 
-        if existing:
-            existing.last_seen = datetime.now()
-            await self.db.commit()
-            await self.db.refresh(existing)
-            return existing
+        Returns the byte offsets of every valid candidate and the matching row
+        of those that are stored, both keyed by (type name, normalized value).
+        The body is scanned once, each type's candidates are normalized as one
+        batch and all of them are resolved in a single hash lookup.
+        """
+        await ioc_type_registry.refresh_if_stale(self.db)
+        type_ids = {entry.name: entry.id for entry in ioc_type_registry.all().values()}
+
+        found: Dict[Tuple[str, str], Offsets] = {}
+        hash_keys: Dict[Tuple[int, str], Tuple[str, str]] = {}
+        domain_keys: Dict[str, Tuple[str, str]] = {}
+        for type_name, values in (await cpu_offload.extract_candidates(data)).items():
+            type_id = type_ids.get(type_name)
+            if type_id is None:
+                continue
+            raw_values = list(values)
+            normalized, hashes, _ = await cpu_offload.normalize_many(type_name, raw_values)
+            for raw_value, normalized_value, value_hash in zip(raw_values, normalized, hashes):
+                if value_hash is None:
+                    continue
+                key = (type_name, normalized_value)
+                found.setdefault(key, []).extend(values[raw_value])
+                if match_parents and type_name == IOCTypeEnum.DOMAIN:
+                    domain_keys[normalized_value] = key
+                else:
+                    hash_keys[(type_id, value_hash)] = key
+        for offsets in found.values():
+            offsets.sort()
 
-        db_ioc = IOC(
+        matches: Dict[Tuple[str, str], Row] = {}
+        if hash_keys:
+            for row in await self.batch_lookup_by_hashes([value_hash for _, value_hash in hash_keys]):
+                key = hash_keys.get((row.type_id, row.value_hash))
+                if key is not None:
+                    matches[key] = row
+        if domain_keys:
+            for domain, row in (await self.lookup_parent_domains(list(domain_keys))).items():
+                if row is not None:
+                    matches[domain_keys[domain]] = row
+        return found, matches
+
+    async def create_ioc(self, ioc_data: IOCCreate, created_by: uuid.UUID) -> IOC:
+        try:
+            normalized_value, value_hash = await self.validator.validate_and_normalize_ioc(
+                ioc_data.type_id, ioc_data.value
+            )
+        except ValueError as e:
+            raise InvalidIOCValueException(str(e))
+        statement = insert(IOC).values(
             type_id=ioc_data.type_id,
             value=normalized_value,
             value_hash=value_hash,
@@ -216,10 +549,57 @@ class IOCService:
             source_org_id=ioc_data.source_org_id,
             created_by=created_by
         )
-        
-        self.db.add(db_ioc)
+        buffered = sighting_buffer.enabled
+        if buffered:
+            # Re-sightings are written behind by the sighting buffer, only new IOCs are written here
+            statement = statement.on_conflict_do_nothing(index_elements=[IOC.type_id, IOC.value_hash])
+        else:
+            # Insert, or bump last_seen on a re-sighting, in a single race-free statement
+            statement = statement.on_conflict_do_update(
+                index_elements=[IOC.type_id, IOC.value_hash],
+                set_={"last_seen": func.now(), "sighting_count": IOC.sighting_count + 1}
+            )
+        # The conflicting row can be deleted before it is read back, the insert is then tried again
+        for _ in range(2):
+            result = await self.db.execute(
+                select(IOC).from_statement(statement.returning(IOC)).execution_options(populate_existing=True)
+            )
+            db_ioc = result.scalars().one_or_none()
+            if db_ioc is not None:
+                break
+            db_ioc = await self._buffer_sighting(ioc_data.type_id, value_hash)
+            if db_ioc is not None:
+                return db_ioc
+        else:
+            raise IOCNotFoundException('hash', value_hash)
+        ioc_bloom_index.add_many([value_hash])
+        await notify_ioc_changes(self.db, [value_hash])
         await self.db.commit()
-        await self.db.refresh(db_ioc)
+        ioc_lookup_cache.invalidate([value_hash])
+        # ON CONFLICT DO UPDATE does not tell an insert from a re-sighting
+        ioc_ingest_total.inc(1, ("single", "inserted" if buffered else "upserted"))
+        return db_ioc
+
+    async def _buffer_sighting(self, type_id: int, value_hash: str) -> Optional[IOC]:
+        """Record a re-sighting of an existing IOC in the sighting buffer and return the IOC
+
+        None if the IOC no longer exists.
+        """
+        result = await self.db.execute(
+            select(IOC, func.now(), func.greatest(IOC.last_seen, func.now()))
+            .where(IOC.type_id == type_id, IOC.value_hash == value_hash)
+        )
+        row = result.one_or_none()
+        if row is None:
+            return None
+        db_ioc, seen_at, last_seen = row
+        sighting_buffer.record(type_id, value_hash, seen_at)
+        # Report the sighting right away, the row itself is updated by the next flush
+        set_committed_value(db_ioc, "last_seen", last_seen)
+        set_committed_value(
+            db_ioc, "sighting_count", db_ioc.sighting_count + sighting_buffer.pending_sightings(type_id, value_hash)
+        )
+        ioc_ingest_total.inc(1, ("single", "buffered"))
         return db_ioc
 
     async def update_ioc(self, ioc_id: uuid.UUID, ioc_data: IOCUpdate) -> Optional[IOC]:
@@ -228,6 +608,7 @@ class IOCService:
             raise IOCNotFoundException('ID', str(ioc_id))
         
         update_data = ioc_data.model_dump(exclude_unset=True, by_alias=True)
+        old_value_hash = ioc.value_hash
 
         if "value" in update_data:
             type_id = update_data.get("type_id", ioc.type_id)
@@ -247,17 +628,168 @@ class IOCService:
             setattr(ioc, f, v)
         
         ioc.updated_at = datetime.now()
+        value_hash = ioc.value_hash
         
-        await self.db.commit()
+        try:
+            ioc_bloom_index.add_many([value_hash])
+            await notify_ioc_changes(self.db, {old_value_hash, value_hash})
+            await self.db.commit()
+        except IntegrityError:
+            await self.db.rollback()
+            raise IOCExistsException(value_hash)
+        ioc_lookup_cache.invalidate({old_value_hash, value_hash})
+        if old_value_hash != value_hash:
+            ioc_bloom_index.note_removed()
         await self.db.refresh(ioc)
         return ioc
     
     async def delete_ioc(self, ioc_id: uuid.UUID) -> None:
         ioc = await self.get_ioc(ioc_id)
         if not ioc:
-            raise IOCNotFoundException(str(ioc_id))
+            raise IOCNotFoundException('ID', str(ioc_id))
         
+        value_hash = ioc.value_hash
+        # Deleting the IOC nulls the references of its relationships, which drops them from the graph
+        relationship_ids = (await self.db.execute(
+            select(IOCRelationship.id).where(
+                or_(IOCRelationship.source_id == ioc_id, IOCRelationship.target_id == ioc_id)
+            )
+        )).scalars().all()
         await self.db.delete(ioc)
+        await notify_ioc_changes(self.db, [value_hash])
+        await notify_relationship_changes(self.db, relationship_ids)
         await self.db.commit()
+        ioc_lookup_cache.invalidate([value_hash])
+        ioc_bloom_index.note_removed()
+        if relationship_graph_index.ready:
+            relationship_graph_index.remove_edges(relationship_ids)
         return
-        
+
+    async def bulk_ingest(
+        self,
+        records: AsyncIterator[FeedRecord],
+        created_by: uuid.UUID,
+    ) -> IOCBulkResponse:
+        """Validate, stage and upsert a stream of IOC records in large chunks"""
+        settings = get_settings()
+        await ioc_type_registry.refresh_if_stale(self.db)
+
+        response = IOCBulkResponse()
+        index = 0
+        async for chunk in achunked(records, settings.bulk_ingest_chunk_size):
+            rows: Dict[tuple, tuple] = {}
+            duplicates = 0
+            for record, row, error in zip(chunk, *await self._prepare_bulk_chunk(chunk)):
+                if error is not None:
+                    response.rejected += 1
+                    if len(response.errors) < settings.bulk_ingest_max_errors:
+                        value = record.get("value") if isinstance(record, dict) else None
+                        response.errors.append(IOCBulkError(
+                            index=index,
+                            value=str(value) if value is not None else None,
+                            detail=error,
+                        ))
+                else:
+                    key = (row[0], row[2])
+                    if key in rows:
+                        duplicates += 1
+                    rows[key] = row
+                index += 1
+
+            if rows:
+                inserted, updated = await self._upsert_bulk_rows(list(rows.values()), created_by)
+                response.inserted += inserted
+                response.updated += updated
+                response.duplicates += duplicates
+                ioc_ingest_total.inc(inserted, ("bulk", "inserted"))
+                ioc_ingest_total.inc(updated, ("bulk", "updated"))
+                ioc_ingest_total.inc(duplicates, ("bulk", "duplicate"))
+            ioc_ingest_total.inc(len(chunk) - len(rows) - duplicates, ("bulk", "rejected"))
+
+        return response
+
+    async def _prepare_bulk_chunk(self, chunk: List[FeedRecord]) -> tuple[List[Optional[tuple]], List[Optional[str]]]:
+        """Validate a chunk of feed records, returning parallel lists of staging rows and errors
+
+        Values are grouped by type and normalized with IOCUtils.normalize_many,
+        off the event loop when the group is large.
+        """
+        rows: List[Optional[tuple]] = [None] * len(chunk)
+        errors: List[Optional[str]] = [None] * len(chunk)
+        positions_by_type: Dict[int, List[int]] = {}
+        for i, record in enumerate(chunk):
+            try:
+                type_id = self._check_bulk_record(record)
+            except (ValueError, TypeError, KeyError) as e:
+                errors[i] = _bulk_error_detail(e)
+            else:
+                positions_by_type.setdefault(type_id, []).append(i)
+
+        for type_id, positions in positions_by_type.items():
+            ioc_type = ioc_type_registry.get_cached(type_id)
+            normalized, hashes, failures = await cpu_offload.normalize_many(
+                ioc_type.name, [chunk[i]["value"] for i in positions]
+            )
+            for i, normalized_value, value_hash, failure in zip(positions, normalized, hashes, failures):
+                if failure is not None:
+                    errors[i] = failure
+                    continue
+                try:
+                    rows[i] = self._bulk_row(chunk[i], type_id, normalized_value, value_hash)
+                except (ValueError, TypeError, KeyError) as e:
+                    errors[i] = _bulk_error_detail(e)
+        return rows, errors
+
+    def _check_bulk_record(self, record: FeedRecord) -> int:
+        """Structural checks for one feed record, returns its type id"""
+        if isinstance(record, MalformedRecord):
+            raise ValueError(record.detail)
+
+        type_id = int(record["type_id"])
+        if not ioc_type_registry.get_cached(type_id):
+            raise ValueError(f"Invalid IOC type ID: {type_id}")
+
+        value = record["value"]
+        if not isinstance(value, str) or not value:
+            raise ValueError("value must be a non-empty string")
+        return type_id
+
+    def _bulk_row(self, record: Dict[str, Any], type_id: int, normalized_value: str, value_hash: str) -> tuple:
+        """Staging row for a validated feed record"""
+        if len(normalized_value) > 255:
+            raise ValueError("value exceeds 255 characters")
+
+        metadata = record.get("metadata_", record.get("metadata")) or {}
+        if isinstance(metadata, str):
+            metadata = json.loads(metadata)
+        if not isinstance(metadata, dict):
+            raise ValueError("metadata must be an object")
+
+        source_org_id = record.get("source_org_id")
+        return (
+            type_id,
+            normalized_value,
+            value_hash,
+            str(record.get("tlp_level") or "WHITE"),
+            _parse_bool(record.get("active", True)),
+            json.dumps(metadata),
+            uuid.UUID(str(source_org_id)) if source_org_id else None,
+        )
+
+    async def _upsert_bulk_rows(self, rows: List[tuple], created_by: uuid.UUID) -> tuple[int, int]:
+        """COPY rows into a temp staging table and upsert them into iocs in one statement"""
+        await self.db.execute(CREATE_BULK_STAGING)
+        connection = await self.db.connection()
+        raw_connection = await connection.get_raw_connection()
+        await raw_connection.driver_connection.copy_records_to_table(
+            "ioc_bulk_staging", records=rows, columns=BULK_STAGING_COLUMNS
+        )
+        # Temp tables have no statistics, without them the upsert plans a full sort of iocs
+        await self.db.execute(text("ANALYZE ioc_bulk_staging"))
+        result = await self.db.execute(UPSERT_FROM_BULK_STAGING, {"created_by": created_by})
+        counts = result.one()
+        ioc_bloom_index.add_many(row[2] for row in rows)
+        await notify_staged_ioc_changes(self.db)
+        await self.db.commit()
+        ioc_lookup_cache.invalidate(row[2] for row in rows)
+        return counts.inserted, counts.updated
@@ -0,0 +1,369 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import bindparam, text, Integer, String
+from sqlalchemy.dialects.postgresql import ARRAY, UUID
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+import uuid
+
+from src.config import get_settings
+from src.schemas.ioc_relationship import (
+    IOCGraphResponse, IOCPathResponse, IOCRelationshipBulkError, IOCRelationshipBulkResponse
+)
+from src.exceptions import IOCNotFoundException, GraphIndexUnavailableException
+from src.utils import cpu_offload
+from src.utils.bloom_filter import ioc_bloom_index
+from src.utils.graph_index import relationship_graph_index
+from src.utils.ioc_change_notifier import notify_ioc_changes, notify_relationship_changes
+from src.utils.ioc_feed_parser import FeedRecord, MalformedRecord, achunked
+from src.utils.ioc_type_registry import ioc_type_registry
+from src.utils.lookup_cache import ioc_lookup_cache
+from src.utils.metrics import ioc_ingest_total
+
+EDGE_FILTER = """
+    COALESCE(r.confidence_score, 0) >= :min_confidence
+    AND (CAST(:types AS varchar[]) IS NULL OR r.relationship_type = ANY(CAST(:types AS varchar[])))
+"""
+
+# Breadth-first walk over edges in both directions. `path` rules out cycles
+# within a walk, the LIMIT on `walked` bounds how many paths are expanded in
+# dense neighbourhoods (Postgres only evaluates as many recursive rows as
+# are fetched). Nodes, edges and counts come back as JSON in one round trip.
+IOC_GRAPH_QUERY = text(f"""
+    WITH RECURSIVE walk(node_id, depth, path) AS (
+        SELECT CAST(:root_id AS uuid), 0, ARRAY[CAST(:root_id AS uuid)]
+        UNION ALL
+        SELECT neighbour.node_id, walk.depth + 1, walk.path || neighbour.node_id
+        FROM walk
+        CROSS JOIN LATERAL (
+            SELECT r.target_id AS node_id FROM ioc_relationships r
+            WHERE r.source_id = walk.node_id AND {EDGE_FILTER}
+            UNION ALL
+            SELECT r.source_id FROM ioc_relationships r
+            WHERE r.target_id = walk.node_id AND {EDGE_FILTER}
+        ) neighbour
+        WHERE walk.depth < :depth AND neighbour.node_id <> ALL(walk.path)
+    ),
+    walked AS (
+        SELECT node_id, depth FROM walk LIMIT :max_paths + 1
+    ),
+    reached AS (
+        SELECT node_id, min(depth) AS depth FROM walked GROUP BY node_id
+    ),
+    nodes AS (
+        SELECT node_id, depth FROM reached ORDER BY depth, node_id LIMIT :max_nodes
+    )
+    SELECT
+        (SELECT count(*) FROM walked) AS paths,
+        (SELECT count(*) FROM reached) AS reached,
+        (
+            SELECT COALESCE(json_agg(json_build_object(
+                'id', i.id, 'value', i.value, 'value_hash', i.value_hash,
+                'tlp_level', i.tlp_level, 'active', i.active,
+                'type_id', i.type_id, 'type_name', t.name, 'depth', n.depth
+            ) ORDER BY n.depth, i.id), '[]')
+            FROM nodes n
+            JOIN iocs i ON i.id = n.node_id
+            JOIN ioc_types t ON t.id = i.type_id
+        ) AS nodes,
+        (
+            SELECT COALESCE(json_agg(json_build_object(
+                'id', r.id, 'source_id', r.source_id, 'target_id', r.target_id,
+                'relationship_type', r.relationship_type, 'confidence_score', r.confidence_score,
+                'first_observed', r.first_observed, 'last_observed', r.last_observed
+            )), '[]')
+            FROM ioc_relationships r
+            WHERE r.source_id IN (SELECT node_id FROM nodes)
+            AND r.target_id IN (SELECT node_id FROM nodes)
+            AND {EDGE_FILTER}
+        ) AS edges
+""").bindparams(bindparam("types", type_=ARRAY(String)))
+
+GRAPH_NODES_QUERY = text("""
+    SELECT i.id, i.value, i.value_hash, i.tlp_level, i.active, i.type_id, t.name AS type_name
+    FROM iocs i
+    JOIN ioc_types t ON t.id = i.type_id
+    WHERE i.id = ANY(:ids)
+""").bindparams(bindparam("ids", type_=ARRAY(UUID(as_uuid=True))))
+
+# Endpoint IOCs are created if missing, existing ones count as re-sighted.
+# Input is sorted so concurrent ingests lock rows in the same order.
+UPSERT_ENDPOINT_IOCS = text("""
+    INSERT INTO iocs (type_id, value, value_hash, active, created_by)
+    SELECT type_id, value, value_hash, true, :created_by
+    FROM unnest(:type_ids, :values, :value_hashes) AS input(type_id, value, value_hash)
+    ORDER BY type_id, value_hash
+    ON CONFLICT (type_id, value_hash) DO UPDATE SET
+        last_seen = now(), sighting_count = iocs.sighting_count + 1
+    RETURNING id, type_id, value_hash, (xmax = 0) AS inserted
+""").bindparams(
+    bindparam("type_ids", type_=ARRAY(Integer)),
+    bindparam("values", type_=ARRAY(String)),
+    bindparam("value_hashes", type_=ARRAY(String)),
+)
+
+UPSERT_EDGES = text("""
+    INSERT INTO ioc_relationships (source_id, target_id, relationship_type, confidence_score)
+    SELECT source_id, target_id, relationship_type, confidence_score
+    FROM unnest(:source_ids, :target_ids, :relationship_types, :confidence_scores)
+        AS input(source_id, target_id, relationship_type, confidence_score)
+    ORDER BY source_id, target_id, relationship_type
+    ON CONFLICT (source_id, target_id, relationship_type) DO UPDATE SET
+        last_observed = GREATEST(ioc_relationships.last_observed, EXCLUDED.last_observed),
+        confidence_score = GREATEST(ioc_relationships.confidence_score, EXCLUDED.confidence_score)
+    RETURNING id, source_id, target_id, relationship_type, confidence_score, (xmax = 0) AS inserted
+""").bindparams(
+    bindparam("source_ids", type_=ARRAY(UUID(as_uuid=True))),
+    bindparam("target_ids", type_=ARRAY(UUID(as_uuid=True))),
+    bindparam("relationship_types", type_=ARRAY(String)),
+    bindparam("confidence_scores", type_=ARRAY(Integer)),
+)
+
+EndpointKey = Tuple[int, str]
+
+def _edge_endpoint(record: Dict[str, Any], side: str) -> Tuple[int, Any]:
+    """(type_id, value) for one side, nested ({"source": {...}}) or flat (source_type_id, source_value)"""
+    nested = record.get(side)
+    if isinstance(nested, dict):
+        return int(nested["type_id"]), nested["value"]
+    return int(record[f"{side}_type_id"]), record[f"{side}_value"]
+
+def _check_edge_record(record: FeedRecord) -> Tuple[int, Any, int, Any, str, int]:
+    if isinstance(record, MalformedRecord):
+        raise ValueError(record.detail)
+
+    source_type_id, source_value = _edge_endpoint(record, "source")
+    target_type_id, target_value = _edge_endpoint(record, "target")
+    for type_id, value in ((source_type_id, source_value), (target_type_id, target_value)):
+        if not ioc_type_registry.get_cached(type_id):
+            raise ValueError(f"Invalid IOC type ID: {type_id}")
+        if not isinstance(value, str) or not value:
+            raise ValueError("value must be a non-empty string")
+
+    relationship_type = record["relationship_type"]
+    if not isinstance(relationship_type, str) or not 0 < len(relationship_type) <= 50:
+        raise ValueError("relationship_type must be a string of 1 to 50 characters")
+    confidence_score = int(record.get("confidence_score", 50))
+    if not 0 <= confidence_score <= 100:
+        raise ValueError("confidence_score must be between 0 and 100")
+    return source_type_id, source_value, target_type_id, target_value, relationship_type, confidence_score
+
+class RelationshipService:
+    # Paths expanded per requested node before the walk is cut short
+    PATHS_PER_NODE = 50
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def get_graph(
+        self,
+        ioc_id: uuid.UUID,
+        depth: int = 2,
+        min_confidence: int = 0,
+        types: Optional[List[str]] = None,
+        max_nodes: int = 500,
+    ) -> IOCGraphResponse:
+        """Neighbourhood of an IOC up to `depth` hops, following edges in both directions"""
+        if relationship_graph_index.ready:
+            return await self._get_graph_from_index(ioc_id, depth, min_confidence, types, max_nodes)
+
+        max_paths = max_nodes * self.PATHS_PER_NODE
+        result = await self.db.execute(IOC_GRAPH_QUERY, {
+            "root_id": ioc_id,
+            "depth": depth,
+            "min_confidence": min_confidence,
+            "types": types or None,
+            "max_nodes": max_nodes,
+            "max_paths": max_paths,
+        })
+        row = result.one()
+        if not row.nodes:
+            raise IOCNotFoundException('ID', str(ioc_id))
+
+        return IOCGraphResponse(
+            root_id=ioc_id,
+            depth=depth,
+            nodes=row.nodes,
+            edges=row.edges,
+            truncated=row.paths > max_paths or row.reached > max_nodes,
+        )
+
+    async def _node_rows(self, node_ids: List[uuid.UUID]) -> dict:
+        result = await self.db.execute(GRAPH_NODES_QUERY, {"ids": node_ids})
+        return {row.id: row for row in result}
+
+    async def _get_graph_from_index(
+        self,
+        ioc_id: uuid.UUID,
+        depth: int,
+        min_confidence: int,
+        types: Optional[List[str]],
+        max_nodes: int,
+    ) -> IOCGraphResponse:
+        """Same result as the recursive query, topology from the in-process graph index"""
+        graph = relationship_graph_index.graph
+        depths, edges, truncated = graph.k_hop(ioc_id, depth, min_confidence, types, max_nodes)
+        node_depths = {graph.node_uuid(node): d for node, d in depths.items()} or {ioc_id: 0}
+        rows = await self._node_rows(list(node_depths))
+        if ioc_id not in rows:
+            raise IOCNotFoundException('ID', str(ioc_id))
+
+        nodes = sorted(
+            ({**row._asdict(), "depth": node_depths[node_id]} for node_id, row in rows.items()),
+            key=lambda node: (node["depth"], node["id"])
+        )
+        return IOCGraphResponse(
+            root_id=ioc_id,
+            depth=depth,
+            nodes=nodes,
+            edges=[graph.edge_dict(edge) for edge in edges],
+            truncated=truncated,
+        )
+
+    async def get_path(
+        self,
+        source_id: uuid.UUID,
+        target_id: uuid.UUID,
+        max_depth: int = 6,
+        min_confidence: int = 0,
+        types: Optional[List[str]] = None,
+    ) -> IOCPathResponse:
+        """Shortest undirected path between two IOCs, served from the graph index"""
+        if not relationship_graph_index.ready:
+            raise GraphIndexUnavailableException()
+
+        graph = relationship_graph_index.graph
+        path = graph.shortest_path(source_id, target_id, max_depth, min_confidence, types)
+        node_ids = [graph.node_uuid(node) for node in path[0]] if path else [source_id, target_id]
+        rows = await self._node_rows(node_ids)
+        for ioc_id in (source_id, target_id):
+            if ioc_id not in rows:
+                raise IOCNotFoundException('ID', str(ioc_id))
+        if path is None:
+            return IOCPathResponse(source_id=source_id, target_id=target_id, found=False)
+
+        return IOCPathResponse(
+            source_id=source_id,
+            target_id=target_id,
+            found=True,
+            nodes=[{**rows[node_id]._asdict(), "depth": i} for i, node_id in enumerate(node_ids)],
+            edges=[graph.edge_dict(edge) for edge in path[1]],
+        )
+
+    async def bulk_ingest(
+        self,
+        records: AsyncIterator[FeedRecord],
+        created_by: uuid.UUID,
+    ) -> IOCRelationshipBulkResponse:
+        """Resolve edge endpoints to IOCs (creating missing ones) and upsert edges, per chunk"""
+        settings = get_settings()
+        await ioc_type_registry.refresh_if_stale(self.db)
+
+        response = IOCRelationshipBulkResponse()
+        index = 0
+        async for chunk in achunked(records, settings.bulk_ingest_chunk_size):
+            edges, errors = await self._prepare_edges(chunk)
+            for i, error in errors:
+                response.rejected += 1
+                if len(response.errors) < settings.bulk_ingest_max_errors:
+                    response.errors.append(IOCRelationshipBulkError(index=index + i, detail=error))
+            index += len(chunk)
+            if edges:
+                await self._upsert_edges(edges, created_by, response)
+
+        return response
+
+    async def _prepare_edges(
+        self, chunk: List[FeedRecord]
+    ) -> Tuple[Dict[tuple, tuple], List[Tuple[int, str]]]:
+        """Validate and normalize a chunk of edge records
+
+        Returns {(source, target, type): (source, target, type, confidence, endpoint values)}
+        with endpoints as (type_id, value_hash) keys, plus (position, detail) errors.
+        """
+        checked: Dict[int, tuple] = {}
+        errors: List[Tuple[int, str]] = []
+        values_by_type: Dict[int, List[str]] = {}
+        for i, record in enumerate(chunk):
+            try:
+                checked[i] = _check_edge_record(record)
+            except (ValueError, TypeError, KeyError) as e:
+                errors.append((i, f"Missing field {e}" if isinstance(e, KeyError) else str(e)))
+                continue
+            values_by_type.setdefault(checked[i][0], []).append(checked[i][1])
+            values_by_type.setdefault(checked[i][2], []).append(checked[i][3])
+
+        normalized: Dict[EndpointKey, Tuple[Optional[str], Optional[str], Optional[str]]] = {}
+        for type_id, values in values_by_type.items():
+            ioc_type = ioc_type_registry.get_cached(type_id)
+            for value, result in zip(values, zip(*await cpu_offload.normalize_many(ioc_type.name, values))):
+                normalized[(type_id, value)] = result
+
+        edges: Dict[tuple, tuple] = {}
+        for i, (source_type_id, source_value, target_type_id, target_value, relationship_type,
+                confidence_score) in checked.items():
+            source_value, source_hash, source_error = normalized[(source_type_id, source_value)]
+            target_value, target_hash, target_error = normalized[(target_type_id, target_value)]
+            if source_error or target_error:
+                errors.append((i, source_error or target_error))
+                continue
+            if len(source_value) > 255 or len(target_value) > 255:
+                errors.append((i, "value exceeds 255 characters"))
+                continue
+            source, target = (source_type_id, source_hash), (target_type_id, target_hash)
+            if source == target:
+                errors.append((i, "source and target are the same IOC"))
+                continue
+            key = (source, target, relationship_type)
+            previous = edges.get(key)
+            if previous is not None:
+                confidence_score = max(confidence_score, previous[3])
+            edges[key] = (source, target, relationship_type, confidence_score, source_value, target_value)
+        errors.sort()
+        return edges, errors
+
+    async def _upsert_edges(
+        self,
+        edges: Dict[tuple, tuple],
+        created_by: uuid.UUID,
+        response: IOCRelationshipBulkResponse,
+    ) -> None:
+        """Two set-based statements: upsert endpoint IOCs, then upsert edges between them"""
+        endpoints: Dict[EndpointKey, str] = {}
+        for source, target, _, _, source_value, target_value in edges.values():
+            endpoints[source] = source_value
+            endpoints[target] = target_value
+        keys = list(endpoints)
+
+        value_hashes = [value_hash for _, value_hash in keys]
+        ioc_bloom_index.add_many(value_hashes)
+        result = await self.db.execute(UPSERT_ENDPOINT_IOCS, {
+            "created_by": created_by,
+            "type_ids": [type_id for type_id, _ in keys],
+            "values": [endpoints[key] for key in keys],
+            "value_hashes": value_hashes,
+        })
+        ioc_ids: Dict[EndpointKey, uuid.UUID] = {}
+        iocs_created = 0
+        for row in result:
+            ioc_ids[(row.type_id, row.value_hash)] = row.id
+            iocs_created += row.inserted
+        response.iocs_created += iocs_created
+
+        edge_rows = list(edges.values())
+        result = await self.db.execute(UPSERT_EDGES, {
+            "source_ids": [ioc_ids[edge[0]] for edge in edge_rows],
+            "target_ids": [ioc_ids[edge[1]] for edge in edge_rows],
+            "relationship_types": [edge[2] for edge in edge_rows],
+            "confidence_scores": [edge[3] for edge in edge_rows],
+        })
+        upserted = result.all()
+        inserted = sum(1 for row in upserted if row.inserted)
+        response.inserted += inserted
+        response.updated += len(upserted) - inserted
+
+        await notify_ioc_changes(self.db, value_hashes)
+        await notify_relationship_changes(self.db, (row.id for row in upserted))
+        await self.db.commit()
+        ioc_lookup_cache.invalidate(value_hashes)
+        ioc_ingest_total.inc(iocs_created, ("relationship_bulk", "inserted"))
+        if relationship_graph_index.ready:
+            relationship_graph_index.apply_edges(upserted)
@@ -0,0 +1,282 @@
+import asyncio
+import hashlib
+import logging
+import math
+import mmap
+import os
+import struct
+import time
+from typing import Iterable, List, Optional
+
+from sqlalchemy import func, or_, select, text
+
+from src.config import get_settings
+from src.database import AsyncSessionLocal
+from src.models.ioc import IOC
+from src.utils.ioc_change_notifier import ALL_CHANGED, DISCONNECTED, ioc_change_listener
+
+logger = logging.getLogger(__name__)
+
+# magic, capacity, bit count, hash count, item count, saved_at (unix time)
+FILE_HEADER = struct.Struct("<8sQQIQd")
+FILE_MAGIC = b"TSBLOOM1"
+
+# Rows written by transactions that were still open when the file was saved
+# carry an earlier created_at, so the catch-up scan reaches back a little
+CATCH_UP_MARGIN = 300.0
+
+SCAN_BATCH_SIZE = 10000
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings, backed by a bytearray or an mmap"""
+
+    def __init__(self, capacity: int, error_rate: float, bits=None, num_bits: int = 0,
+                 num_hashes: int = 0, count: int = 0):
+        self.capacity = capacity
+        if not num_bits:
+            num_bits = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+            num_hashes = max(1, round(num_bits / capacity * math.log(2)))
+        self.num_bits = num_bits
+        self.num_hashes = num_hashes
+        self.count = count
+        self.bits = bits if bits is not None else bytearray((num_bits + 7) // 8)
+
+    def _positions(self, key: str) -> Iterable[int]:
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        m = self.num_bits
+        return ((h1 + i * h2) % m for i in range(self.num_hashes))
+
+    def add(self, key: str) -> None:
+        bits = self.bits
+        for pos in self._positions(key):
+            bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def add_many(self, keys: Iterable[str]) -> None:
+        for key in keys:
+            self.add(key)
+
+    def __contains__(self, key: str) -> bool:
+        bits = self.bits
+        for pos in self._positions(key):
+            if not bits[pos >> 3] & (1 << (pos & 7)):
+                return False
+        return True
+
+    @property
+    def size_bytes(self) -> int:
+        return len(self.bits)
+
+    @property
+    def estimated_error_rate(self) -> float:
+        return (1 - math.exp(-self.num_hashes * self.count / self.num_bits)) ** self.num_hashes
+
+    def save(self, path: str) -> None:
+        """Atomically write the filter to `path`"""
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(FILE_HEADER.pack(
+                FILE_MAGIC, self.capacity, self.num_bits, self.num_hashes, self.count, time.time()
+            ))
+            f.write(self.bits)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> tuple["BloomFilter", float]:
+        """Map a saved filter copy-on-write, returns the filter and its saved_at time"""
+        with open(path, "rb") as f:
+            header = f.read(FILE_HEADER.size)
+            magic, capacity, num_bits, num_hashes, count, saved_at = FILE_HEADER.unpack(header)
+            if magic != FILE_MAGIC:
+                raise ValueError(f"{path} is not a bloom filter file")
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+        bits = memoryview(mapped)[FILE_HEADER.size:]
+        if len(bits) != (num_bits + 7) // 8:
+            raise ValueError(f"{path} is truncated")
+        return cls(capacity, 0, bits, num_bits, num_hashes, count), saved_at
+
+
+class IOCBloomIndex:
+    """Negative-lookup filter over every iocs.value_hash in the database
+
+    A hash the filter rules out is guaranteed absent, so lookups can skip
+    Postgres. Local writes add their hashes before committing and other
+    workers' writes arrive through the ioc_changes listener, so the filter is
+    only trusted while that listener is connected: it is not enabled at all
+    without one, stops ruling anything out when the connection drops, and is
+    trusted again once the rebuild that follows the reconnect has finished.
+    Until then every hash is reported as possibly present.
+    Deleted hashes cannot be removed and only cost a false positive, the
+    filter is rebuilt once enough of them have accumulated.
+    """
+
+    def __init__(self, capacity: int, error_rate: float, path: Optional[str] = None,
+                 stale_fraction: float = 0.1):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.path = path
+        self.stale_fraction = stale_fraction
+        self.filter: Optional[BloomFilter] = None
+        self.ready = False
+        self.removed = 0
+        self.checks = 0
+        self.ruled_out = 0
+        self._next: Optional[BloomFilter] = None
+        self._loaded_at: Optional[float] = None
+        self._scanned_at: Optional[float] = None
+        self._rebuild_requested_at = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    def might_contain(self, value_hash: str) -> bool:
+        if not self.ready:
+            return True
+        self.checks += 1
+        if value_hash in self.filter:
+            return True
+        self.ruled_out += 1
+        return False
+
+    def filter_candidates(self, value_hashes: Iterable[str]) -> List[str]:
+        """Drop the hashes that are definitely not in the database"""
+        if not self.ready:
+            return list(value_hashes)
+        return [h for h in value_hashes if self.might_contain(h)]
+
+    def add_many(self, value_hashes: Iterable[str]) -> None:
+        value_hashes = list(value_hashes)
+        for bloom in (self.filter, self._next):
+            if bloom is not None:
+                bloom.add_many(value_hashes)
+        if self.ready and self.filter.count > self.filter.capacity:
+            self.request_rebuild()
+
+    def note_removed(self, n: int = 1) -> None:
+        self.removed += n
+        if self.ready and self.removed > self.filter.count * self.stale_fraction:
+            self.request_rebuild()
+
+    def on_ioc_changes(self, value_hashes: List[str]) -> None:
+        """IOCChangeListener subscriber"""
+        if DISCONNECTED in value_hashes:
+            self.ready = False
+        elif ALL_CHANGED in value_hashes:
+            self.request_rebuild()
+        else:
+            self.add_many(value_hashes)
+
+    def request_rebuild(self) -> None:
+        self._rebuild_requested_at = time.monotonic()
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._refresh())
+
+    async def _refresh(self) -> None:
+        # Scanning before LISTEN is active could miss other workers' writes
+        await ioc_change_listener.wait_until_listening()
+        try:
+            if self._loaded_at is not None:
+                try:
+                    await self._catch_up()
+                except Exception:
+                    logger.exception("IOC bloom filter catch-up failed, rebuilding")
+                    self._rebuild_requested_at = time.monotonic()
+                # The file only seeds the first refresh, later ones rebuild
+                self._loaded_at = None
+            # A rebuild is only needed if the request came after the last scan started
+            while self._scanned_at is None or self._rebuild_requested_at > self._scanned_at:
+                await self._build()
+            # A scan that overlapped a disconnect may have missed writes, the
+            # ALL_CHANGED sent on reconnect schedules another one
+            self.ready = ioc_change_listener.listening
+        except Exception:
+            logger.exception("IOC bloom filter refresh failed")
+
+    async def _estimate_rows(self, db) -> int:
+        result = await db.execute(text("SELECT reltuples::bigint FROM pg_class WHERE relname = 'iocs'"))
+        return max(0, result.scalar() or 0)
+
+    async def _build(self) -> None:
+        """Build a fresh filter from a streaming scan and swap it in"""
+        started = time.monotonic()
+        async with AsyncSessionLocal() as db:
+            capacity = max(self.capacity, int(await self._estimate_rows(db) * 1.5))
+            self._next = BloomFilter(capacity, self.error_rate)
+            self._scanned_at = time.monotonic()
+            result = await db.stream(
+                select(IOC.value_hash).execution_options(yield_per=SCAN_BATCH_SIZE)
+            )
+            async for hashes in result.scalars().partitions():
+                self._next.add_many(hashes)
+        self.filter, self._next = self._next, None
+        self.removed = 0
+        logger.info(
+            "IOC bloom filter built with %d hashes (%d bytes) in %.1fs",
+            self.filter.count, self.filter.size_bytes, time.monotonic() - started
+        )
+        if self.path:
+            await asyncio.to_thread(self.filter.save, self.path)
+
+    async def _catch_up(self) -> None:
+        """Add hashes written since the loaded file was saved"""
+        since = self._loaded_at - CATCH_UP_MARGIN
+        async with AsyncSessionLocal() as db:
+            self._scanned_at = time.monotonic()
+            statement = select(IOC.value_hash).where(or_(
+                IOC.created_at >= func.to_timestamp(since),
+                IOC.updated_at >= func.to_timestamp(since),
+            )).execution_options(yield_per=SCAN_BATCH_SIZE)
+            result = await db.stream(statement)
+            async for hashes in result.scalars().partitions():
+                self.filter.add_many(hashes)
+
+    def start(self) -> None:
+        """Load the persisted filter if there is one and schedule the initial build"""
+        if not ioc_change_listener.running:
+            logger.warning("IOC change listener is not running, the IOC bloom filter stays disabled")
+            return
+        if self.path and os.path.exists(self.path):
+            try:
+                self.filter, self._loaded_at = BloomFilter.load(self.path)
+            except (OSError, ValueError, struct.error):
+                logger.exception("Ignoring unreadable IOC bloom filter file %s", self.path)
+        if self.filter is not None:
+            self._task = asyncio.create_task(self._refresh())
+        else:
+            self.request_rebuild()
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self.path and self.ready:
+            await asyncio.to_thread(self.filter.save, self.path)
+
+    def stats(self) -> dict:
+        if self.filter is None:
+            return {"ready": False}
+        return {
+            "ready": self.ready,
+            "count": self.filter.count,
+            "capacity": self.filter.capacity,
+            "bits": self.filter.num_bits,
+            "hashes": self.filter.num_hashes,
+            "bytes": self.filter.size_bytes,
+            "estimated_error_rate": self.filter.estimated_error_rate,
+            "removed_since_build": self.removed,
+            "checks": self.checks,
+            "ruled_out": self.ruled_out,
+        }
+
+
+def build_bloom_index() -> IOCBloomIndex:
+    settings = get_settings()
+    return IOCBloomIndex(settings.ioc_bloom_capacity, settings.ioc_bloom_error_rate, settings.ioc_bloom_path)
+
+
+ioc_bloom_index = build_bloom_index()
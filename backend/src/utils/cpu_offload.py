@@ -0,0 +1,56 @@
+import asyncio
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import List, Optional, Tuple
+
+from src.config import get_settings
+from src.utils import ioc_extractor
+from src.utils.ioc_utils import IOCUtils
+
+_executor: Optional[Executor] = None
+
+
+def get_executor() -> Optional[Executor]:
+    """Lazily created pool for CPU-heavy work, None when offloading is disabled"""
+    global _executor
+    settings = get_settings()
+    if _executor is None and settings.cpu_offload_executor != "none":
+        if settings.cpu_offload_executor == "process":
+            # spawn: forking a process that runs an event loop and DB connections is unsafe
+            _executor = ProcessPoolExecutor(
+                max_workers=settings.cpu_offload_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        else:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.cpu_offload_workers,
+                thread_name_prefix="ioc-normalize",
+            )
+    return _executor
+
+
+def shutdown_executor() -> None:
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+async def normalize_many(
+    ioc_type_name: str, values: List[str]
+) -> Tuple[List[Optional[str]], List[Optional[str]], List[Optional[str]]]:
+    """IOCUtils.normalize_many, run in the offload pool for batches above the threshold"""
+    executor = get_executor()
+    if executor is None or len(values) < get_settings().cpu_offload_threshold:
+        return IOCUtils.normalize_many(ioc_type_name, values)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, IOCUtils.normalize_many, ioc_type_name, values)
+
+
+async def extract_candidates(data: bytes) -> ioc_extractor.Candidates:
+    """ioc_extractor.extract_candidates, run in the offload pool for bodies above extract_offload_min_bytes"""
+    executor = get_executor()
+    if executor is None or len(data) < get_settings().extract_offload_min_bytes:
+        return ioc_extractor.extract_candidates(data)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, ioc_extractor.extract_candidates, data)
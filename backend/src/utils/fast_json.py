@@ -0,0 +1,24 @@
+import uuid
+from typing import Any
+
+import orjson
+from fastapi.responses import Response
+
+
+def _default(value: Any) -> Any:
+    # asyncpg returns its own uuid.UUID subclass, which orjson only encodes through default
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    raise TypeError
+
+
+class ORJSONRowResponse(Response):
+    """Serializes plain dicts and lists straight to bytes, skipping response_model validation
+
+    UUIDs and datetimes are encoded natively, with a Z suffix for UTC to match pydantic.
+    """
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_UTC_Z)
@@ -0,0 +1,490 @@
+import array
+import asyncio
+import logging
+import sys
+import time
+import uuid
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import select
+
+from src.config import get_settings
+from src.database import AsyncSessionLocal
+from src.models.ioc_relationship import IOCRelationship
+from src.utils.ioc_change_notifier import ALL_CHANGED, DISCONNECTED, relationship_change_listener
+
+logger = logging.getLogger(__name__)
+
+SCAN_BATCH_SIZE = 10000
+
+
+class RelationshipGraph:
+    """Undirected relationship graph with integer node ids
+
+    Edges live in parallel arrays indexed by edge number. Adjacency is a CSR
+    pair (offsets, adjacency) listing the edge numbers incident to each
+    node, built by compact(); edges added since then sit in a small
+    per-node delta until the next compaction. Removed edges keep their
+    number and are skipped by every traversal until the graph is rebuilt.
+    edge_ids maps the id of every live edge to its number.
+    """
+
+    def __init__(self):
+        self.node_ids: Dict[uuid.UUID, int] = {}
+        self.node_uuids = bytearray()
+        self.type_codes: Dict[str, int] = {}
+        self.type_names: List[str] = []
+        self.edge_source = array.array("i")
+        self.edge_target = array.array("i")
+        self.edge_confidence = array.array("B")
+        self.edge_type = array.array("H")
+        self.edge_uuids = bytearray()
+        self.edge_ids: Dict[uuid.UUID, int] = {}
+        self.offsets = array.array("q", [0])
+        self.adjacency = array.array("i")
+        self.delta: Dict[int, List[int]] = {}
+        self.delta_edges = 0
+        self.removed: Set[int] = set()
+
+    @property
+    def node_count(self) -> int:
+        return len(self.node_ids)
+
+    @property
+    def edge_count(self) -> int:
+        """Edge numbers in use, including removed edges"""
+        return len(self.edge_source)
+
+    @property
+    def live_edge_count(self) -> int:
+        return len(self.edge_source) - len(self.removed)
+
+    def node_uuid(self, node: int) -> uuid.UUID:
+        return uuid.UUID(bytes=bytes(self.node_uuids[node * 16:node * 16 + 16]))
+
+    def edge_uuid(self, edge: int) -> uuid.UUID:
+        return uuid.UUID(bytes=bytes(self.edge_uuids[edge * 16:edge * 16 + 16]))
+
+    def _node(self, node_uuid: uuid.UUID) -> int:
+        node = self.node_ids.get(node_uuid)
+        if node is None:
+            node = self.node_ids[node_uuid] = len(self.node_ids)
+            self.node_uuids += node_uuid.bytes
+        return node
+
+    def _type_code(self, relationship_type: str) -> int:
+        code = self.type_codes.get(relationship_type)
+        if code is None:
+            code = self.type_codes[relationship_type] = len(self.type_names)
+            self.type_names.append(relationship_type)
+        return code
+
+    def incident(self, node: int) -> Iterable[int]:
+        """Edge numbers touching `node`"""
+        if node + 1 < len(self.offsets):
+            yield from self.adjacency[self.offsets[node]:self.offsets[node + 1]]
+        yield from self.delta.get(node, ())
+
+    def add_edge(
+        self,
+        edge_uuid: uuid.UUID,
+        source: uuid.UUID,
+        target: uuid.UUID,
+        relationship_type: str,
+        confidence: Optional[int],
+        check_existing: bool = True,
+    ) -> None:
+        """Insert an edge, or update the confidence of the same (source, target, type) edge"""
+        s, t = self._node(source), self._node(target)
+        code = self._type_code(relationship_type)
+        confidence = max(0, min(255, confidence or 0))
+        if check_existing:
+            for edge in self.incident(s):
+                if edge not in self.removed and self.edge_source[edge] == s and self.edge_target[edge] == t and self.edge_type[edge] == code:
+                    self.edge_confidence[edge] = confidence
+                    return
+        edge = len(self.edge_source)
+        replaced = self.edge_ids.get(edge_uuid)
+        if replaced is not None:
+            # Same id with other endpoints or type, only the new edge is live
+            self.removed.add(replaced)
+        self.edge_ids[edge_uuid] = edge
+        self.edge_source.append(s)
+        self.edge_target.append(t)
+        self.edge_confidence.append(confidence)
+        self.edge_type.append(code)
+        self.edge_uuids += edge_uuid.bytes
+        self.delta.setdefault(s, []).append(edge)
+        if t != s:
+            self.delta.setdefault(t, []).append(edge)
+        self.delta_edges += 1
+
+    def find_edge(self, edge_uuid: uuid.UUID) -> Optional[int]:
+        """Number of the live edge with this id"""
+        return self.edge_ids.get(edge_uuid)
+
+    def remove_edge(self, edge_uuid: uuid.UUID) -> bool:
+        edge = self.edge_ids.pop(edge_uuid, None)
+        if edge is None:
+            return False
+        self.removed.add(edge)
+        return True
+
+    def build_csr(self, edges: int) -> Tuple[array.array, array.array]:
+        """CSR adjacency over the first `edges` edges, safe to run in a thread"""
+        nodes = len(self.node_ids)
+        offsets = array.array("q", bytes(8 * (nodes + 1)))
+        source, target = self.edge_source, self.edge_target
+        for e in range(edges):
+            offsets[source[e] + 1] += 1
+            if target[e] != source[e]:
+                offsets[target[e] + 1] += 1
+        for n in range(nodes):
+            offsets[n + 1] += offsets[n]
+        adjacency = array.array("i", bytes(4 * offsets[nodes]))
+        cursor = offsets[:-1]
+        for e in range(edges):
+            s, t = source[e], target[e]
+            adjacency[cursor[s]] = e
+            cursor[s] += 1
+            if t != s:
+                adjacency[cursor[t]] = e
+                cursor[t] += 1
+        return offsets, adjacency
+
+    def install_csr(self, offsets: array.array, adjacency: array.array, edges: int) -> None:
+        """Swap in a CSR built over the first `edges` edges, keeping later ones in the delta"""
+        self.offsets, self.adjacency = offsets, adjacency
+        self.delta = {}
+        for e in range(edges, len(self.edge_source)):
+            s, t = self.edge_source[e], self.edge_target[e]
+            self.delta.setdefault(s, []).append(e)
+            if t != s:
+                self.delta.setdefault(t, []).append(e)
+        self.delta_edges = len(self.edge_source) - edges
+
+    def compact(self) -> None:
+        edges = self.edge_count
+        self.install_csr(*self.build_csr(edges), edges)
+
+    def _neighbours(self, node: int, min_confidence: int, types: Optional[Set[int]]) -> List[Tuple[int, int]]:
+        """(edge, other endpoint) pairs for the edges of `node` passing the filters"""
+        source, target = self.edge_source, self.edge_target
+        confidence, edge_type = self.edge_confidence, self.edge_type
+        edges = self.adjacency[self.offsets[node]:self.offsets[node + 1]] if node + 1 < len(self.offsets) else ()
+        extra = self.delta.get(node)
+        if extra:
+            edges = list(edges) + extra
+        removed = self.removed
+        if min_confidence > 0 or types is not None or removed:
+            edges = [
+                e for e in edges
+                if e not in removed and confidence[e] >= min_confidence
+                and (types is None or edge_type[e] in types)
+            ]
+        return [(e, target[e] if source[e] == node else source[e]) for e in edges]
+
+    def _type_filter(self, types: Optional[List[str]]) -> Optional[Set[int]]:
+        if not types:
+            return None
+        return {self.type_codes[t] for t in types if t in self.type_codes}
+
+    def k_hop(
+        self,
+        root: uuid.UUID,
+        depth: int,
+        min_confidence: int = 0,
+        types: Optional[List[str]] = None,
+        max_nodes: int = 500,
+    ) -> Tuple[Dict[int, int], List[int], bool]:
+        """BFS from `root`: ({node: depth}, edges between reached nodes, truncated)"""
+        start = self.node_ids.get(root)
+        if start is None:
+            return {}, [], False
+        type_filter = self._type_filter(types)
+        depths = {start: 0}
+        queue = deque([start])
+        truncated = False
+        while queue:
+            node = queue.popleft()
+            if depths[node] == depth:
+                continue
+            for _, neighbour in self._neighbours(node, min_confidence, type_filter):
+                if neighbour in depths:
+                    continue
+                if len(depths) >= max_nodes:
+                    truncated = True
+                    queue.clear()
+                    break
+                depths[neighbour] = depths[node] + 1
+                queue.append(neighbour)
+
+        edges = set()
+        for node in depths:
+            for edge, neighbour in self._neighbours(node, min_confidence, type_filter):
+                if neighbour in depths:
+                    edges.add(edge)
+        return depths, sorted(edges), truncated
+
+    def shortest_path(
+        self,
+        source: uuid.UUID,
+        target: uuid.UUID,
+        max_depth: int,
+        min_confidence: int = 0,
+        types: Optional[List[str]] = None,
+    ) -> Optional[Tuple[List[int], List[int]]]:
+        """(nodes, edges) along a shortest path, or None if there is none within max_depth"""
+        start, goal = self.node_ids.get(source), self.node_ids.get(target)
+        if start is None or goal is None:
+            return None
+        if start == goal:
+            return [start], []
+        type_filter = self._type_filter(types)
+        parents: Dict[int, Tuple[int, int]] = {start: (-1, -1)}
+        frontier = [start]
+        for _ in range(max_depth):
+            next_frontier = []
+            for node in frontier:
+                for edge, neighbour in self._neighbours(node, min_confidence, type_filter):
+                    if neighbour in parents:
+                        continue
+                    parents[neighbour] = (node, edge)
+                    if neighbour == goal:
+                        nodes, edges = [goal], []
+                        while nodes[-1] != start:
+                            parent, via = parents[nodes[-1]]
+                            nodes.append(parent)
+                            edges.append(via)
+                        return nodes[::-1], edges[::-1]
+                    next_frontier.append(neighbour)
+            if not next_frontier:
+                break
+            frontier = next_frontier
+        return None
+
+    def edge_dict(self, edge: int) -> dict:
+        return {
+            "id": self.edge_uuid(edge),
+            "source_id": self.node_uuid(self.edge_source[edge]),
+            "target_id": self.node_uuid(self.edge_target[edge]),
+            "relationship_type": self.type_names[self.edge_type[edge]],
+            "confidence_score": self.edge_confidence[edge],
+        }
+
+    def memory_bytes(self) -> Dict[str, int]:
+        arrays = sum(
+            a.buffer_info()[1] * a.itemsize
+            for a in (self.edge_source, self.edge_target, self.edge_confidence,
+                      self.edge_type, self.offsets, self.adjacency)
+        ) + len(self.node_uuids) + len(self.edge_uuids)
+        # Dict slots plus the UUID keys and int values they point to
+        entry = sys.getsizeof(uuid.UUID(int=0)) + sys.getsizeof(2 ** 20)
+        node_map = sys.getsizeof(self.node_ids) + len(self.node_ids) * entry
+        edge_map = sys.getsizeof(self.edge_ids) + len(self.edge_ids) * entry
+        delta = sys.getsizeof(self.delta) + sum(sys.getsizeof(v) for v in self.delta.values())
+        return {
+            "arrays": arrays, "node_map": node_map, "edge_map": edge_map, "delta": delta,
+            "total": arrays + node_map + edge_map + delta,
+        }
+
+
+class RelationshipGraphIndex:
+    """Optional in-process copy of ioc_relationships for fast pivots
+
+    Built from a streaming scan at startup. Local relationship writes apply
+    their edges directly, other workers' writes arrive as relationship ids
+    on the ioc_relationship_changes channel and are fetched in batches;
+    ids that no longer exist, or lost an endpoint to an IOC deletion, are
+    removed. The delta is compacted into the CSR arrays in a thread once it
+    grows past `compact_fraction` of the graph, and the whole index is
+    rebuilt when change events may have been missed or removed edges pile up.
+    Pivots only use it while that channel is received: never without a
+    running listener, and not from a disconnect until the rebuild after the
+    reconnect has finished, they run the recursive query instead.
+    """
+
+    def __init__(self, compact_fraction: float = 0.1, compact_min_edges: int = 10000):
+        self.compact_fraction = compact_fraction
+        self.compact_min_edges = compact_min_edges
+        self.graph = RelationshipGraph()
+        self.ready = False
+        self.built_at: Optional[float] = None
+        self._pending_ids: Set[str] = set()
+        # Ids changed while a build is scanning, re-applied to the new graph
+        self._changed_during_build: Optional[Set[str]] = None
+        self._rebuild_requested_at = 0.0
+        self._scanned_at: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+        self._fetch_task: Optional[asyncio.Task] = None
+        self._compact_task: Optional[asyncio.Task] = None
+
+    def apply_edges(self, rows: Iterable) -> None:
+        """Apply (id, source_id, target_id, relationship_type, confidence_score) rows"""
+        rows = list(rows)
+        self._note_changed(row[0] for row in rows)
+        self._apply_rows(self.graph, rows)
+        self._maybe_compact()
+
+    def remove_edges(self, relationship_ids: Iterable[uuid.UUID]) -> None:
+        relationship_ids = list(relationship_ids)
+        self._note_changed(relationship_ids)
+        for relationship_id in relationship_ids:
+            self.graph.remove_edge(relationship_id)
+        self._maybe_compact()
+
+    def _note_changed(self, relationship_ids: Iterable) -> None:
+        if self._changed_during_build is not None:
+            self._changed_during_build.update(str(i) for i in relationship_ids)
+
+    @staticmethod
+    def _apply_rows(graph: RelationshipGraph, rows: Iterable) -> None:
+        for row in rows:
+            if row[1] is not None and row[2] is not None:
+                graph.add_edge(row[0], row[1], row[2], row[3], row[4])
+            else:
+                # The IOC at one end was deleted, which nulls the reference
+                graph.remove_edge(row[0])
+
+    async def _apply_ids(self, graph: RelationshipGraph, relationship_ids: Iterable[str]) -> None:
+        """Fetch the current rows for these ids and apply them, removing the ones that are gone"""
+        ids = {uuid.UUID(i) for i in relationship_ids}
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(self._edge_select().where(IOCRelationship.id.in_(ids)))
+            rows = result.all()
+        for missing in ids - {row[0] for row in rows}:
+            graph.remove_edge(missing)
+        self._apply_rows(graph, rows)
+
+    def _maybe_compact(self) -> None:
+        graph = self.graph
+        if len(graph.removed) >= max(self.compact_min_edges, graph.edge_count * self.compact_fraction) \
+                and (self._task is None or self._task.done()):
+            # Only a rebuild renumbers edges and drops the removed ones
+            self.request_rebuild()
+        if graph.delta_edges < max(self.compact_min_edges, graph.edge_count * self.compact_fraction):
+            return
+        if self._compact_task is None or self._compact_task.done():
+            self._compact_task = asyncio.create_task(self._compact())
+
+    async def _compact(self) -> None:
+        graph = self.graph
+        edges = graph.edge_count
+        offsets, adjacency = await asyncio.to_thread(graph.build_csr, edges)
+        if graph is self.graph:
+            graph.install_csr(offsets, adjacency, edges)
+
+    def on_relationship_changes(self, relationship_ids: List[str]) -> None:
+        """Relationship change listener subscriber"""
+        if DISCONNECTED in relationship_ids:
+            self.ready = False
+            return
+        if ALL_CHANGED in relationship_ids:
+            self.request_rebuild()
+            return
+        self._pending_ids.update(relationship_ids)
+        self._note_changed(relationship_ids)
+        if self._fetch_task is None or self._fetch_task.done():
+            self._fetch_task = asyncio.create_task(self._fetch_pending())
+
+    async def _fetch_pending(self) -> None:
+        try:
+            while self._pending_ids:
+                ids = list(self._pending_ids)
+                self._pending_ids.clear()
+                await self._apply_ids(self.graph, ids)
+                self._maybe_compact()
+        except Exception:
+            logger.exception("Relationship graph index update failed, rebuilding")
+            self.request_rebuild()
+
+    @staticmethod
+    def _edge_select():
+        return select(
+            IOCRelationship.id,
+            IOCRelationship.source_id,
+            IOCRelationship.target_id,
+            IOCRelationship.relationship_type,
+            IOCRelationship.confidence_score,
+        )
+
+    def request_rebuild(self) -> None:
+        self._rebuild_requested_at = time.monotonic()
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._refresh())
+
+    async def _refresh(self) -> None:
+        await relationship_change_listener.wait_until_listening()
+        try:
+            while self._scanned_at is None or self._rebuild_requested_at > self._scanned_at:
+                await self._build()
+            # A scan that overlapped a disconnect may have missed changes, the
+            # ALL_CHANGED sent on reconnect schedules another one
+            self.ready = relationship_change_listener.listening
+        except Exception:
+            logger.exception("Relationship graph index build failed")
+        finally:
+            self._changed_during_build = None
+
+    async def _build(self) -> None:
+        started = time.monotonic()
+        graph = RelationshipGraph()
+        self._changed_during_build = set()
+        self._scanned_at = time.monotonic()
+        async with AsyncSessionLocal() as db:
+            result = await db.stream(self._edge_select().execution_options(yield_per=SCAN_BATCH_SIZE))
+            async for rows in result.partitions():
+                for row in rows:
+                    if row[1] is not None and row[2] is not None:
+                        graph.add_edge(row[0], row[1], row[2], row[3], row[4], check_existing=False)
+        edges = graph.edge_count
+        graph.install_csr(*await asyncio.to_thread(graph.build_csr, edges), edges)
+        # The scan may have missed changes committed while it ran
+        while self._changed_during_build:
+            ids = list(self._changed_during_build)
+            self._changed_during_build.clear()
+            await self._apply_ids(graph, ids)
+        self._changed_during_build = None
+        self.graph = graph
+        self.built_at = time.time()
+        logger.info(
+            "Relationship graph index built with %d nodes and %d edges in %.1fs",
+            graph.node_count, graph.edge_count, time.monotonic() - started
+        )
+
+    def start(self) -> None:
+        if not relationship_change_listener.running:
+            logger.warning("Relationship change listener is not running, the relationship graph index stays disabled")
+            return
+        self.request_rebuild()
+
+    async def stop(self) -> None:
+        for task in (self._task, self._fetch_task, self._compact_task):
+            if task is not None:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._task = self._fetch_task = self._compact_task = None
+
+    def stats(self) -> dict:
+        graph = self.graph
+        memory = graph.memory_bytes()
+        return {
+            "enabled": get_settings().relationship_graph_index_enabled,
+            "ready": self.ready,
+            "nodes": graph.node_count,
+            "edges": graph.live_edge_count,
+            "delta_edges": graph.delta_edges,
+            "removed_edges": len(graph.removed),
+            "relationship_types": len(graph.type_names),
+            "memory_bytes": memory,
+            "bytes_per_million_edges": (
+                round(memory["total"] / graph.live_edge_count * 1_000_000) if graph.live_edge_count else None
+            ),
+        }
+
+
+relationship_graph_index = RelationshipGraphIndex()
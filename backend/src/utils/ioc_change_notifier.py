@@ -0,0 +1,176 @@
+import asyncio
+import logging
+from typing import Callable, Iterable, List, Optional
+
+import asyncpg
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+IOC_CHANGES_CHANNEL = "ioc_changes"
+RELATIONSHIP_CHANGES_CHANNEL = "ioc_relationship_changes"
+
+# Payload sent when the set of changed hashes is unknown or too large to list
+ALL_CHANGED = "*"
+
+# Published locally when the LISTEN connection is lost: until the listener is back
+# (and has published ALL_CHANGED) other workers' changes are not seen
+DISCONNECTED = "-"
+
+# NOTIFY payloads are capped at 8000 bytes, 100 sha256 hex digests fit comfortably
+HASHES_PER_NOTIFICATION = 100
+
+NOTIFY_STAGED_HASHES = text(f"""
+    SELECT pg_notify(:channel, string_agg(value_hash, ','))
+    FROM (
+        SELECT value_hash, (row_number() OVER ()) / {HASHES_PER_NOTIFICATION} AS grp
+        FROM ioc_bulk_staging
+    ) staged
+    GROUP BY grp
+""")
+
+NOTIFY_KEYS = text(f"""
+    SELECT pg_notify(:channel, string_agg(key, ','))
+    FROM (
+        SELECT key, (row_number() OVER ()) / {HASHES_PER_NOTIFICATION} AS grp
+        FROM unnest(CAST(:keys AS text[])) AS key
+    ) batched
+    GROUP BY grp
+""")
+
+
+async def _notify(db: AsyncSession, channel: str, keys: Iterable[str]) -> None:
+    """One statement however many keys, split into payloads of HASHES_PER_NOTIFICATION"""
+    if not get_settings().ioc_change_notifications:
+        return
+    keys = [k for k in keys if k]
+    if keys:
+        await db.execute(NOTIFY_KEYS, {"channel": channel, "keys": keys})
+
+
+async def notify_ioc_changes(db: AsyncSession, value_hashes: Iterable[str]) -> None:
+    """Queue a change event for other workers, delivered when the transaction commits"""
+    await _notify(db, IOC_CHANGES_CHANNEL, value_hashes)
+
+
+async def notify_relationship_changes(db: AsyncSession, relationship_ids: Iterable[str]) -> None:
+    """Queue a change event carrying the ids of inserted or updated relationships"""
+    await _notify(db, RELATIONSHIP_CHANGES_CHANNEL, (str(i) for i in relationship_ids))
+
+
+async def notify_all_changed(db: AsyncSession, channel: str = IOC_CHANGES_CHANNEL) -> None:
+    """Queue an ALL_CHANGED event, for writers that do not track the keys they changed
+
+    Anything writing iocs or ioc_relationships without going through the
+    services (raw SQL, external loaders) must send this, or the in-process
+    indexes of running workers will not see the rows.
+    """
+    if not get_settings().ioc_change_notifications:
+        return
+    await db.execute(text("SELECT pg_notify(:channel, :payload)"), {"channel": channel, "payload": ALL_CHANGED})
+
+
+async def notify_staged_ioc_changes(db: AsyncSession) -> None:
+    """Queue change events for every hash in the bulk ingest staging table"""
+    if not get_settings().ioc_change_notifications:
+        return
+    await db.execute(NOTIFY_STAGED_HASHES, {"channel": IOC_CHANGES_CHANNEL})
+
+
+class IOCChangeListener:
+    """LISTENs for IOC change events and fans them out to in-process subscribers
+
+    Subscribers get the list of changed keys (value hashes, or relationship
+    ids on the relationship channel), [DISCONNECTED] when the connection is
+    lost, and [ALL_CHANGED] when events may have been missed (once LISTEN is
+    active again after connecting or reconnecting).
+    """
+
+    def __init__(self, channel: str = IOC_CHANGES_CHANNEL, reconnect_delay: float = 5.0):
+        self.channel = channel
+        self.reconnect_delay = reconnect_delay
+        self._subscribers: List[Callable[[List[str]], None]] = []
+        self._task: Optional[asyncio.Task] = None
+        self._listening = asyncio.Event()
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    @property
+    def listening(self) -> bool:
+        return self._listening.is_set()
+
+    def subscribe(self, callback: Callable[[List[str]], None]) -> None:
+        if callback not in self._subscribers:
+            self._subscribers.append(callback)
+
+    def publish(self, value_hashes: List[str]) -> None:
+        """Deliver a change event to local subscribers"""
+        for callback in self._subscribers:
+            try:
+                callback(value_hashes)
+            except Exception:
+                logger.exception("IOC change subscriber failed")
+
+    def _on_notification(self, connection, pid, channel, payload: str) -> None:
+        self.publish(payload.split(","))
+
+    async def _listen_forever(self, dsn: str) -> None:
+        while True:
+            connection = None
+            try:
+                connection = await asyncpg.connect(dsn)
+                closed = asyncio.Event()
+                connection.add_termination_listener(lambda _: closed.set())
+                await connection.add_listener(self.channel, self._on_notification)
+                # Anything changed while we were not listening is unknown
+                self.publish([ALL_CHANGED])
+                self._listening.set()
+                await closed.wait()
+                logger.warning("IOC change listener connection closed, reconnecting")
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("IOC change listener failed, reconnecting")
+            finally:
+                if self._listening.is_set():
+                    self._listening.clear()
+                    self.publish([DISCONNECTED])
+                if connection is not None and not connection.is_closed():
+                    await connection.close()
+            await asyncio.sleep(self.reconnect_delay)
+
+    async def wait_until_listening(self, timeout: float = 10.0) -> None:
+        """Wait for LISTEN to be active, returns at once if the listener is not running"""
+        if self._task is None:
+            return
+        try:
+            await asyncio.wait_for(self._listening.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    def start(self) -> None:
+        settings = get_settings()
+        if not settings.ioc_change_notifications or self._task is not None:
+            return
+        # LISTEN needs a session of its own, which pgbouncer's transaction pooling does not give
+        dsn = (settings.database_listen_url or settings.database_url).replace("postgresql+asyncpg://", "postgresql://")
+        self._task = asyncio.create_task(self._listen_forever(dsn))
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+
+ioc_change_listener = IOCChangeListener()
+relationship_change_listener = IOCChangeListener(RELATIONSHIP_CHANGES_CHANNEL)
@@ -0,0 +1,200 @@
+import csv
+import io
+import json
+import uuid
+from datetime import datetime, timezone
+from enum import Enum
+from typing import AsyncIterator, Callable, Dict, List, Optional
+
+from src.utils.ioc_utils import IOCTypeEnum
+from src.utils.pagination import encode_sync_token
+
+
+class ExportFormat(str, Enum):
+    """Supported IOC export formats"""
+    NDJSON = "ndjson"
+    CSV = "csv"
+    STIX = "stix"
+
+
+EXPORT_MEDIA_TYPES = {
+    ExportFormat.NDJSON: "application/x-ndjson",
+    ExportFormat.CSV: "text/csv",
+    ExportFormat.STIX: "application/stix+json;version=2.1",
+}
+
+# Sorts after every id, so a caught-up token resumes at the watermark itself
+_LAST_ID = uuid.UUID(int=(1 << 128) - 1)
+
+CSV_COLUMNS = ["id", "type", "value", "value_hash", "tlp_level", "active", "created_at", "last_seen"]
+
+# STIX 2.1 predefined TLP marking definitions
+TLP_MARKINGS = {
+    "WHITE": "marking-definition--613f2e26-407d-48c7-9eca-b8e91df99dc9",
+    "GREEN": "marking-definition--34098fce-860f-48ae-8e50-ebd3cc5e41da",
+    "AMBER": "marking-definition--f88d31f6-486f-44da-b317-01333bde0b82",
+    "RED": "marking-definition--5e57c739-391a-4eb3-b6be-7d15ca92d5ed",
+}
+
+STIX_PATTERNS = {
+    IOCTypeEnum.IPV4_ADDR: "[ipv4-addr:value = '{}']",
+    IOCTypeEnum.IPV6_ADDR: "[ipv6-addr:value = '{}']",
+    IOCTypeEnum.IPV4_CIDR: "[ipv4-addr:value ISSUBSET '{}']",
+    IOCTypeEnum.IPV6_CIDR: "[ipv6-addr:value ISSUBSET '{}']",
+    IOCTypeEnum.DOMAIN: "[domain-name:value = '{}']",
+    IOCTypeEnum.EMAIL: "[email-addr:value = '{}']",
+    IOCTypeEnum.FILE_HASH_MD5: "[file:hashes.MD5 = '{}']",
+    IOCTypeEnum.FILE_HASH_SHA1: "[file:hashes.'SHA-1' = '{}']",
+    IOCTypeEnum.FILE_HASH_SHA256: "[file:hashes.'SHA-256' = '{}']",
+    IOCTypeEnum.FILE_HASH_SHA512: "[file:hashes.'SHA-512' = '{}']",
+    IOCTypeEnum.URL: "[url:value = '{}']",
+    IOCTypeEnum.MUTEX: "[mutex:name = '{}']",
+    IOCTypeEnum.REGISTRY_KEY: "[windows-registry-key:key = '{}']",
+}
+
+
+def _isoformat(value: Optional[datetime]) -> Optional[str]:
+    if value is None:
+        return None
+    return value.isoformat()
+
+
+def _stix_timestamp(value: Optional[datetime]) -> str:
+    if value is None:
+        value = datetime.now(timezone.utc)
+    elif value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+
+
+def _row_to_dict(row, type_names: Dict[int, str]) -> dict:
+    return {
+        "id": str(row.id),
+        "type": type_names.get(row.type_id),
+        "value": row.value,
+        "value_hash": row.value_hash,
+        "tlp_level": row.tlp_level,
+        "active": row.active,
+        "created_at": _isoformat(row.created_at),
+        "last_seen": _isoformat(row.last_seen),
+    }
+
+
+def _row_to_stix_indicator(row, type_names: Dict[int, str]) -> dict:
+    type_name = type_names.get(row.type_id)
+    created = _stix_timestamp(row.created_at)
+    indicator = {
+        "type": "indicator",
+        "spec_version": "2.1",
+        "id": f"indicator--{row.id}",
+        "created": created,
+        "modified": _stix_timestamp(row.last_seen),
+        "name": row.value,
+        "valid_from": created,
+        "revoked": not row.active,
+    }
+    if type_name == IOCTypeEnum.YARA_RULE:
+        indicator["pattern_type"] = "yara"
+        indicator["pattern"] = row.value
+    else:
+        escaped = row.value.replace("\\", "\\\\").replace("'", "\\'")
+        template = STIX_PATTERNS.get(type_name, "[x-threatsys-indicator:value = '{}']")
+        indicator["pattern_type"] = "stix"
+        indicator["pattern"] = template.format(escaped)
+    marking = TLP_MARKINGS.get((row.tlp_level or "").upper())
+    if marking:
+        indicator["object_marking_refs"] = [marking]
+    return indicator
+
+
+async def _export_ndjson(batches: AsyncIterator[List], type_names: Dict[int, str]) -> AsyncIterator[bytes]:
+    async for rows in batches:
+        yield "".join(json.dumps(_row_to_dict(row, type_names)) + "\n" for row in rows).encode("utf-8")
+
+
+async def _export_csv(batches: AsyncIterator[List], type_names: Dict[int, str]) -> AsyncIterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=CSV_COLUMNS)
+    writer.writeheader()
+    async for rows in batches:
+        for row in rows:
+            writer.writerow(_row_to_dict(row, type_names))
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+async def _export_stix(batches: AsyncIterator[List], type_names: Dict[int, str]) -> AsyncIterator[bytes]:
+    yield f'{{"type": "bundle", "id": "bundle--{uuid.uuid4()}", "objects": ['.encode("utf-8")
+    first = True
+    async for rows in batches:
+        if not rows:
+            continue
+        chunk = ",".join(json.dumps(_row_to_stix_indicator(row, type_names)) for row in rows)
+        yield (chunk if first else "," + chunk).encode("utf-8")
+        first = False
+    yield b"]}"
+
+
+EXPORTERS: Dict[ExportFormat, Callable[..., AsyncIterator[bytes]]] = {
+    ExportFormat.NDJSON: _export_ndjson,
+    ExportFormat.CSV: _export_csv,
+    ExportFormat.STIX: _export_stix,
+}
+
+
+def encode_export(
+    export_format: ExportFormat,
+    batches: AsyncIterator[List],
+    type_names: Dict[int, str],
+) -> AsyncIterator[bytes]:
+    """Encode batches of export rows into the requested format, chunk by chunk"""
+    return EXPORTERS[export_format](batches, type_names)
+
+
+def _change_to_dict(row, type_names: Dict[int, str]) -> dict:
+    if row.op == "delete":
+        return {
+            "op": "delete",
+            "id": str(row.id),
+            "type": type_names.get(row.type_id),
+            "value_hash": row.value_hash,
+            "deleted_at": _isoformat(row.deleted_at),
+        }
+    return {
+        "op": "upsert",
+        **_row_to_dict(row, type_names),
+        "metadata": row.metadata,
+        "source_org_id": str(row.source_org_id) if row.source_org_id else None,
+        "updated_at": _isoformat(row.updated_at),
+    }
+
+
+async def encode_changes(
+    batches: AsyncIterator[List],
+    type_names: Dict[int, str],
+    limit: int,
+    watermark: int,
+) -> AsyncIterator[bytes]:
+    """Encode delta sync rows as NDJSON, ending with a checkpoint line holding the next token
+
+    A full page resumes after its last row and sets `more`, otherwise the
+    client has caught up and the next token starts at the watermark.
+    """
+    count = 0
+    last = None
+    async for rows in batches:
+        if not rows:
+            continue
+        count += len(rows)
+        last = rows[-1]
+        yield "".join(json.dumps(_change_to_dict(row, type_names)) + "\n" for row in rows).encode("utf-8")
+
+    more = count >= limit
+    if more:
+        token = encode_sync_token(last.change_xid, last.id)
+    else:
+        token = encode_sync_token(watermark - 1, _LAST_ID)
+    yield (json.dumps({"op": "checkpoint", "next": token, "more": more}) + "\n").encode("utf-8")
@@ -0,0 +1,94 @@
+import ipaddress
+import re
+from typing import Dict, List, Tuple
+from urllib.parse import urlsplit
+
+from src.utils.ioc_utils import IOCTypeEnum
+
+Offsets = List[Tuple[int, int]]
+Candidates = Dict[str, Dict[str, Offsets]]
+
+_OCTET = rb"(?:25[0-5]|2[0-4][0-9]|1[0-9]{2}|[1-9]?[0-9])"
+_IPV4 = rb"(?:" + _OCTET + rb"\.){3}" + _OCTET
+_LABEL = rb"[A-Za-z0-9](?:[A-Za-z0-9-]{0,61}[A-Za-z0-9])?"
+_TLD = rb"[A-Za-z][A-Za-z0-9-]{0,61}[A-Za-z0-9]"
+
+# One pass over the input, alternatives are tried in order at each position so URLs and
+# emails win over the domains inside them. Every repetition is bounded (labels per name,
+# local part and URL length, hex run lengths), so a failed attempt costs a constant number
+# of steps and scanning stays linear in the input size whatever the text looks like.
+# Every alternative only matches ASCII, the URL one printable ASCII without <>"'`{}|\^,
+# so matches always decode as ASCII whatever bytes surround them.
+SCANNER = re.compile(
+    rb"(?P<url>\b(?:https?|ftp)://[!#-&(-;=?-\[\]_a-z~]{1,2048})"
+    rb"|(?P<email>\b[A-Za-z0-9._%+-]{1,64}@(?:" + _LABEL + rb"\.){1,16}" + _TLD + rb")(?![A-Za-z0-9-])"
+    rb"|(?P<hash>\b(?:[A-Fa-f0-9]{128}|[A-Fa-f0-9]{64}|[A-Fa-f0-9]{40}|[A-Fa-f0-9]{32})\b)"
+    rb"|(?P<ipv4>(?<![0-9.])" + _IPV4 + rb"(?![0-9]|\.[0-9]))"
+    rb"|(?P<ipv6>(?<![\w:.])(?:[A-Fa-f0-9]{0,4}:){2,7}(?:" + _IPV4 + rb"|[A-Fa-f0-9]{1,4})?(?![\w:]))"
+    rb"|(?P<domain>\b(?:" + _LABEL + rb"\.){1,16}" + _TLD + rb"(?![\w-]|\.[A-Za-z0-9]))"
+)
+
+HASH_TYPES = {
+    32: IOCTypeEnum.FILE_HASH_MD5,
+    40: IOCTypeEnum.FILE_HASH_SHA1,
+    64: IOCTypeEnum.FILE_HASH_SHA256,
+    128: IOCTypeEnum.FILE_HASH_SHA512,
+}
+
+# Sentence punctuation that ends up glued to URLs in prose and logs
+URL_TRAILING = ".,;:!?)]}'\""
+
+
+def _host_type(host: str) -> IOCTypeEnum:
+    try:
+        address = ipaddress.ip_address(host)
+    except ValueError:
+        return IOCTypeEnum.DOMAIN
+    return IOCTypeEnum.IPV4_ADDR if address.version == 4 else IOCTypeEnum.IPV6_ADDR
+
+
+def extract_candidates(data: bytes) -> Candidates:
+    """Candidate indicators in `data` by IOC type name and raw value, with their byte offsets
+
+    Offsets are (start, end) byte positions into `data`, end exclusive. The
+    host of a URL and the domain of an email address are reported as
+    candidates of their own as well. Values are not validated here, that is
+    left to IOCUtils.normalize_many. Runs in the CPU offload pool, so it only
+    takes and returns picklable values.
+    """
+    candidates: Candidates = {}
+
+    def add(ioc_type: IOCTypeEnum, value: str, start: int, end: int) -> None:
+        candidates.setdefault(ioc_type.value, {}).setdefault(value, []).append((start, end))
+
+    for match in SCANNER.finditer(data):
+        kind = match.lastgroup
+        start, end = match.span()
+        value = match.group().decode("ascii")
+        if kind == "url":
+            stripped = value.rstrip(URL_TRAILING)
+            end -= len(value) - len(stripped)
+            add(IOCTypeEnum.URL, stripped, start, end)
+            try:
+                host = urlsplit(stripped).hostname
+            except ValueError:
+                host = None
+            if host:
+                host_start = stripped.lower().find(host, stripped.index("://") + 3)
+                if host_start >= 0:
+                    add(_host_type(host), host, start + host_start, start + host_start + len(host))
+        elif kind == "email":
+            add(IOCTypeEnum.EMAIL, value, start, end)
+            domain_start = value.index("@") + 1
+            add(IOCTypeEnum.DOMAIN, value[domain_start:], start + domain_start, end)
+        elif kind == "hash":
+            add(HASH_TYPES[len(value)], value, start, end)
+        elif kind == "ipv4":
+            add(IOCTypeEnum.IPV4_ADDR, value, start, end)
+        elif kind == "ipv6":
+            if not value.strip(":"):
+                continue
+            add(IOCTypeEnum.IPV6_ADDR, value, start, end)
+        else:
+            add(IOCTypeEnum.DOMAIN, value, start, end)
+    return candidates
@@ -0,0 +1,120 @@
+import codecs
+import csv
+import json
+from typing import Any, AsyncIterator, Dict, Iterable, List, NamedTuple, Union
+
+from src.exceptions import InvalidBulkPayloadException
+
+
+class MalformedRecord(NamedTuple):
+    """Placeholder yielded for a feed line that could not be parsed"""
+    detail: str
+
+
+FeedRecord = Union[Dict[str, Any], MalformedRecord]
+
+
+def _check_line_length(length: int, max_line_length: int) -> None:
+    if length > max_line_length:
+        raise InvalidBulkPayloadException(f"line longer than {max_line_length} characters")
+
+
+async def _iter_lines(chunks: AsyncIterator[bytes], max_line_length: int) -> AsyncIterator[str]:
+    """Split a byte stream into decoded lines without buffering the whole body
+
+    Only the newly decoded text of each chunk is split, the unfinished line
+    is kept as a list of pieces and joined once its newline arrives.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    pending: List[str] = []
+    pending_length = 0
+    async for chunk in chunks:
+        *lines, tail = decoder.decode(chunk).split("\n")
+        for line in lines:
+            if pending:
+                pending.append(line)
+                line = "".join(pending)
+                pending, pending_length = [], 0
+            _check_line_length(len(line), max_line_length)
+            yield line.rstrip("\r")
+        if tail:
+            pending.append(tail)
+            pending_length += len(tail)
+            _check_line_length(pending_length, max_line_length)
+    pending.append(decoder.decode(b"", final=True))
+    line = "".join(pending)
+    if line:
+        _check_line_length(len(line), max_line_length)
+        yield line.rstrip("\r")
+
+
+async def iter_ndjson(chunks: AsyncIterator[bytes], max_line_length: int) -> AsyncIterator[FeedRecord]:
+    """Parse a newline-delimited JSON stream, one IOC object per line"""
+    async for line in _iter_lines(chunks, max_line_length):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield MalformedRecord(f"Invalid JSON: {e}")
+            continue
+        if not isinstance(record, dict):
+            yield MalformedRecord("Expected a JSON object")
+            continue
+        yield record
+
+
+async def iter_csv(chunks: AsyncIterator[bytes], max_line_length: int) -> AsyncIterator[FeedRecord]:
+    """Parse a CSV stream with a header row, one IOC per line
+
+    Quoted fields spanning several lines are not supported, use NDJSON for
+    values that contain newlines (e.g. YARA rules).
+    """
+    header: List[str] = []
+    async for line in _iter_lines(chunks, max_line_length):
+        if not line.strip():
+            continue
+        try:
+            fields = next(csv.reader([line]))
+        except csv.Error as e:
+            yield MalformedRecord(f"Invalid CSV: {e}")
+            continue
+        if not header:
+            header = [f.strip() for f in fields]
+            continue
+        if len(fields) != len(header):
+            yield MalformedRecord(f"Expected {len(header)} columns, got {len(fields)}")
+            continue
+        yield {k: v for k, v in zip(header, fields) if v != ""}
+
+
+def parse_json_array(body: bytes) -> List[FeedRecord]:
+    """Parse a JSON array body"""
+    try:
+        records = json.loads(body)
+    except ValueError as e:
+        raise ValueError(f"Invalid JSON body: {e}")
+    if not isinstance(records, list):
+        raise ValueError("Expected a JSON array of IOCs")
+    return [
+        record if isinstance(record, dict) else MalformedRecord("Expected a JSON object")
+        for record in records
+    ]
+
+
+async def aiter_records(records: Iterable[FeedRecord]) -> AsyncIterator[FeedRecord]:
+    for record in records:
+        yield record
+
+
+async def achunked(records: AsyncIterator[FeedRecord], size: int) -> AsyncIterator[List[FeedRecord]]:
+    """Group an async record stream into lists of at most `size` records"""
+    chunk: List[FeedRecord] = []
+    async for record in records:
+        chunk.append(record)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
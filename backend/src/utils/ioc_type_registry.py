@@ -0,0 +1,76 @@
+import asyncio
+import time
+from typing import Dict, NamedTuple, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+from src.models.ioc_type import IOCType
+from src.config import get_settings
+
+
+class IOCTypeEntry(NamedTuple):
+    """Immutable in-memory copy of an ioc_types row"""
+    id: int
+    name: str
+    category: str
+
+
+class IOCTypeRegistry:
+    """Process-wide cache of the ioc_types table
+
+    The table is tiny and almost never changes, so it is loaded once and
+    served from memory. It is reloaded when the TTL expires, when a lookup
+    misses (a type may have been added since the last load) or after an
+    explicit invalidate().
+    """
+
+    def __init__(self, ttl: float = 300.0, miss_reload_interval: float = 5.0):
+        self.ttl = ttl
+        self.miss_reload_interval = miss_reload_interval
+        self._types: Dict[int, IOCTypeEntry] = {}
+        self._loaded_at: Optional[float] = None
+        self._lock = asyncio.Lock()
+
+    @property
+    def is_stale(self) -> bool:
+        if self._loaded_at is None:
+            return True
+        return time.monotonic() - self._loaded_at > self.ttl
+
+    async def load(self, db: AsyncSession) -> None:
+        """Reload every IOC type from the database"""
+        result = await db.execute(select(IOCType.id, IOCType.name, IOCType.category))
+        self._types = {row.id: IOCTypeEntry(row.id, row.name, row.category) for row in result}
+        self._loaded_at = time.monotonic()
+
+    async def refresh_if_stale(self, db: AsyncSession) -> None:
+        if not self.is_stale:
+            return
+        async with self._lock:
+            if self.is_stale:
+                await self.load(db)
+
+    def invalidate(self) -> None:
+        """Force a reload on the next lookup"""
+        self._loaded_at = None
+
+    def get_cached(self, type_id: int) -> Optional[IOCTypeEntry]:
+        """Lookup without touching the database"""
+        return self._types.get(type_id)
+
+    async def get(self, db: AsyncSession, type_id: int) -> Optional[IOCTypeEntry]:
+        """Get IOC type by ID, reloading the registry if needed"""
+        await self.refresh_if_stale(db)
+        entry = self._types.get(type_id)
+        if entry is None and self._loaded_at is not None \
+                and time.monotonic() - self._loaded_at > self.miss_reload_interval:
+            # Unknown id: reload in case the type was added after the last load
+            self.invalidate()
+            await self.refresh_if_stale(db)
+            entry = self._types.get(type_id)
+        return entry
+
+    def all(self) -> Dict[int, IOCTypeEntry]:
+        return dict(self._types)
+
+
+ioc_type_registry = IOCTypeRegistry(ttl=get_settings().ioc_type_cache_ttl)
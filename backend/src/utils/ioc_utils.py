@@ -1,4 +1,6 @@
 from enum import Enum
+from functools import lru_cache
+from typing import Callable, List, Optional, Tuple
 import hashlib
 import re
 import ipaddress
@@ -10,6 +12,8 @@ class IOCTypeEnum(str, Enum):
     """Enumeration of supported IOC types"""
     IPV4_ADDR = "ipv4_addr"
     IPV6_ADDR = "ipv6_addr"
+    IPV4_CIDR = "ipv4_cidr"
+    IPV6_CIDR = "ipv6_cidr"
     DOMAIN = "domain"
     EMAIL = "email"
     FILE_HASH_MD5 = "file_hash_md5"
@@ -34,10 +38,25 @@ class IOCUtils:
             return False
 
     def is_ipv6(value: str) -> bool:
+        # Zone ids (fe80::1%eth0) only mean something on one host, and Postgres inet rejects them
         try:
-            return isinstance(ipaddress.ip_address(value), ipaddress.IPv6Address)
+            address = ipaddress.ip_address(value)
         except ValueError:
             return False
+        return isinstance(address, ipaddress.IPv6Address) and address.scope_id is None
+
+    def is_ipv4_cidr(value: str) -> bool:
+        try:
+            return isinstance(ipaddress.ip_network(value, strict=False), ipaddress.IPv4Network)
+        except ValueError:
+            return False
+
+    def is_ipv6_cidr(value: str) -> bool:
+        try:
+            network = ipaddress.ip_network(value, strict=False)
+        except ValueError:
+            return False
+        return isinstance(network, ipaddress.IPv6Network) and network.network_address.scope_id is None
 
     def is_email(value: str) -> bool:
         try:
@@ -60,13 +79,29 @@ class IOCUtils:
         IOCTypeEnum.FILE_HASH_SHA512: re.compile(r'^[a-fA-F0-9]{128}$'),
     }
         
+    # Same rules validators.domain applies to an already-ASCII name
+    ASCII_DOMAIN_PATTERN = re.compile(
+        r'(?:[a-z0-9](?:[a-z0-9-]{0,61}[a-z0-9])?\.)+[a-z0-9][a-z0-9-]{0,61}[a-z]',
+        re.IGNORECASE
+    )
+
     NON_HASH_PATTERNS = {
         IOCTypeEnum.DOMAIN: is_domain,
         IOCTypeEnum.IPV4_ADDR: is_ipv4,
         IOCTypeEnum.IPV6_ADDR: is_ipv6,
+        IOCTypeEnum.IPV4_CIDR: is_ipv4_cidr,
+        IOCTypeEnum.IPV6_CIDR: is_ipv6_cidr,
         IOCTypeEnum.EMAIL: is_email
     }
 
+    # Types whose values are stored in iocs.network for containment lookups
+    NETWORK_TYPES = {
+        IOCTypeEnum.IPV4_ADDR,
+        IOCTypeEnum.IPV6_ADDR,
+        IOCTypeEnum.IPV4_CIDR,
+        IOCTypeEnum.IPV6_CIDR
+    }
+
     @classmethod
     def validate_value(self, ioc_type_name: str, value: str) -> bool:
         """Validate IOC value against its specific pattern"""
@@ -112,5 +147,117 @@ class IOCUtils:
                 return str(ipaddress.IPv6Address(value))
             except ipaddress.AddressValueError:
                 return value.lower()
+        elif ioc_type in [IOCTypeEnum.IPV4_CIDR, IOCTypeEnum.IPV6_CIDR]:
+            # Host bits are dropped so 10.1.2.3/8 and 10.0.0.0/8 are the same IOC
+            try:
+                return str(ipaddress.ip_network(value, strict=False))
+            except ValueError:
+                return value
             
         return value
+
+    @classmethod
+    def normalize_many(
+        self, ioc_type_name: str, values: List[str]
+    ) -> Tuple[List[Optional[str]], List[Optional[str]], List[Optional[str]]]:
+        """Validate, normalize and hash a batch of values of one type
+
+        Returns parallel lists of normalized values, hashes and errors, where
+        each index has either a value and hash or an error. Equivalent to
+        calling validate_value, get_normalized_value and compute_hash per
+        value, but dispatches on the type once and validates repeats once.
+        """
+        normalize, hash_is_value = _batch_normalizer(ioc_type_name)
+        sha256 = hashlib.sha256
+        seen = {}
+        normalized, hashes, errors = [], [], []
+        for value in values:
+            outcome = seen.get(value)
+            if outcome is None:
+                normalized_value = normalize(value)
+                if normalized_value is None:
+                    outcome = (None, None, f"Invalid format for {ioc_type_name}: {value}")
+                elif hash_is_value:
+                    outcome = (normalized_value, normalized_value, None)
+                else:
+                    outcome = (normalized_value, sha256(normalized_value.encode("utf-8")).hexdigest(), None)
+                seen[value] = outcome
+            normalized.append(outcome[0])
+            hashes.append(outcome[1])
+            errors.append(outcome[2])
+        return normalized, hashes, errors
+
+
+def reverse_domain(domain: str) -> str:
+    """'cdn.example.com' -> 'com.example.cdn', as stored in iocs.reversed_domain"""
+    return ".".join(reversed(domain.rstrip(".").split(".")))
+
+
+def parent_domain_keys(domain: str) -> List[str]:
+    """Reversed keys of a domain and each of its parents down to two labels, most specific first"""
+    labels = domain.rstrip(".").split(".")[::-1]
+    return [".".join(labels[:n]) for n in range(len(labels), 1, -1)]
+
+
+def _normalize_domain(value: str) -> Optional[str]:
+    if value.isascii():
+        valid = len(value) <= 253 and IOCUtils.ASCII_DOMAIN_PATTERN.fullmatch(value) is not None
+    else:
+        valid = IOCUtils.is_domain(value)
+    return value.lower() if valid else None
+
+
+def _normalize_email(value: str) -> Optional[str]:
+    return value.lower() if IOCUtils.is_email(value) else None
+
+
+def _normalize_ipv4(value: str) -> Optional[str]:
+    try:
+        ipaddress.IPv4Address(value)
+    except ValueError:
+        return None
+    return value
+
+
+def _normalize_ipv6(value: str) -> Optional[str]:
+    try:
+        address = ipaddress.IPv6Address(value)
+    except ValueError:
+        return None
+    return str(address) if address.scope_id is None else None
+
+
+def _normalize_ipv4_cidr(value: str) -> Optional[str]:
+    try:
+        return str(ipaddress.IPv4Network(value, strict=False))
+    except ValueError:
+        return None
+
+
+def _normalize_ipv6_cidr(value: str) -> Optional[str]:
+    try:
+        network = ipaddress.IPv6Network(value, strict=False)
+    except ValueError:
+        return None
+    return str(network) if network.network_address.scope_id is None else None
+
+
+@lru_cache(maxsize=None)
+def _batch_normalizer(ioc_type_name: str) -> Tuple[Callable[[str], Optional[str]], bool]:
+    """(normalize, hash_is_value) for a type name, normalize returns None for invalid values"""
+    try:
+        ioc_type = IOCTypeEnum(ioc_type_name.lower())
+    except ValueError:
+        return (lambda value: value), False
+
+    if ioc_type in IOCUtils.HASH_PATTERNS:
+        match = IOCUtils.HASH_PATTERNS[ioc_type].match
+        return (lambda value: value.lower() if match(value) else None), True
+    return {
+        IOCTypeEnum.DOMAIN: _normalize_domain,
+        IOCTypeEnum.EMAIL: _normalize_email,
+        IOCTypeEnum.IPV4_ADDR: _normalize_ipv4,
+        IOCTypeEnum.IPV6_ADDR: _normalize_ipv6,
+        IOCTypeEnum.IPV4_CIDR: _normalize_ipv4_cidr,
+        IOCTypeEnum.IPV6_CIDR: _normalize_ipv6_cidr,
+    }.get(ioc_type, lambda value: value), False
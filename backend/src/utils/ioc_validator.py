@@ -1,8 +1,7 @@
 from typing import Optional
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from src.models.ioc_type import IOCType
 from src.utils.ioc_utils import IOCUtils
+from src.utils.ioc_type_registry import ioc_type_registry, IOCTypeEntry
 
 
 class IOCValidator:
@@ -11,12 +10,9 @@ class IOCValidator:
     def __init__(self, db: AsyncSession):
         self.db = db
     
-    async def get_ioc_type_by_id(self, type_id: int) -> Optional['IOCType']:
-        """Get IOC type by ID"""
-        result = await self.db.execute(
-            select(IOCType).where(IOCType.id == type_id)
-        )
-        return result.scalar_one_or_none()
+    async def get_ioc_type_by_id(self, type_id: int) -> Optional[IOCTypeEntry]:
+        """Get IOC type by ID from the in-process type registry"""
+        return await ioc_type_registry.get(self.db, type_id)
     
     async def validate_and_normalize_ioc(self, type_id: int, value: str) -> tuple[str, str]:
         """Validate IOC value and return (normalized_value, value_hash)"""
@@ -31,4 +27,4 @@ class IOCValidator:
 
         value_hash = IOCUtils.compute_hash(ioc_type.name, normalized_value)
         
-        return normalized_value, value_hash
\ No newline at end of file
+        return normalized_value, value_hash
@@ -0,0 +1,62 @@
+import json
+import logging
+import re
+
+# Attributes every LogRecord has, anything else was passed through `extra=`
+STANDARD_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+# Values that need quoting to stay one key=value token
+NEEDS_QUOTING = re.compile(r'[\s="]')
+
+
+def extra_fields(record: logging.LogRecord) -> dict:
+    return {key: value for key, value in vars(record).items() if key not in STANDARD_RECORD_ATTRIBUTES}
+
+
+class JSONLogFormatter(logging.Formatter):
+    """One JSON object per record, with the `extra=` fields as top-level keys"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        entry.update(extra_fields(record))
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class PlainLogFormatter(logging.Formatter):
+    """Human-readable lines with the `extra=` fields appended as key=value pairs"""
+
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    def formatMessage(self, record: logging.LogRecord) -> str:
+        line = super().formatMessage(record)
+        pairs = [f"{key}={self._format_value(value)}" for key, value in extra_fields(record).items()]
+        return f"{line} {' '.join(pairs)}" if pairs else line
+
+    @staticmethod
+    def _format_value(value) -> str:
+        text = value if isinstance(value, str) else json.dumps(value, default=str)
+        if isinstance(value, str) and (not text or NEEDS_QUOTING.search(text)):
+            # JSON string escaping keeps multi-line values such as SQL on one line
+            text = json.dumps(text)
+        return text
+
+
+def configure_logging(level: str, json_format: bool) -> None:
+    """Log the application's `src.*` loggers at `level`, as JSON lines if requested"""
+    handler = logging.StreamHandler()
+    if json_format:
+        handler.setFormatter(JSONLogFormatter())
+    else:
+        handler.setFormatter(PlainLogFormatter())
+    app_logger = logging.getLogger("src")
+    app_logger.handlers = [handler]
+    app_logger.setLevel(level.upper())
+    app_logger.propagate = False
@@ -0,0 +1,205 @@
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from src.config import get_settings
+from src.utils.ioc_change_notifier import ALL_CHANGED, DISCONNECTED
+
+# Stored for known misses so repeated lookups of unknown values skip the database
+NEGATIVE = object()
+
+# (type_id, value_hash), the identity of an IOC
+CacheKey = Tuple[int, str]
+
+
+class CacheStats:
+    """Counters exposed by every cache backend"""
+
+    def __init__(self):
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def as_dict(self) -> Dict[str, Any]:
+        lookups = self.hits + self.negative_hits + self.misses
+        return {
+            "hits": self.hits,
+            "negative_hits": self.negative_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+            "hit_ratio": (self.hits + self.negative_hits) / lookups if lookups else 0.0,
+        }
+
+
+class CacheBackend(ABC):
+    """Interface for lookup cache backends
+
+    get() returns (found, value); value is NEGATIVE for a cached miss.
+    """
+
+    def __init__(self):
+        self.stats = CacheStats()
+
+    @abstractmethod
+    def get(self, key: CacheKey) -> Tuple[bool, Any]:
+        ...
+
+    @abstractmethod
+    def set(self, key: CacheKey, value: Any, ttl: float) -> None:
+        ...
+
+    @abstractmethod
+    def delete_many(self, keys: Iterable[CacheKey]) -> None:
+        ...
+
+    @abstractmethod
+    def clear(self) -> None:
+        ...
+
+    @abstractmethod
+    def __len__(self) -> int:
+        ...
+
+
+class LocalLRUCache(CacheBackend):
+    """In-process LRU cache with per-entry TTL
+
+    Each worker holds its own copy, cross-worker consistency comes from the
+    invalidation events in ioc_change_notifier (and the TTL as a backstop).
+    """
+
+    def __init__(self, max_entries: int = 100_000):
+        super().__init__()
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[CacheKey, Tuple[float, Any]]" = OrderedDict()
+
+    def get(self, key: CacheKey) -> Tuple[bool, Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.stats.misses += 1
+            return False, None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            self.stats.expirations += 1
+            self.stats.misses += 1
+            return False, None
+        self._entries.move_to_end(key)
+        if value is NEGATIVE:
+            self.stats.negative_hits += 1
+        else:
+            self.stats.hits += 1
+        return True, value
+
+    def set(self, key: CacheKey, value: Any, ttl: float) -> None:
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats.evictions += 1
+
+    def delete_many(self, keys: Iterable[CacheKey]) -> None:
+        for key in keys:
+            if self._entries.pop(key, None) is not None:
+                self.stats.invalidations += 1
+
+    def clear(self) -> None:
+        self.stats.invalidations += len(self._entries)
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+CACHE_BACKENDS = {
+    "local": LocalLRUCache,
+}
+
+
+class IOCLookupCache:
+    """(type_id, value_hash) -> IOC row cache in front of IOCService.get_by_hash
+
+    Change events only carry value hashes, so an invalidation drops the
+    entries of every type id this cache has stored for each hash. While the
+    change listener is disconnected other workers' writes go unseen, so the
+    cache is emptied and bypassed until the ALL_CHANGED after the reconnect.
+    """
+
+    def __init__(self, backend: Optional[CacheBackend], ttl: float, negative_ttl: float):
+        self.backend = backend
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        # Bumped on every invalidation so a lookup that raced one does not cache a stale row
+        self.generation = 0
+        self.suspended = False
+        self._type_ids: Set[int] = set()
+
+    @property
+    def enabled(self) -> bool:
+        return self.backend is not None
+
+    def get(self, type_id: int, value_hash: str) -> Tuple[bool, Any]:
+        if self.backend is None or self.suspended:
+            return False, None
+        return self.backend.get((type_id, value_hash))
+
+    def set(self, type_id: int, value_hash: str, row: Any, generation: int) -> None:
+        if self.backend is not None and not self.suspended and generation == self.generation:
+            self._type_ids.add(type_id)
+            self.backend.set((type_id, value_hash), row, self.ttl)
+
+    def set_negative(self, type_id: int, value_hash: str, generation: int) -> None:
+        if self.backend is not None and not self.suspended and self.negative_ttl > 0 and generation == self.generation:
+            self._type_ids.add(type_id)
+            self.backend.set((type_id, value_hash), NEGATIVE, self.negative_ttl)
+
+    def invalidate(self, value_hashes: Iterable[str]) -> None:
+        self.generation += 1
+        if self.backend is not None:
+            type_ids = list(self._type_ids)
+            self.backend.delete_many(
+                (type_id, value_hash) for value_hash in value_hashes for type_id in type_ids
+            )
+
+    def clear(self) -> None:
+        self.generation += 1
+        if self.backend is not None:
+            self.backend.clear()
+
+    def on_ioc_changes(self, value_hashes: List[str]) -> None:
+        """IOCChangeListener subscriber"""
+        if DISCONNECTED in value_hashes:
+            self.suspended = True
+            self.clear()
+        elif ALL_CHANGED in value_hashes:
+            self.suspended = False
+            self.clear()
+        else:
+            self.invalidate(value_hashes)
+
+    def stats(self) -> Dict[str, Any]:
+        if self.backend is None:
+            return {"enabled": False}
+        return {
+            "enabled": True,
+            "suspended": self.suspended,
+            "entries": len(self.backend),
+            **self.backend.stats.as_dict(),
+        }
+
+
+def build_lookup_cache() -> IOCLookupCache:
+    settings = get_settings()
+    backend = None
+    if settings.ioc_cache_enabled:
+        backend = CACHE_BACKENDS[settings.ioc_cache_backend](max_entries=settings.ioc_cache_max_entries)
+    return IOCLookupCache(backend, settings.ioc_cache_ttl, settings.ioc_cache_negative_ttl)
+
+
+ioc_lookup_cache = build_lookup_cache()
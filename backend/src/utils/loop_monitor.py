@@ -0,0 +1,56 @@
+import asyncio
+import time
+from collections import deque
+from typing import Optional
+
+
+class LoopLagMonitor:
+    """Measures how late the event loop wakes up from a fixed sleep
+
+    Lag is the time a ready callback waits for the loop, i.e. how long
+    something blocked it. Keeps the last `window` samples.
+    """
+
+    def __init__(self, interval: float = 0.5, window: int = 120):
+        self.interval = interval
+        self.samples = deque(maxlen=window)
+        self.max_lag = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self) -> None:
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, time.perf_counter() - start - self.interval)
+            self.samples.append(lag)
+            self.max_lag = max(self.max_lag, lag)
+
+    @property
+    def last_lag(self) -> float:
+        return self.samples[-1] if self.samples else 0.0
+
+    def stats(self) -> dict:
+        samples = sorted(self.samples)
+        return {
+            "last_ms": round(self.last_lag * 1000, 2),
+            "p99_ms": round(samples[int(len(samples) * 0.99)] * 1000, 2) if samples else 0.0,
+            "window_max_ms": round(samples[-1] * 1000, 2) if samples else 0.0,
+            "max_ms": round(self.max_lag * 1000, 2),
+        }
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+
+loop_lag_monitor = LoopLagMonitor()
@@ -0,0 +1,227 @@
+import asyncio
+import ipaddress
+import logging
+import time
+import uuid
+from typing import Dict, Iterable, List, Optional, Set, Tuple, Union
+
+from sqlalchemy import cast, select
+from sqlalchemy.dialects.postgresql import CIDR
+
+from src.config import get_settings
+from src.database import AsyncSessionLocal
+from src.models.ioc import IOC
+from src.utils.ioc_change_notifier import ALL_CHANGED, DISCONNECTED, ioc_change_listener
+
+logger = logging.getLogger(__name__)
+
+SCAN_BATCH_SIZE = 10000
+
+IPAddress = Union[ipaddress.IPv4Address, ipaddress.IPv6Address]
+IPNetwork = Union[ipaddress.IPv4Network, ipaddress.IPv6Network]
+
+ADDRESS_BITS = {4: 32, 6: 128}
+
+
+class PrefixTable:
+    """Stored networks by IP version and prefix length, for containment lookups
+
+    Each prefix length in use has a dict from network address (as an int) to
+    the IOC ids stored for that network. A lookup masks the address once per
+    prefix length in use, longest first, so it is at most 33 (IPv4) or 129
+    (IPv6) dict probes and memory grows with the number of networks rather
+    than with the bits of every prefix as in a trie.
+    """
+
+    def __init__(self):
+        self.tables: Dict[int, Dict[int, Dict[int, List[uuid.UUID]]]] = {4: {}, 6: {}}
+        self.lengths: Dict[int, List[int]] = {4: [], 6: []}
+        # id -> (value_hash, version, prefix length, network address)
+        self.entries: Dict[uuid.UUID, Tuple[str, int, int, int]] = {}
+        self.by_hash: Dict[str, Set[uuid.UUID]] = {}
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def add(self, ioc_id: uuid.UUID, value_hash: str, network: IPNetwork) -> None:
+        self.remove(ioc_id)
+        version, length, address = network.version, network.prefixlen, int(network.network_address)
+        table = self.tables[version].get(length)
+        if table is None:
+            table = self.tables[version][length] = {}
+            self.lengths[version] = sorted(self.tables[version], reverse=True)
+        table.setdefault(address, []).append(ioc_id)
+        self.entries[ioc_id] = (value_hash, version, length, address)
+        self.by_hash.setdefault(value_hash, set()).add(ioc_id)
+
+    def remove(self, ioc_id: uuid.UUID) -> None:
+        entry = self.entries.pop(ioc_id, None)
+        if entry is None:
+            return
+        value_hash, version, length, address = entry
+        table = self.tables[version][length]
+        ids = table[address]
+        ids.remove(ioc_id)
+        if not ids:
+            del table[address]
+            if not table:
+                del self.tables[version][length]
+                self.lengths[version] = sorted(self.tables[version], reverse=True)
+        hash_ids = self.by_hash[value_hash]
+        hash_ids.discard(ioc_id)
+        if not hash_ids:
+            del self.by_hash[value_hash]
+
+    def remove_hashes(self, value_hashes: Iterable[str]) -> None:
+        for value_hash in value_hashes:
+            for ioc_id in list(self.by_hash.get(value_hash, ())):
+                self.remove(ioc_id)
+
+    def lookup(self, address: IPAddress) -> List[uuid.UUID]:
+        """Ids of every stored network containing `address`, most specific first"""
+        bits = ADDRESS_BITS[address.version]
+        tables = self.tables[address.version]
+        value = int(address)
+        matches = []
+        for length in self.lengths[address.version]:
+            shift = bits - length
+            ids = tables[length].get(value >> shift << shift)
+            if ids:
+                matches.extend(ids)
+        return matches
+
+
+class IOCNetworkIndex:
+    """Optional in-process copy of iocs.network for hot-path IP enrichment
+
+    Built from a streaming scan at startup and kept current from the IOC
+    change channel: the changed hashes are dropped and their rows, if any
+    are still stored, fetched again. Rebuilt when events may have been missed.
+    Like the bloom filter it is only used while that channel is received:
+    never without a running listener, and not from a disconnect until the
+    rebuild after the reconnect has finished, lookups query Postgres instead.
+    """
+
+    def __init__(self):
+        self.table = PrefixTable()
+        self.ready = False
+        self.built_at: Optional[float] = None
+        self.lookups = 0
+        self._pending_hashes: Set[str] = set()
+        # Hashes changed while a build is scanning, re-applied to the new table
+        self._changed_during_build: Optional[Set[str]] = None
+        self._rebuild_requested_at = 0.0
+        self._scanned_at: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+        self._fetch_task: Optional[asyncio.Task] = None
+
+    def lookup_many(self, addresses: Iterable[IPAddress]) -> Dict[IPAddress, List[uuid.UUID]]:
+        table = self.table
+        results = {address: table.lookup(address) for address in addresses}
+        self.lookups += len(results)
+        return results
+
+    @staticmethod
+    def _network_select():
+        return select(IOC.id, IOC.value_hash, cast(IOC.network, CIDR)).where(IOC.network.isnot(None))
+
+    def on_ioc_changes(self, value_hashes: List[str]) -> None:
+        """IOCChangeListener subscriber"""
+        if DISCONNECTED in value_hashes:
+            self.ready = False
+            return
+        if ALL_CHANGED in value_hashes:
+            self.request_rebuild()
+            return
+        self._pending_hashes.update(value_hashes)
+        if self._changed_during_build is not None:
+            self._changed_during_build.update(value_hashes)
+        if self._fetch_task is None or self._fetch_task.done():
+            self._fetch_task = asyncio.create_task(self._fetch_pending())
+
+    async def _fetch_pending(self) -> None:
+        try:
+            while self._pending_hashes:
+                hashes = list(self._pending_hashes)
+                self._pending_hashes.clear()
+                await self._apply_hashes(self.table, hashes)
+        except Exception:
+            logger.exception("IOC network index update failed, rebuilding")
+            self.request_rebuild()
+
+    async def _apply_hashes(self, table: PrefixTable, hashes: List[str]) -> None:
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(self._network_select().where(IOC.value_hash.in_(hashes)))
+            rows = result.all()
+        table.remove_hashes(hashes)
+        for ioc_id, value_hash, network in rows:
+            table.add(ioc_id, value_hash, network)
+
+    def request_rebuild(self) -> None:
+        self._rebuild_requested_at = time.monotonic()
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._refresh())
+
+    async def _refresh(self) -> None:
+        await ioc_change_listener.wait_until_listening()
+        try:
+            while self._scanned_at is None or self._rebuild_requested_at > self._scanned_at:
+                await self._build()
+            # A scan that overlapped a disconnect may have missed changes, the
+            # ALL_CHANGED sent on reconnect schedules another one
+            self.ready = ioc_change_listener.listening
+        except Exception:
+            logger.exception("IOC network index build failed")
+        finally:
+            self._changed_during_build = None
+
+    async def _build(self) -> None:
+        started = time.monotonic()
+        table = PrefixTable()
+        self._changed_during_build = set()
+        self._scanned_at = time.monotonic()
+        async with AsyncSessionLocal() as db:
+            result = await db.stream(self._network_select().execution_options(yield_per=SCAN_BATCH_SIZE))
+            async for rows in result.partitions():
+                for ioc_id, value_hash, network in rows:
+                    table.add(ioc_id, value_hash, network)
+        # The scan may have missed changes committed while it ran
+        while self._changed_during_build:
+            hashes = list(self._changed_during_build)
+            self._changed_during_build.clear()
+            await self._apply_hashes(table, hashes)
+        self._changed_during_build = None
+        self.table = table
+        self.built_at = time.time()
+        logger.info(
+            "IOC network index built with %d networks in %.1fs", len(table), time.monotonic() - started
+        )
+
+    def start(self) -> None:
+        if not ioc_change_listener.running:
+            logger.warning("IOC change listener is not running, the IOC network index stays disabled")
+            return
+        self.request_rebuild()
+
+    async def stop(self) -> None:
+        for task in (self._task, self._fetch_task):
+            if task is not None:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._task = self._fetch_task = None
+
+    def stats(self) -> dict:
+        table = self.table
+        return {
+            "enabled": get_settings().ioc_network_index_enabled,
+            "ready": self.ready,
+            "networks": len(table),
+            "prefix_lengths": {f"ipv{version}": lengths for version, lengths in table.lengths.items()},
+            "lookups": self.lookups,
+        }
+
+
+ioc_network_index = IOCNetworkIndex()
@@ -0,0 +1,43 @@
+import base64
+import uuid
+from datetime import datetime
+from typing import Tuple
+
+from src.exceptions import InvalidCursorException
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(created_at: datetime, ioc_id: uuid.UUID) -> str:
+    """Encode the (created_at, id) keyset position of the last row on a page"""
+    raw = f"{created_at.isoformat()}|{ioc_id}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, uuid.UUID]:
+    """Decode an opaque cursor produced by encode_cursor"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode("utf-8")
+        created_at, ioc_id = raw.split("|", 1)
+        return datetime.fromisoformat(created_at), uuid.UUID(ioc_id)
+    except (ValueError, UnicodeDecodeError):
+        raise InvalidCursorException(cursor)
+
+
+def encode_sync_token(change_xid: int, ioc_id: uuid.UUID) -> str:
+    """Encode the (change_xid, id) watermark a delta sync has caught up to"""
+    raw = f"{change_xid}|{ioc_id}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_sync_token(token: str) -> Tuple[int, uuid.UUID]:
+    """Decode an opaque token produced by encode_sync_token"""
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)).decode("utf-8")
+        change_xid, ioc_id = raw.split("|", 1)
+        change_xid = int(change_xid)
+        if change_xid < 0:
+            raise ValueError(change_xid)
+        return change_xid, uuid.UUID(ioc_id)
+    except (ValueError, UnicodeDecodeError):
+        raise InvalidCursorException(token)
@@ -0,0 +1,133 @@
+import logging
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from src.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+# Longest statement text written to a log record
+LOGGED_STATEMENT_LENGTH = 1000
+
+
+class RequestQueryStats:
+    """Statements issued while serving one request"""
+
+    def __init__(self, method: str, path: str):
+        self.method = method
+        self.path = path
+        self.started = time.perf_counter()
+        self.count = 0
+        self.total_time = 0.0
+        self.slowest_time = 0.0
+        self.slowest_statement: Optional[str] = None
+
+    def record(self, statement: str, elapsed: float) -> None:
+        self.count += 1
+        self.total_time += elapsed
+        if elapsed > self.slowest_time:
+            self.slowest_time = elapsed
+            self.slowest_statement = statement
+
+    def server_timing(self) -> str:
+        elapsed = time.perf_counter() - self.started
+        return (
+            f'db;dur={self.total_time * 1000:.2f};desc="count={self.count}", '
+            f"db-slowest;dur={self.slowest_time * 1000:.2f}, "
+            f"app;dur={elapsed * 1000:.2f}"
+        )
+
+
+current_query_stats: ContextVar[Optional[RequestQueryStats]] = ContextVar("current_query_stats", default=None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    elapsed = time.perf_counter() - conn.info["query_started"].pop()
+    stats = current_query_stats.get()
+    if stats is not None:
+        stats.record(statement, elapsed)
+
+    threshold = get_settings().slow_query_threshold_ms
+    if threshold and elapsed * 1000 >= threshold:
+        logger.warning(
+            "Slow query",
+            extra={
+                "duration_ms": round(elapsed * 1000, 2),
+                "statement": statement[:LOGGED_STATEMENT_LENGTH],
+                "method": stats.method if stats else None,
+                "path": stats.path if stats else None,
+            }
+        )
+
+
+def _handle_error(context) -> None:
+    # after_cursor_execute does not run for a failed statement
+    if context.connection is not None:
+        started = context.connection.info.get("query_started")
+        if started:
+            started.pop()
+
+
+def install_query_hooks(engine: AsyncEngine) -> None:
+    """Time every statement run through `engine`, attributing it to the current request"""
+    sync_engine = engine.sync_engine
+    if not event.contains(sync_engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(sync_engine, "handle_error", _handle_error)
+
+
+class QueryStatsMiddleware:
+    """Collects RequestQueryStats per HTTP request
+
+    Adds a Server-Timing header (DB time and statement count, slowest
+    statement, time to first byte) and logs one structured record per
+    request once the response body is complete, so statements issued while
+    streaming are included in the log but not the header.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        stats = RequestQueryStats(scope["method"], scope["path"])
+        token = current_query_stats.set(stats)
+        status_code = 500
+
+        async def send_with_timing(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", stats.server_timing().encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            current_query_stats.reset(token)
+            logger.info(
+                "Request completed",
+                extra={
+                    "method": stats.method,
+                    "path": stats.path,
+                    "status_code": status_code,
+                    "duration_ms": round((time.perf_counter() - stats.started) * 1000, 2),
+                    "db_queries": stats.count,
+                    "db_time_ms": round(stats.total_time * 1000, 2),
+                    "db_slowest_ms": round(stats.slowest_time * 1000, 2),
+                    "db_slowest_statement": (stats.slowest_statement or "")[:LOGGED_STATEMENT_LENGTH] or None,
+                }
+            )
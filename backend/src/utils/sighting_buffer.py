@@ -0,0 +1,141 @@
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import BigInteger, DateTime, Integer, String, bindparam, text
+from sqlalchemy.dialects.postgresql import ARRAY
+
+from src.config import get_settings
+from src.database import AsyncSessionLocal
+from src.utils.ioc_change_notifier import notify_ioc_changes
+from src.utils.lookup_cache import ioc_lookup_cache
+from src.utils.metrics import ioc_sightings_flushed_total
+
+logger = logging.getLogger(__name__)
+
+SightingKey = Tuple[int, str]
+
+# One statement per flush however many IOCs were re-seen. Input is sorted so concurrent
+# flushes from several workers lock rows in the same order
+FLUSH_SIGHTINGS = text("""
+    UPDATE iocs SET
+        last_seen = GREATEST(iocs.last_seen, s.seen_at),
+        sighting_count = iocs.sighting_count + s.sightings
+    FROM (
+        SELECT * FROM unnest(:type_ids, :value_hashes, :seen_at, :sightings)
+            AS input(type_id, value_hash, seen_at, sightings)
+        ORDER BY type_id, value_hash
+    ) s
+    WHERE iocs.type_id = s.type_id AND iocs.value_hash = s.value_hash
+""").bindparams(
+    bindparam("type_ids", type_=ARRAY(Integer)),
+    bindparam("value_hashes", type_=ARRAY(String)),
+    bindparam("seen_at", type_=ARRAY(DateTime(timezone=True))),
+    bindparam("sightings", type_=ARRAY(BigInteger)),
+)
+
+
+class SightingBuffer:
+    """Write-behind buffer for re-sightings of existing IOCs
+
+    Keeps the latest sighting time and the number of sightings per
+    (type_id, value_hash) and writes them in one set-based UPDATE every
+    sighting_flush_interval seconds, or sooner once sighting_buffer_max_entries
+    IOCs are pending, so a hot indicator costs one row update per flush
+    instead of one per report.
+    Pending sightings are lost if the process dies without a clean shutdown.
+    """
+
+    def __init__(self):
+        self._pending: Dict[SightingKey, List] = {}
+        self._flush_lock = asyncio.Lock()
+        self._full = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def enabled(self) -> bool:
+        return get_settings().sighting_buffer_enabled
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def record(self, type_id: int, value_hash: str, seen_at: Optional[datetime] = None) -> datetime:
+        """Buffer one sighting and return its time"""
+        seen_at = seen_at or datetime.now(timezone.utc)
+        self._merge(type_id, value_hash, seen_at, 1)
+        if len(self._pending) >= get_settings().sighting_buffer_max_entries:
+            self._full.set()
+        return seen_at
+
+    def pending_sightings(self, type_id: int, value_hash: str) -> int:
+        """Sightings of one IOC not written yet"""
+        entry = self._pending.get((type_id, value_hash))
+        return entry[1] if entry is not None else 0
+
+    def _merge(self, type_id: int, value_hash: str, seen_at: datetime, sightings: int) -> None:
+        entry = self._pending.get((type_id, value_hash))
+        if entry is None:
+            self._pending[(type_id, value_hash)] = [seen_at, sightings]
+        else:
+            entry[0] = max(entry[0], seen_at)
+            entry[1] += sightings
+
+    async def flush(self) -> int:
+        """Write every pending sighting, returns the number of IOCs updated"""
+        async with self._flush_lock:
+            pending, self._pending = self._pending, {}
+            if not pending:
+                return 0
+            keys = list(pending)
+            try:
+                async with AsyncSessionLocal() as db:
+                    result = await db.execute(FLUSH_SIGHTINGS, {
+                        "type_ids": [type_id for type_id, _ in keys],
+                        "value_hashes": [value_hash for _, value_hash in keys],
+                        "seen_at": [pending[key][0] for key in keys],
+                        "sightings": [pending[key][1] for key in keys],
+                    })
+                    await notify_ioc_changes(db, (value_hash for _, value_hash in keys))
+                    await db.commit()
+            except BaseException:
+                # Also when cancelled: keep them for the next flush, merged with any recorded meanwhile
+                for (type_id, value_hash), (seen_at, sightings) in pending.items():
+                    self._merge(type_id, value_hash, seen_at, sightings)
+                raise
+            ioc_lookup_cache.invalidate(value_hash for _, value_hash in keys)
+            ioc_sightings_flushed_total.inc(result.rowcount)
+            return result.rowcount
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._full.wait(), get_settings().sighting_flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._full.clear()
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception("Flushing %d buffered IOC sightings failed, retrying later", len(self))
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the periodic flush and write whatever is still pending"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        try:
+            await self.flush()
+        except Exception:
+            logger.exception("Final flush of %d buffered IOC sightings failed, they are lost", len(self))
+
+
+sighting_buffer = SightingBuffer()
@@ -0,0 +1,10 @@
+import os
+import sys
+from pathlib import Path
+
+# Settings are read at import time by several modules, unit tests never connect
+os.environ.setdefault("DATABASE_URL", "postgresql://postgres@localhost:5432/threatsys")
+os.environ.setdefault("API_HOST", "localhost")
+os.environ.setdefault("API_PORT", "8000")
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
@@ -0,0 +1,78 @@
+import hashlib
+
+import pytest
+
+from src.utils.bloom_filter import BloomFilter, IOCBloomIndex
+from src.utils.ioc_change_notifier import DISCONNECTED
+
+
+def _hashes(prefix: str, n: int):
+    return [hashlib.sha256(f"{prefix}{i}".encode()).hexdigest() for i in range(n)]
+
+
+def test_added_keys_are_contained():
+    bloom = BloomFilter(1000, 0.01)
+    keys = _hashes("present", 1000)
+    bloom.add_many(keys)
+    assert all(key in bloom for key in keys)
+    assert bloom.count == 1000
+
+
+def test_empty_filter_contains_nothing():
+    bloom = BloomFilter(1000, 0.01)
+    assert not any(key in bloom for key in _hashes("absent", 1000))
+
+
+def test_false_positive_rate_at_capacity():
+    bloom = BloomFilter(10_000, 0.01)
+    bloom.add_many(_hashes("present", 10_000))
+    false_positives = sum(key in bloom for key in _hashes("absent", 20_000))
+    assert false_positives / 20_000 < 0.02
+    assert bloom.estimated_error_rate == pytest.approx(0.01, rel=0.5)
+
+
+def test_save_and_load_round_trip(tmp_path):
+    path = str(tmp_path / "iocs.bloom")
+    bloom = BloomFilter(5000, 0.001)
+    keys = _hashes("present", 5000)
+    bloom.add_many(keys)
+    bloom.save(path)
+
+    loaded, saved_at = BloomFilter.load(path)
+    assert saved_at > 0
+    assert (loaded.capacity, loaded.num_bits, loaded.num_hashes, loaded.count) == (
+        bloom.capacity, bloom.num_bits, bloom.num_hashes, bloom.count
+    )
+    assert bytes(loaded.bits) == bytes(bloom.bits)
+    assert all(key in loaded for key in keys)
+
+    # Mapped copy-on-write: adding to the loaded filter leaves the file alone
+    loaded.add("new")
+    assert "new" in loaded
+    assert "new" not in BloomFilter.load(path)[0]
+
+
+def test_load_rejects_other_files(tmp_path):
+    path = tmp_path / "not.bloom"
+    path.write_bytes(b"x" * 64)
+    with pytest.raises(ValueError):
+        BloomFilter.load(str(path))
+
+
+def test_index_stops_ruling_out_when_the_listener_disconnects():
+    index = IOCBloomIndex(1000, 0.01)
+    index.filter = BloomFilter(1000, 0.01)
+    index.ready = True
+    assert not index.might_contain("missing")
+
+    index.on_ioc_changes([DISCONNECTED])
+    assert not index.ready
+    assert index.might_contain("missing")
+    assert index.filter_candidates(["missing"]) == ["missing"]
+
+
+def test_index_is_not_enabled_without_a_listener():
+    index = IOCBloomIndex(1000, 0.01)
+    index.start()
+    assert not index.ready
+    assert index.might_contain("anything")
@@ -0,0 +1,152 @@
+import uuid
+
+import pytest
+
+from src.utils.graph_index import RelationshipGraph, RelationshipGraphIndex
+from src.utils.ioc_change_notifier import DISCONNECTED
+
+A, B, C, D, E = (uuid.UUID(int=i) for i in range(1, 6))
+
+
+def _edge(graph: RelationshipGraph, source, target, relationship_type="related_to", confidence=50) -> uuid.UUID:
+    edge_id = uuid.uuid4()
+    graph.add_edge(edge_id, source, target, relationship_type, confidence)
+    return edge_id
+
+
+def _neighbours(graph: RelationshipGraph, node_uuid) -> set:
+    node = graph.node_ids[node_uuid]
+    return {graph.node_uuid(other) for _, other in graph._neighbours(node, 0, None)}
+
+
+@pytest.fixture
+def chain():
+    """A - B - C - D, with a low confidence shortcut A - D"""
+    graph = RelationshipGraph()
+    _edge(graph, A, B)
+    _edge(graph, B, C)
+    _edge(graph, C, D)
+    _edge(graph, A, D, "resolves_to", confidence=10)
+    return graph
+
+
+def test_new_edges_go_to_the_delta_until_compaction(chain):
+    assert chain.delta_edges == 4
+    assert len(chain.adjacency) == 0
+    assert _neighbours(chain, B) == {A, C}
+
+    chain.compact()
+    assert chain.delta_edges == 0
+    assert chain.delta == {}
+    assert len(chain.adjacency) == 8
+    assert _neighbours(chain, B) == {A, C}
+
+
+def test_csr_and_delta_are_combined(chain):
+    chain.compact()
+    _edge(chain, B, E)
+    assert chain.delta_edges == 1
+    assert _neighbours(chain, B) == {A, C, E}
+    assert _neighbours(chain, E) == {B}
+
+
+def test_compaction_keeps_edges_added_after_the_csr_build(chain):
+    edges = chain.edge_count
+    csr = chain.build_csr(edges)
+    _edge(chain, D, E)
+    chain.install_csr(*csr, edges)
+    assert chain.delta_edges == 1
+    assert _neighbours(chain, D) == {A, C, E}
+
+
+def test_same_edge_updates_confidence(chain):
+    chain.compact()
+    chain.add_edge(uuid.uuid4(), A, B, "related_to", 90)
+    assert chain.edge_count == 4
+    edge = chain.find_edge(chain.edge_uuid(0))
+    assert chain.edge_confidence[edge] == 90
+
+
+def test_shortest_path_and_filters(chain):
+    chain.compact()
+    nodes, edges = chain.shortest_path(A, D, max_depth=6)
+    assert [chain.node_uuid(n) for n in nodes] == [A, D]
+    assert len(edges) == 1
+
+    nodes, edges = chain.shortest_path(A, D, max_depth=6, min_confidence=20)
+    assert [chain.node_uuid(n) for n in nodes] == [A, B, C, D]
+    assert [chain.edge_dict(e)["relationship_type"] for e in edges] == ["related_to"] * 3
+
+    assert chain.shortest_path(A, D, max_depth=2, min_confidence=20) is None
+    assert chain.shortest_path(A, D, max_depth=6, types=["drops"]) is None
+    assert chain.shortest_path(A, E, max_depth=6) is None
+
+
+def test_k_hop(chain):
+    depths, edges, truncated = chain.k_hop(B, depth=1)
+    assert {chain.node_uuid(n): d for n, d in depths.items()} == {B: 0, A: 1, C: 1}
+    assert len(edges) == 2
+    assert not truncated
+
+    depths, _, truncated = chain.k_hop(A, depth=3, max_nodes=2)
+    assert len(depths) == 2
+    assert truncated
+
+
+def test_removed_edges_are_not_traversed(chain):
+    chain.compact()
+    shortcut = chain.edge_uuid(3)
+    assert chain.remove_edge(shortcut)
+    assert not chain.remove_edge(shortcut)
+    assert chain.live_edge_count == 3
+    assert _neighbours(chain, A) == {B}
+
+    nodes, _ = chain.shortest_path(A, D, max_depth=6)
+    assert [chain.node_uuid(n) for n in nodes] == [A, B, C, D]
+
+    # Re-adding the same endpoints and type creates a new edge, not the removed one
+    new_id = _edge(chain, A, D, "resolves_to")
+    assert chain.find_edge(new_id) == 4
+    assert _neighbours(chain, A) == {B, D}
+
+
+def test_removing_an_unknown_edge():
+    graph = RelationshipGraph()
+    assert not graph.remove_edge(uuid.uuid4())
+
+
+def test_removing_many_edges():
+    graph = RelationshipGraph()
+    hub = uuid.uuid4()
+    spokes = [uuid.uuid4() for _ in range(20000)]
+    edge_ids = [uuid.uuid4() for _ in spokes]
+    for edge_id, spoke in zip(edge_ids, spokes):
+        graph.add_edge(edge_id, hub, spoke, "related_to", 50, check_existing=False)
+    graph.compact()
+
+    for edge_id in edge_ids[::2]:
+        assert graph.remove_edge(edge_id)
+    assert graph.live_edge_count == 10000
+    assert len(graph.edge_ids) == 10000
+    assert graph.find_edge(edge_ids[0]) is None
+    assert graph.find_edge(edge_ids[1]) == 1
+    assert _neighbours(graph, hub) == set(spokes[1::2])
+
+
+def test_re_adding_an_id_with_other_endpoints_replaces_the_edge():
+    graph = RelationshipGraph()
+    edge_id = _edge(graph, A, B)
+    graph.add_edge(edge_id, A, C, "related_to", 50)
+    assert graph.find_edge(edge_id) == 1
+    assert graph.live_edge_count == 1
+    assert _neighbours(graph, A) == {C}
+
+
+def test_index_is_not_used_without_a_listener_or_after_a_disconnect():
+    index = RelationshipGraphIndex()
+    index.start()
+    assert not index.ready
+
+    index.ready = True
+    index.on_relationship_changes([DISCONNECTED])
+    assert not index.ready
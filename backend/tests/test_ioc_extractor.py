@@ -0,0 +1,73 @@
+import time
+
+from src.utils.ioc_extractor import extract_candidates
+
+
+def test_non_ascii_text_around_matches():
+    data = "visit http://evil.com/café and mail naïve.bob@exämple.com or bob@x.com ünd 10.0.0.1".encode()
+    candidates = extract_candidates(data)
+
+    url_start = data.index(b"http")
+    assert candidates["url"] == {"http://evil.com/caf": [(url_start, url_start + 19)]}
+    assert "email" in candidates and list(candidates["email"]) == ["bob@x.com"]
+    ip_start = data.index(b"10.0.0.1")
+    assert candidates["ipv4_addr"] == {"10.0.0.1": [(ip_start, ip_start + 8)]}
+
+
+def test_offsets_index_the_raw_bytes():
+    data = b"seen 1.2.3.4 and again 1.2.3.4"
+    assert extract_candidates(data)["ipv4_addr"] == {"1.2.3.4": [(5, 12), (23, 30)]}
+
+
+def test_url_host_is_a_candidate():
+    data = b"(see https://Evil.Example.com:8443/x?y=1)."
+    candidates = extract_candidates(data)
+    start = data.index(b"https")
+    url = "https://Evil.Example.com:8443/x?y=1"
+    assert candidates["url"] == {url: [(start, start + len(url))]}
+    host_start = data.index(b"Evil")
+    assert candidates["domain"] == {"evil.example.com": [(host_start, host_start + 16)]}
+
+
+def test_url_ip_hosts():
+    candidates = extract_candidates(b"http://10.1.2.3/a http://[2001:db8::1]/b")
+    assert "10.1.2.3" in candidates["ipv4_addr"]
+    assert "2001:db8::1" in candidates["ipv6_addr"]
+
+
+def test_email_domain_is_a_candidate():
+    data = b"from: alice@mail.example.org"
+    candidates = extract_candidates(data)
+    start = data.index(b"alice")
+    assert candidates["email"] == {"alice@mail.example.org": [(start, len(data))]}
+    assert candidates["domain"] == {"mail.example.org": [(data.index(b"mail."), len(data))]}
+
+
+def test_hashes_are_typed_by_length():
+    values = {"file_hash_md5": "a" * 32, "file_hash_sha1": "b" * 40, "file_hash_sha256": "c" * 64, "file_hash_sha512": "d" * 128}
+    candidates = extract_candidates(" ".join(values.values()).encode())
+    for type_name, value in values.items():
+        assert list(candidates[type_name]) == [value]
+    assert not extract_candidates(b"e" * 33)
+
+
+def test_bare_ipv6_separators_are_skipped():
+    assert "ipv6_addr" not in extract_candidates(b"a :: b ::: c")
+    assert list(extract_candidates(b"addr fe80::1 up")["ipv6_addr"]) == ["fe80::1"]
+
+
+def _scan_time(data: bytes) -> float:
+    best = float("inf")
+    for _ in range(3):
+        started = time.perf_counter()
+        extract_candidates(data)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def test_scanning_is_linear_on_adversarial_input():
+    patterns = [b"a.", b"a" * 63 + b".", b"a@", b"1.", b"a:", b"f" * 127 + b"g", b"http://" + b"a" * 64 + b" "]
+    for pattern in patterns:
+        small = pattern * (20000 // len(pattern))
+        ratio = _scan_time(small * 4) / _scan_time(small)
+        assert ratio < 8, (pattern[:8], ratio)
@@ -0,0 +1,49 @@
+import asyncio
+
+import pytest
+
+from src.exceptions import InvalidBulkPayloadException
+from src.utils.ioc_feed_parser import MalformedRecord, iter_csv, iter_ndjson
+
+
+async def _chunks(*chunks: bytes):
+    for chunk in chunks:
+        yield chunk
+
+
+def _collect(records) -> list:
+    async def collect():
+        return [record async for record in records]
+    return asyncio.run(collect())
+
+
+def test_ndjson_lines_split_across_chunks():
+    body = '{"value": "a.com"}\r\n\n{"value": "café.com"}\n[1]\n{"value": "b.com"}'.encode()
+    chunks = [body[i:i + 3] for i in range(0, len(body), 3)]
+    assert _collect(iter_ndjson(_chunks(*chunks), 1000)) == [
+        {"value": "a.com"},
+        {"value": "café.com"},
+        MalformedRecord("Expected a JSON object"),
+        {"value": "b.com"},
+    ]
+
+
+def test_csv_header_and_rows():
+    records = _collect(iter_csv(_chunks(b"type_id,val", b"ue\n3,a.com\n3,b.com,x\n"), 1000))
+    assert records == [{"type_id": "3", "value": "a.com"}, MalformedRecord("Expected 2 columns, got 3")]
+
+
+@pytest.mark.parametrize("chunks", [
+    [b'{"value": "' + b"a" * 50 + b'"}\n'],
+    [b"a" * 30, b"a" * 30, b"a" * 30],
+    [b"ok\n" + b"a" * 101],
+])
+def test_lines_over_the_maximum_are_rejected(chunks):
+    with pytest.raises(InvalidBulkPayloadException):
+        _collect(iter_ndjson(_chunks(*chunks), 50))
+
+
+def test_line_at_the_maximum_is_accepted():
+    line = b'{"value": "' + b"a" * 37 + b'"}'
+    assert len(line) == 50
+    assert _collect(iter_ndjson(_chunks(line[:20], line[20:] + b"\n"), 50)) == [{"value": "a" * 37}]
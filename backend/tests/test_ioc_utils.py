@@ -0,0 +1,28 @@
+import pytest
+
+from src.utils.ioc_utils import IOCTypeEnum, IOCUtils
+
+
+@pytest.mark.parametrize("ioc_type, value", [
+    (IOCTypeEnum.IPV6_ADDR, "fe80::1%eth0"),
+    (IOCTypeEnum.IPV6_ADDR, "fe80::1%1"),
+    (IOCTypeEnum.IPV6_CIDR, "fe80::%eth0/64"),
+])
+def test_ipv6_zone_ids_are_rejected(ioc_type, value):
+    assert not IOCUtils.validate_value(ioc_type, value)
+    normalized, hashes, errors = IOCUtils.normalize_many(ioc_type, [value])
+    assert normalized == [None]
+    assert hashes == [None]
+    assert errors[0]
+
+
+@pytest.mark.parametrize("ioc_type, value, expected", [
+    (IOCTypeEnum.IPV6_ADDR, "FE80:0000::1", "fe80::1"),
+    (IOCTypeEnum.IPV6_CIDR, "2001:db8::1/32", "2001:db8::/32"),
+    (IOCTypeEnum.IPV4_CIDR, "10.1.2.3/8", "10.0.0.0/8"),
+])
+def test_addresses_and_ranges_are_normalized(ioc_type, value, expected):
+    assert IOCUtils.validate_value(ioc_type, value)
+    normalized, hashes, errors = IOCUtils.normalize_many(ioc_type, [value])
+    assert normalized == [expected]
+    assert hashes[0] and errors == [None]
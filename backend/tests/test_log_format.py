@@ -0,0 +1,32 @@
+import json
+import logging
+
+from src.utils.log_format import JSONLogFormatter, PlainLogFormatter
+
+
+def _record(**extra) -> logging.LogRecord:
+    record = logging.LogRecord("src.test", logging.WARNING, __file__, 1, "Slow query", (), None)
+    record.__dict__.update(extra)
+    return record
+
+
+def test_plain_format_appends_extra_fields():
+    line = PlainLogFormatter().format(_record(
+        duration_ms=812.5, statement="SELECT *\nFROM iocs WHERE value = 'a b'", path="/iocs/", method=None
+    ))
+    assert line.endswith(
+        'WARNING src.test: Slow query duration_ms=812.5 '
+        'statement="SELECT *\\nFROM iocs WHERE value = \'a b\'" path=/iocs/ method=null'
+    )
+    assert "\n" not in line
+
+
+def test_plain_format_without_extra_fields():
+    assert PlainLogFormatter().format(_record()).endswith("WARNING src.test: Slow query")
+
+
+def test_json_format_has_extra_fields_as_keys():
+    entry = json.loads(JSONLogFormatter().format(_record(duration_ms=812.5, db_queries=3)))
+    assert entry["message"] == "Slow query"
+    assert entry["duration_ms"] == 812.5
+    assert entry["db_queries"] == 3
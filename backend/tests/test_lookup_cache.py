@@ -0,0 +1,119 @@
+import pytest
+
+from src.utils import lookup_cache
+from src.utils.lookup_cache import NEGATIVE, CacheBackend, IOCLookupCache, LocalLRUCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(lookup_cache.time, "monotonic", clock)
+    return clock
+
+
+def test_backend_interface_is_abstract():
+    with pytest.raises(TypeError):
+        CacheBackend()
+
+
+def test_lru_evicts_least_recently_used():
+    cache = LocalLRUCache(max_entries=2)
+    cache.set((1, "a"), "row-a", 60)
+    cache.set((1, "b"), "row-b", 60)
+    assert cache.get((1, "a")) == (True, "row-a")
+    cache.set((1, "c"), "row-c", 60)
+
+    assert cache.get((1, "b")) == (False, None)
+    assert cache.get((1, "a")) == (True, "row-a")
+    assert cache.get((1, "c")) == (True, "row-c")
+    assert len(cache) == 2
+    assert cache.stats.evictions == 1
+
+
+def test_entries_expire_after_ttl(clock):
+    cache = LocalLRUCache()
+    cache.set((1, "a"), "row-a", 10)
+    clock.now += 9
+    assert cache.get((1, "a")) == (True, "row-a")
+    clock.now += 2
+    assert cache.get((1, "a")) == (False, None)
+    assert len(cache) == 0
+    assert cache.stats.expirations == 1
+
+
+def test_negative_entries_use_negative_ttl(clock):
+    cache = IOCLookupCache(LocalLRUCache(), ttl=300, negative_ttl=5)
+    cache.set_negative(3, "a", cache.generation)
+    assert cache.get(3, "a") == (True, NEGATIVE)
+    assert cache.backend.stats.negative_hits == 1
+    clock.now += 6
+    assert cache.get(3, "a") == (False, None)
+
+
+def test_negative_entries_disabled_by_zero_ttl():
+    cache = IOCLookupCache(LocalLRUCache(), ttl=300, negative_ttl=0)
+    cache.set_negative(3, "a", cache.generation)
+    assert cache.get(3, "a") == (False, None)
+
+
+def test_keys_include_the_type():
+    cache = IOCLookupCache(LocalLRUCache(), ttl=300, negative_ttl=60)
+    cache.set(3, "same-hash", "domain-row", cache.generation)
+    cache.set_negative(10, "same-hash", cache.generation)
+    assert cache.get(3, "same-hash") == (True, "domain-row")
+    assert cache.get(10, "same-hash") == (True, NEGATIVE)
+    assert cache.get(11, "same-hash") == (False, None)
+
+
+def test_invalidate_drops_every_type_for_a_hash():
+    cache = IOCLookupCache(LocalLRUCache(), ttl=300, negative_ttl=60)
+    cache.set(3, "h", "domain-row", cache.generation)
+    cache.set(10, "h", "mutex-row", cache.generation)
+    cache.set(3, "other", "other-row", cache.generation)
+    cache.invalidate(["h"])
+    assert cache.get(3, "h") == (False, None)
+    assert cache.get(10, "h") == (False, None)
+    assert cache.get(3, "other") == (True, "other-row")
+
+
+def test_generation_guard_skips_rows_read_before_an_invalidation():
+    cache = IOCLookupCache(LocalLRUCache(), ttl=300, negative_ttl=60)
+    generation = cache.generation
+    cache.invalidate(["h"])
+    cache.set(3, "h", "stale-row", generation)
+    cache.set_negative(3, "h", generation)
+    assert cache.get(3, "h") == (False, None)
+
+    cache.set(3, "h", "fresh-row", cache.generation)
+    assert cache.get(3, "h") == (True, "fresh-row")
+
+
+def test_all_changed_clears_everything():
+    cache = IOCLookupCache(LocalLRUCache(), ttl=300, negative_ttl=60)
+    cache.set(3, "h", "row", cache.generation)
+    cache.on_ioc_changes([lookup_cache.ALL_CHANGED])
+    assert len(cache.backend) == 0
+
+
+def test_disconnect_clears_and_bypasses_until_all_changed():
+    cache = IOCLookupCache(LocalLRUCache(), ttl=300, negative_ttl=60)
+    cache.set(3, "h", "row", cache.generation)
+    cache.on_ioc_changes([lookup_cache.DISCONNECTED])
+    assert len(cache.backend) == 0
+
+    cache.set(3, "h", "row", cache.generation)
+    cache.set_negative(3, "missing", cache.generation)
+    assert len(cache.backend) == 0
+    assert cache.get(3, "h") == (False, None)
+
+    cache.on_ioc_changes([lookup_cache.ALL_CHANGED])
+    cache.set(3, "h", "row", cache.generation)
+    assert cache.get(3, "h") == (True, "row")
@@ -0,0 +1,52 @@
+import pytest
+
+from src.utils.metrics import Metric, MetricsRegistry
+
+
+def test_metric_is_abstract():
+    with pytest.raises(TypeError):
+        Metric("threatsys_test", "Test")
+
+
+def test_histogram_renders_cumulative_le_buckets():
+    registry = MetricsRegistry()
+    histogram = registry.histogram("threatsys_test_seconds", "Test latency", ("route",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        histogram.observe(value, ("/iocs/",))
+
+    assert registry.render().splitlines() == [
+        "# HELP threatsys_test_seconds Test latency",
+        "# TYPE threatsys_test_seconds histogram",
+        'threatsys_test_seconds_bucket{route="/iocs/",le="0.1"} 2',
+        'threatsys_test_seconds_bucket{route="/iocs/",le="1.0"} 3',
+        'threatsys_test_seconds_bucket{route="/iocs/",le="+Inf"} 4',
+        'threatsys_test_seconds_sum{route="/iocs/"} 3.65',
+        'threatsys_test_seconds_count{route="/iocs/"} 4',
+    ]
+
+
+def test_unlabelled_histogram_only_has_le():
+    registry = MetricsRegistry()
+    registry.histogram("threatsys_test_seconds", "Test", buckets=(1.0,)).observe(2.0)
+    assert 'threatsys_test_seconds_bucket{le="+Inf"} 1' in registry.render().splitlines()
+    assert "threatsys_test_seconds_count 1" in registry.render().splitlines()
+
+
+def test_label_values_are_escaped():
+    registry = MetricsRegistry()
+    counter = registry.counter("threatsys_test_total", "Test", ("path",))
+    counter.inc(2, ('a "quoted"\\path\nnext',))
+    assert registry.render().splitlines()[-1] == 'threatsys_test_total{path="a \\"quoted\\"\\\\path\\nnext"} 2'
+
+
+def test_callback_metric_without_samples_renders_only_headers():
+    registry = MetricsRegistry()
+    registry.callback("gauge", "threatsys_test", "Test", lambda: None)
+    registry.callback("gauge", "threatsys_test_states", "Test", lambda: [(("up",), 1)], ("state",))
+    assert registry.render().splitlines() == [
+        "# HELP threatsys_test Test",
+        "# TYPE threatsys_test gauge",
+        "# HELP threatsys_test_states Test",
+        "# TYPE threatsys_test_states gauge",
+        'threatsys_test_states{state="up"} 1',
+    ]
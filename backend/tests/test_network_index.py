@@ -0,0 +1,78 @@
+import ipaddress
+import uuid
+
+from src.utils.ioc_change_notifier import DISCONNECTED
+from src.utils.network_index import IOCNetworkIndex, PrefixTable
+
+ip = ipaddress.ip_address
+net = ipaddress.ip_network
+
+
+def _table(*networks):
+    table = PrefixTable()
+    ids = {}
+    for value in networks:
+        ids[value] = uuid.uuid4()
+        table.add(ids[value], f"hash-{value}", net(value))
+    return table, ids
+
+
+def test_lookup_returns_every_containing_network_most_specific_first():
+    table, ids = _table("10.0.0.0/8", "10.1.0.0/16", "10.1.2.3/32", "192.168.0.0/16")
+    assert table.lookup(ip("10.1.2.3")) == [ids["10.1.2.3/32"], ids["10.1.0.0/16"], ids["10.0.0.0/8"]]
+    assert table.lookup(ip("10.1.9.9")) == [ids["10.1.0.0/16"], ids["10.0.0.0/8"]]
+    assert table.lookup(ip("10.200.0.1")) == [ids["10.0.0.0/8"]]
+    assert table.lookup(ip("172.16.0.1")) == []
+
+
+def test_ipv4_and_ipv6_are_kept_apart():
+    table, ids = _table("0.0.0.0/0", "2001:db8::/32", "2001:db8:1::/48", "::/0")
+    assert table.lookup(ip("2001:db8:1::5")) == [ids["2001:db8:1::/48"], ids["2001:db8::/32"], ids["::/0"]]
+    assert table.lookup(ip("2001:dead::1")) == [ids["::/0"]]
+    assert table.lookup(ip("8.8.8.8")) == [ids["0.0.0.0/0"]]
+    assert table.lengths == {4: [0], 6: [48, 32, 0]}
+
+
+def test_same_network_under_several_ids():
+    table = PrefixTable()
+    first, second = uuid.uuid4(), uuid.uuid4()
+    table.add(first, "a", net("10.0.0.0/8"))
+    table.add(second, "b", net("10.0.0.0/8"))
+    assert sorted(table.lookup(ip("10.0.0.1"))) == sorted([first, second])
+
+
+def test_remove_drops_empty_prefix_lengths():
+    table, ids = _table("10.0.0.0/8", "10.1.0.0/16")
+    table.remove(ids["10.1.0.0/16"])
+    assert table.lookup(ip("10.1.2.3")) == [ids["10.0.0.0/8"]]
+    assert table.lengths[4] == [8]
+    assert len(table) == 1
+    table.remove(ids["10.1.0.0/16"])
+    assert len(table) == 1
+
+
+def test_re_adding_an_id_moves_it():
+    table = PrefixTable()
+    ioc_id = uuid.uuid4()
+    table.add(ioc_id, "h", net("10.0.0.0/8"))
+    table.add(ioc_id, "h", net("192.168.0.0/16"))
+    assert table.lookup(ip("10.0.0.1")) == []
+    assert table.lookup(ip("192.168.1.1")) == [ioc_id]
+    assert len(table) == 1
+
+
+def test_remove_hashes():
+    table, ids = _table("10.0.0.0/8", "2001:db8::/32")
+    table.remove_hashes(["hash-10.0.0.0/8", "unknown"])
+    assert table.lookup(ip("10.0.0.1")) == []
+    assert table.lookup(ip("2001:db8::1")) == [ids["2001:db8::/32"]]
+
+
+def test_index_is_not_used_without_a_listener_or_after_a_disconnect():
+    index = IOCNetworkIndex()
+    index.start()
+    assert not index.ready
+
+    index.ready = True
+    index.on_ioc_changes([DISCONNECTED])
+    assert not index.ready
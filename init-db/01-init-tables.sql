@@ -1,6 +1,9 @@
 -- Enable pgcrypto to use gen_random_uuid() --
 CREATE EXTENSION IF NOT EXISTS pgcrypto;
 
+-- Enable pg_trgm for indexed substring and similarity search on IOC values --
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
 -- Create organizations table --
 CREATE TABLE IF NOT EXISTS organizations (
     id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
@@ -40,7 +43,7 @@ CREATE TABLE IF NOT EXISTS iocs (
     id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
     type_id INTEGER REFERENCES ioc_types(id),
     value VARCHAR(255) NOT NULL,
-    value_hash VARCHAR(64) NOT NULL,
+    value_hash VARCHAR(128) NOT NULL,
     tlp_level VARCHAR(20) DEFAULT 'WHITE',
     received_at TIMESTAMP DEFAULT NOW(),
     last_seen TIMESTAMP DEFAULT NOW(),
@@ -49,8 +52,102 @@ CREATE TABLE IF NOT EXISTS iocs (
     source_org_id UUID REFERENCES organizations(id),
     created_by UUID REFERENCES users(id),
     created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
-    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    change_xid xid8 NOT NULL DEFAULT pg_current_xact_id(),
+    sighting_count BIGINT NOT NULL DEFAULT 1,
+    network INET,
+    reversed_domain VARCHAR(255)
+);
+
+CREATE INDEX IF NOT EXISTS ix_iocs_value_hash ON iocs (value_hash);
+CREATE UNIQUE INDEX IF NOT EXISTS uq_iocs_type_id_value_hash ON iocs (type_id, value_hash);
+-- Keyset pagination: ORDER BY created_at DESC, id DESC --
+CREATE INDEX IF NOT EXISTS ix_iocs_created_at_id ON iocs (created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS ix_iocs_type_id_created_at_id ON iocs (type_id, created_at DESC, id DESC);
+-- Substring (ILIKE) and similarity (%) search on values --
+CREATE INDEX IF NOT EXISTS ix_iocs_value_trgm ON iocs USING gin (value gin_trgm_ops);
+-- Containment lookups (network >>= address) on address and CIDR IOCs --
+CREATE INDEX IF NOT EXISTS ix_iocs_network ON iocs USING gist (network inet_ops) WHERE network IS NOT NULL;
+-- NULL for values inet does not accept, so one bad value cannot abort a whole write --
+CREATE OR REPLACE FUNCTION try_cast_inet(value TEXT) RETURNS INET AS $$
+BEGIN
+    RETURN value::inet;
+EXCEPTION WHEN invalid_text_representation THEN
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql IMMUTABLE STRICT PARALLEL SAFE;
+CREATE OR REPLACE FUNCTION iocs_set_network() RETURNS trigger AS $$
+BEGIN
+    IF EXISTS (
+        SELECT 1 FROM ioc_types t
+        WHERE t.id = NEW.type_id AND t.name IN ('ipv4_addr', 'ipv6_addr', 'ipv4_cidr', 'ipv6_cidr')
+    ) THEN
+        NEW.network := try_cast_inet(NEW.value);
+    ELSE
+        NEW.network := NULL;
+    END IF;
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+DROP TRIGGER IF EXISTS iocs_network ON iocs;
+CREATE TRIGGER iocs_network BEFORE INSERT OR UPDATE OF type_id, value ON iocs
+    FOR EACH ROW EXECUTE FUNCTION iocs_set_network();
+-- Parent domain (= ANY) and subdomain (LIKE prefix) matching on reversed labels --
+CREATE INDEX IF NOT EXISTS ix_iocs_reversed_domain ON iocs (reversed_domain text_pattern_ops)
+    WHERE reversed_domain IS NOT NULL;
+CREATE OR REPLACE FUNCTION reverse_domain_labels(domain TEXT) RETURNS TEXT AS $$
+    SELECT array_to_string(ARRAY(
+        SELECT label FROM unnest(string_to_array(domain, '.')) WITH ORDINALITY AS l(label, position)
+        ORDER BY position DESC
+    ), '.')
+$$ LANGUAGE sql IMMUTABLE STRICT PARALLEL SAFE;
+CREATE OR REPLACE FUNCTION iocs_set_reversed_domain() RETURNS trigger AS $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM ioc_types t WHERE t.id = NEW.type_id AND t.name = 'domain') THEN
+        NEW.reversed_domain := reverse_domain_labels(NEW.value);
+    ELSE
+        NEW.reversed_domain := NULL;
+    END IF;
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+DROP TRIGGER IF EXISTS iocs_reversed_domain ON iocs;
+CREATE TRIGGER iocs_reversed_domain BEFORE INSERT OR UPDATE OF type_id, value ON iocs
+    FOR EACH ROW EXECUTE FUNCTION iocs_set_reversed_domain();
+-- Delta sync: changes in transaction order, tombstones for deletes --
+CREATE INDEX IF NOT EXISTS ix_iocs_change_xid_id ON iocs (change_xid, id);
+CREATE TABLE IF NOT EXISTS ioc_tombstones (
+    id UUID PRIMARY KEY,
+    type_id INTEGER NOT NULL,
+    value_hash VARCHAR(128) NOT NULL,
+    deleted_xid xid8 NOT NULL DEFAULT pg_current_xact_id(),
+    deleted_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW()
 );
+CREATE INDEX IF NOT EXISTS ix_ioc_tombstones_deleted_xid_id ON ioc_tombstones (deleted_xid, id);
+
+CREATE OR REPLACE FUNCTION iocs_set_change_xid() RETURNS trigger AS $$
+BEGIN
+    NEW.change_xid := pg_current_xact_id();
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION iocs_record_tombstone() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO ioc_tombstones (id, type_id, value_hash)
+    VALUES (OLD.id, OLD.type_id, OLD.value_hash)
+    ON CONFLICT (id) DO UPDATE
+        SET deleted_xid = EXCLUDED.deleted_xid, deleted_at = EXCLUDED.deleted_at;
+    RETURN OLD;
+END
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS iocs_change_xid ON iocs;
+CREATE TRIGGER iocs_change_xid BEFORE UPDATE ON iocs
+    FOR EACH ROW EXECUTE FUNCTION iocs_set_change_xid();
+DROP TRIGGER IF EXISTS iocs_tombstone ON iocs;
+CREATE TRIGGER iocs_tombstone AFTER DELETE ON iocs
+    FOR EACH ROW EXECUTE FUNCTION iocs_record_tombstone();
 
 -- Create IOC relationships --
 CREATE TABLE IF NOT EXISTS ioc_relationships (
@@ -63,3 +160,9 @@ CREATE TABLE IF NOT EXISTS ioc_relationships (
     last_observed TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
     metadata JSONB DEFAULT '{}'
 );
+-- Graph traversal follows edges in both directions --
+CREATE INDEX IF NOT EXISTS ix_ioc_relationships_source_id ON ioc_relationships (source_id);
+CREATE INDEX IF NOT EXISTS ix_ioc_relationships_target_id ON ioc_relationships (target_id);
+-- One row per edge, re-observations update it in place --
+CREATE UNIQUE INDEX IF NOT EXISTS uq_ioc_relationships_source_target_type
+    ON ioc_relationships (source_id, target_id, relationship_type);
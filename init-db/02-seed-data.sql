@@ -33,7 +33,9 @@ VALUES
   ('url', 'Network'),
   ('mutex', 'System'), 
   ('registry_key', 'System'),
-  ('yara_rule', 'Detection');
+  ('yara_rule', 'Detection'),
+  ('ipv4_cidr', 'Network'),
+  ('ipv6_cidr', 'Network');
 
 -- Insert IOCs --
 INSERT INTO iocs (id, type_id, value, value_hash, active, source_org_id, created_by)